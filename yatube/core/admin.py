@@ -0,0 +1,29 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'status',
+        'attempts',
+        'created',
+        'next_attempt',
+        'last_error',
+    )
+    list_filter = ('status',)
+    actions = ('requeue',)
+
+    def requeue(self, request, queryset):
+        count = queryset.update(
+            status=QueuedEmail.STATUS_QUEUED,
+            attempts=0,
+            next_attempt=timezone.now(),
+        )
+        self.message_user(request, f'Возвращено в очередь: {count}')
+    requeue.short_description = 'Вернуть в очередь'
+
+
+admin.site.register(QueuedEmail, QueuedEmailAdmin)
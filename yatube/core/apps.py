@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import checks  # noqa: F401
+        from .auth import connect_signals
+        connect_signals()
+        if settings.WARMUP_ON_READY:
+            from .warmup import warmup
+            warmup(steps=('imports', 'urls'))
@@ -0,0 +1,60 @@
+"""Бэкенд авторизации, который держит пользователя в кэше.
+
+``AuthenticationMiddleware`` на каждый запрос загружает пользователя
+из сессии. Вместе с ``cached_db``-сессиями это убирает оба запроса
+к базе, которые выполнялись до вызова представления.
+
+Записи сбрасываются только в том кэше, где их сбросили, поэтому бэкенд
+работает лишь с общим для всех воркеров кэшем (``SHARED_CACHE``, см.
+проверку ``core.E002``): иначе после смены пароля или блокировки старые
+сессии оставались бы действительны в остальных воркерах.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+USER_CACHE_KEY = 'auth-user:{}'
+
+
+def invalidate_user(user_id):
+    cache.delete(USER_CACHE_KEY.format(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """``ModelBackend``, который берёт пользователя сессии из кэша.
+
+    Запись сбрасывается при любом сохранении или удалении пользователя
+    (смена пароля, блокировка) и при выходе из аккаунта.
+    """
+
+    def get_user(self, user_id):
+        key = USER_CACHE_KEY.format(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+def user_logged_out_handler(sender, user, **kwargs):
+    if user is not None:
+        invalidate_user(user.pk)
+
+
+def connect_signals():
+    User = get_user_model()
+    post_save.connect(user_changed, sender=User,
+                      dispatch_uid='core.auth.user_saved')
+    post_delete.connect(user_changed, sender=User,
+                        dispatch_uid='core.auth.user_deleted')
+    user_logged_out.connect(user_logged_out_handler,
+                            dispatch_uid='core.auth.user_logged_out')
@@ -0,0 +1,234 @@
+"""Сценарии для команды ``manage.py benchmark``.
+
+Каждый сценарий — функция, которая возвращает строки отчёта.
+"""
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.template import Context, Engine, engines
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def measure(func, repeat):
+    """Среднее время одного вызова в миллисекундах."""
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def _fake_posts(count):
+    from posts.models import Group, Post
+
+    author = get_user_model()(username='bench', first_name='Стас',
+                              last_name='Басов')
+    group = Group(title='Группа', slug='bench')
+    posts = [
+        Post(pk=i + 1, text='Текст поста\n' * 20, author=author, group=group)
+        for i in range(count)
+    ]
+    for post in posts:
+        post.render()
+    return posts
+
+
+@scenario('templates')
+def templates_benchmark(repeat):
+    """Рендер шаблонов с разбором на каждый запрос и с cached.Loader."""
+    configured = engines['django'].engine
+    loaders = [
+        'core.template_loaders.FilesystemLoader',
+        'core.template_loaders.AppDirectoriesLoader',
+    ]
+    plain = Engine(
+        dirs=configured.dirs,
+        loaders=loaders,
+        libraries=configured.libraries,
+    )
+    cached = Engine(
+        dirs=configured.dirs,
+        loaders=[('django.template.loaders.cached.Loader', loaders)],
+        libraries=configured.libraries,
+    )
+    posts = _fake_posts(settings.COUNT_POSTS_ON_PAGE)
+    page_obj = Paginator(posts, settings.COUNT_POSTS_ON_PAGE).page(1)
+    context = {
+        'page_obj': page_obj,
+        'group': posts[0].group,
+        'author': posts[0].author,
+        'post': posts[0],
+    }
+    lines = []
+    for name in ('posts/group_list.html', 'posts/profile.html',
+                 'posts/post_detail.html'):
+        results = [
+            measure(
+                lambda: engine.get_template(name).render(Context(context)),
+                repeat,
+            )
+            for engine in (plain, cached)
+        ]
+        lines.append(
+            f'{name}: без кэша {results[0]:.2f} мс, '
+            f'cached.Loader {results[1]:.2f} мс'
+        )
+    return lines
+
+
+def _run_python(args, repeat):
+    env = dict(os.environ, DJANGO_WARMUP='False')
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable] + args,
+            cwd=settings.BASE_DIR,
+            env=env,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), sum(timings) / len(timings)
+
+
+BOOT_SCRIPT = (
+    'import os, sys;'
+    'os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings");'
+    'import yatube.wsgi;'
+    'print(",".join(sorted(name for name in ("PIL", "sorl.thumbnail.images")'
+    ' if name in sys.modules)))'
+)
+
+
+@scenario('startup')
+def startup_benchmark(repeat):
+    """Время ``manage.py check`` и загрузки WSGI-приложения."""
+    repeat = min(repeat, 20)
+    lines = []
+    for title, args in (
+        ('manage.py check', ['manage.py', 'check']),
+        ('загрузка yatube.wsgi', ['-c', BOOT_SCRIPT]),
+    ):
+        best, mean = _run_python(args, repeat)
+        lines.append(f'{title}: лучшее {best:.0f} мс, среднее {mean:.0f} мс')
+    loaded = subprocess.run(
+        [sys.executable, '-c', BOOT_SCRIPT],
+        cwd=settings.BASE_DIR,
+        env=dict(os.environ, DJANGO_WARMUP='False'),
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout.strip()
+    lines.append(
+        'Модули обработки картинок после загрузки: ' + (loaded or 'нет')
+    )
+    return lines
+
+
+@scenario('queries')
+def queries_benchmark(repeat):
+    """Запросы к базе на страницу авторизованного пользователя."""
+    from django.db import connection, transaction
+    from django.test import Client, override_settings
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+
+    url = reverse('about:author')
+    base_url = urlsplit(settings.WARMUP_BASE_URL)
+    secure = base_url.scheme == 'https'
+    configs = (
+        ('сессии в базе, ModelBackend',
+         'django.contrib.sessions.backends.db',
+         'django.contrib.auth.backends.ModelBackend'),
+        ('cached_db, CachedModelBackend',
+         'django.contrib.sessions.backends.cached_db',
+         'core.auth.CachedModelBackend'),
+    )
+    lines = []
+    with transaction.atomic():
+        user = get_user_model().objects.create_user(username='bench-queries')
+        for title, engine, backend in configs:
+            with override_settings(SESSION_ENGINE=engine,
+                                   AUTHENTICATION_BACKENDS=[backend]):
+                client = Client(HTTP_HOST=base_url.netloc)
+                client.force_login(user)
+                client.get(url, secure=secure)
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(repeat):
+                        client.get(url, secure=secure)
+                # Журнал запросов очищается в начале каждого запроса,
+                # поэтому считаем их до замера времени.
+                count = len(queries) / repeat
+                timing = measure(
+                    lambda: client.get(url, secure=secure), repeat
+                )
+            lines.append(
+                f'{title}: {count:.1f} запросов, '
+                f'{timing:.2f} мс на запрос'
+            )
+        transaction.set_rollback(True)
+    return lines
+
+
+def _peak_memory(func):
+    """Пиковый объём памяти, выделенной при вызове, в килобайтах."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+@scenario('feed')
+def feed_benchmark(repeat):
+    """Память и время загрузки страницы ленты с проекцией колонок."""
+    from django.db import transaction
+
+    from posts.models import Group, Post
+
+    size = settings.COUNT_POSTS_ON_PAGE
+    lines = []
+    with transaction.atomic():
+        author = get_user_model().objects.create_user(
+            username='bench-feed', first_name='Стас', last_name='Басов'
+        )
+        group = Group.objects.create(title='Группа', slug='bench-feed')
+        posts = [
+            Post(text='Длинный текст поста. ' * 250, author=author,
+                 group=group)
+            for _ in range(size)
+        ]
+        for post in posts:
+            post.render()
+        Post.objects.bulk_create(posts)
+        querysets = (
+            ('все колонки', Post.objects.filter(author=author)
+             .select_related('author', 'group')),
+            ('for_feed()', Post.objects.filter(author=author).for_feed()),
+        )
+        for title, queryset in querysets:
+            memory = _peak_memory(lambda: list(queryset.all()[:size]))
+            timing = measure(lambda: list(queryset.all()[:size]), repeat)
+            lines.append(
+                f'{title}: {memory:.0f} КБ на страницу, {timing:.2f} мс'
+            )
+        transaction.set_rollback(True)
+    return lines
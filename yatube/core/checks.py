@@ -0,0 +1,36 @@
+"""Проверки настроек, которые Django выполняет при запуске."""
+from django.conf import settings
+from django.core.checks import Error, register
+
+CACHED_SESSION_ENGINES = {
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+}
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Сбрасываемое сразу во всех воркерах не держим в кэше процесса."""
+    if settings.SHARED_CACHE:
+        return []
+    errors = []
+    if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES:
+        errors.append(Error(
+            'Сессии в кэше требуют общего кэша.',
+            hint='Задайте DJANGO_MEMCACHED или храните сессии в базе.',
+            id='core.E001',
+        ))
+    if 'core.auth.CachedModelBackend' in settings.AUTHENTICATION_BACKENDS:
+        errors.append(Error(
+            'CachedModelBackend требует общего кэша.',
+            hint='Задайте DJANGO_MEMCACHED или используйте ModelBackend.',
+            id='core.E002',
+        ))
+    if settings.RATELIMITS:
+        errors.append(Error(
+            'RATELIMITS требует общего кэша: в кэше процесса предел '
+            'умножается на число воркеров.',
+            hint='Задайте DJANGO_MEMCACHED или оставьте RATELIMITS пустым.',
+            id='core.E003',
+        ))
+    return errors
@@ -0,0 +1,26 @@
+from importlib.util import find_spec
+
+from django.core import checks
+from django.db import models
+
+
+class LazyImageField(models.ImageField):
+    """ImageField, который не импортирует Pillow при проверках.
+
+    Стандартная проверка ``fields.E210`` импортирует ``PIL.Image`` в
+    каждой команде manage.py. Здесь достаточно убедиться, что пакет
+    установлен: сам Pillow загрузится при первой обработке картинки.
+    """
+
+    def _check_image_library_installed(self):
+        if find_spec('PIL') is not None:
+            return []
+        return [
+            checks.Error(
+                'Cannot use ImageField because Pillow is not installed.',
+                hint=('Get Pillow at https://pypi.org/project/Pillow/ '
+                      'or run command "pip install Pillow".'),
+                obj=self,
+                id='fields.E210',
+            )
+        ]
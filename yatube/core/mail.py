@@ -0,0 +1,174 @@
+import base64
+import email
+import json
+from datetime import timedelta
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+
+def serialize_message(message):
+    """Сохраняем письмо в JSON, чтобы отправить его позже."""
+    attachments = []
+    for attachment in message.attachments:
+        if isinstance(attachment, MIMEBase):
+            attachments.append({'mime': attachment.as_string()})
+            continue
+        filename, content, mimetype = attachment
+        if isinstance(content, bytes):
+            attachments.append({
+                'filename': filename,
+                'content': base64.b64encode(content).decode('ascii'),
+                'mimetype': mimetype,
+                'base64': True,
+            })
+        else:
+            attachments.append({
+                'filename': filename,
+                'content': content,
+                'mimetype': mimetype,
+            })
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': attachments,
+    })
+
+
+def _mime_attachment(data):
+    """Собираем MIMEBase из сохранённого текста вложения.
+
+    ``EmailMessage`` принимает готовые вложения только как ``MIMEBase``,
+    а разбор строки даёт обычный ``email.message.Message``.
+    """
+    parsed = email.message_from_string(data)
+    part = MIMEBase(parsed.get_content_maintype(),
+                    parsed.get_content_subtype())
+    del part['Content-Type']
+    del part['MIME-Version']
+    for name, value in parsed.items():
+        part[name] = value
+    part.set_payload(parsed.get_payload())
+    return part
+
+
+def deserialize_message(data, connection=None):
+    data = json.loads(data)
+    message = EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['headers'],
+        alternatives=[tuple(item) for item in data['alternatives']],
+        connection=connection,
+    )
+    for attachment in data['attachments']:
+        if 'mime' in attachment:
+            message.attach(_mime_attachment(attachment['mime']))
+        elif attachment.get('base64'):
+            message.attach(
+                attachment['filename'],
+                base64.b64decode(attachment['content']),
+                attachment['mimetype'],
+            )
+        else:
+            message.attach(
+                attachment['filename'],
+                attachment['content'],
+                attachment['mimetype'],
+            )
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Вместо отправки кладём письма в очередь.
+
+    Запрос, отправляющий письмо (например, сброс пароля), делает только
+    одну вставку в БД и не зависит от скорости почтового сервера.
+    Доставкой занимается команда ``send_queued_mail``.
+    """
+
+    def send_messages(self, email_messages):
+        queued = [
+            QueuedEmail(message=serialize_message(message))
+            for message in email_messages or ()
+            if isinstance(message, EmailMessage)
+        ]
+        if queued:
+            QueuedEmail.objects.bulk_create(queued)
+        return len(queued)
+
+
+def _register_failure(item, error, now, max_attempts):
+    item.attempts += 1
+    item.last_error = f'{type(error).__name__}: {error}'
+    if item.attempts >= max_attempts:
+        item.status = QueuedEmail.STATUS_DEAD
+    else:
+        delay = settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (item.attempts - 1)
+        item.next_attempt = now + timedelta(seconds=delay)
+    item.save(update_fields=(
+        'attempts', 'last_error', 'status', 'next_attempt'
+    ))
+
+
+def send_queued_mail(batch_size=None, max_attempts=None):
+    """Отправляем пачку писем через одно соединение.
+
+    Успешно отправленные письма удаляются из очереди, неудачные
+    откладываются с экспоненциальной задержкой, а после
+    ``max_attempts`` попыток остаются в очереди со статусом «Не
+    доставлено». Возвращает пару (отправлено, ошибок).
+    """
+    batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+    max_attempts = max_attempts or settings.EMAIL_QUEUE_MAX_ATTEMPTS
+    now = timezone.now()
+    batch = list(QueuedEmail.objects.filter(
+        status=QueuedEmail.STATUS_QUEUED,
+        next_attempt__lte=now,
+    )[:batch_size])
+    if not batch:
+        return 0, 0
+
+    connection = get_connection(settings.QUEUED_EMAIL_BACKEND)
+    try:
+        connection.open()
+    except Exception as error:
+        for item in batch:
+            _register_failure(item, error, now, max_attempts)
+        return 0, len(batch)
+
+    sent = []
+    failed = 0
+    try:
+        for item in batch:
+            try:
+                connection.send_messages(
+                    [deserialize_message(item.message, connection)]
+                )
+            except Exception as error:
+                _register_failure(item, error, now, max_attempts)
+                failed += 1
+            else:
+                sent.append(item.pk)
+    finally:
+        connection.close()
+    QueuedEmail.objects.filter(pk__in=sent).delete()
+    return len(sent), failed
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import SCENARIOS
+
+
+class Command(BaseCommand):
+    help = 'Запускает замеры производительности'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS))
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=200,
+            help='Сколько раз повторять замер',
+        )
+
+    def handle(self, *args, **options):
+        func = SCENARIOS[options['scenario']]
+        for line in func(options['repeat']):
+            self.stdout.write(line)
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.mail import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди пачками через одно соединение'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EMAIL_QUEUE_BATCH_SIZE,
+            help='Сколько писем отправлять через одно соединение',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Отправить только одну пачку',
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_queued_mail(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if options['once'] or not sent + failed:
+                break
+        self.stdout.write(
+            f'Отправлено писем: {total_sent}, ошибок: {total_failed}'
+        )
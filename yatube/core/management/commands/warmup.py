@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from core.warmup import STEPS, profile_imports, warmup
+
+
+class Command(BaseCommand):
+    help = 'Прогревает воркер или показывает время импорта модулей при старте'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--steps',
+            nargs='+',
+            choices=list(STEPS),
+            help='Какие шаги выполнить (по умолчанию все)',
+        )
+        parser.add_argument(
+            '--profile-imports',
+            action='store_true',
+            help='Показать время импорта модулей при загрузке приложения',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Сколько модулей показывать в отчёте об импорте',
+        )
+
+    def handle(self, *args, **options):
+        if options['profile_imports']:
+            for line in profile_imports(options['top']):
+                self.stdout.write(line)
+            return
+        report = warmup(options['steps'])
+        for name, (result, seconds) in report.items():
+            self.stdout.write(f'{name}: {result} за {seconds:.3f} с')
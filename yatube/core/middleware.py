@@ -0,0 +1,211 @@
+import mimetypes
+import os
+import re
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import (get_max_age, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import http_date
+from django.utils.text import compress_sequence, compress_string
+from django.views.static import was_modified_since
+
+from .ratelimit import check
+from .views import too_many_requests
+
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.')
+ENCODINGS = (
+    ('.br', re.compile(r'\bbr\b')),
+    ('.gz', re.compile(r'\bgzip\b')),
+)
+CONTENT_ENCODINGS = {'.br': 'br', '.gz': 'gzip'}
+ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
+COMPRESSIBLE_TYPE_RE = re.compile(
+    r'^(text/|application/(json|javascript|xml|rss\+xml|atom\+xml))'
+)
+
+
+class PrecompressedStaticMiddleware:
+    """Отдаёт собранную статику, выбирая заранее сжатую копию файла.
+
+    Файлы с хэшем в имени (ManifestStaticFilesStorage) кэшируются
+    браузером «навсегда», остальные — на ``STATIC_MAX_AGE`` секунд.
+    Запросы к отсутствующим в STATIC_ROOT файлам идут дальше по цепочке.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (settings.STATIC_ROOT
+                and request.method in ('GET', 'HEAD')
+                and request.path_info.startswith(settings.STATIC_URL)):
+            response = self.serve(request)
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request):
+        name = request.path_info[len(settings.STATIC_URL):]
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        served, encoding = path, None
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        for suffix, pattern in ENCODINGS:
+            if (pattern.search(accept_encoding)
+                    and os.path.isfile(path + suffix)):
+                served, encoding = path + suffix, CONTENT_ENCODINGS[suffix]
+                break
+
+        stat = os.stat(served)
+        if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime,
+            stat.st_size,
+        ):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(path)
+            response = FileResponse(
+                open(served, 'rb'),
+                content_type=content_type or 'application/octet-stream',
+            )
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if HASHED_NAME_RE.search(os.path.basename(name)):
+            response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = (
+                f'public, max-age={settings.STATIC_MAX_AGE}'
+            )
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжимает ответы gzip, в том числе потоковые.
+
+    В отличие от ``django.middleware.gzip.GZipMiddleware``:
+
+    * порог размера задаётся ``GZIP_MIN_LENGTH``;
+    * сжимаются только текстовые типы содержимого;
+    * сжатое тело кэшируемых ответов (с ``max-age``, например от
+      ``cache_page``) сохраняется в кэше по хэшу содержимого, и
+      повторные отдачи той же страницы не сжимаются заново.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not COMPRESSIBLE_TYPE_RE.match(response.get('Content-Type', '')):
+            return response
+        if (not response.streaming
+                and len(response.content) < settings.GZIP_MIN_LENGTH):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if not ACCEPTS_GZIP_RE.search(accept_encoding):
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_sequence(
+                response.streaming_content
+            )
+            del response['Content-Length']
+        else:
+            compressed = self.compress(response)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'gzip'
+        return response
+
+    def compress(self, response):
+        max_age = get_max_age(response)
+        if not max_age or 'private' in response.get('Cache-Control', ''):
+            return compress_string(response.content)
+        key = 'gzip:' + md5(response.content).hexdigest()
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = compress_string(response.content)
+            cache.set(key, compressed, max_age)
+        return compressed
+
+
+class AnonymousPageCacheMiddleware(MiddlewareMixin):
+    """Полностраничный кэш для анонимных посетителей.
+
+    Страницы из ``ANONYMOUS_PAGE_CACHE_VIEWS`` для гостей одинаковы,
+    поэтому кэшируются по одному ключу на адрес со схемой и хостом,
+    без Vary: Cookie. Авторизованные пользователи получают страницу,
+    собранную из закэшированных фрагментов (тег ``{% cache %}``
+    в шаблонах) и персональных частей: шапки, кнопки подписки, формы
+    комментария. Стоит в MIDDLEWARE выше SessionMiddleware и
+    CsrfViewMiddleware, чтобы видеть выставленные ими cookie.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        view_name = request.resolver_match.view_name
+        if view_name not in settings.ANONYMOUS_PAGE_CACHE_VIEWS:
+            return None
+        if (settings.SESSION_COOKIE_NAME in request.COOKIES
+                and request.user.is_authenticated):
+            return None
+        # Схема и хост входят в ключ: в странице есть абсолютные ссылки.
+        key = 'anonymous-page:' + md5(
+            request.build_absolute_uri().encode()
+        ).hexdigest()
+        response = cache.get(key)
+        if response is not None:
+            return response
+        request._anonymous_page_cache_key = key
+        return None
+
+    def process_response(self, request, response):
+        key = getattr(request, '_anonymous_page_cache_key', None)
+        if (key is None
+                or response.status_code != 200
+                or response.streaming
+                or response.cookies
+                or 'private' in response.get('Cache-Control', '')):
+            return response
+        patch_cache_control(
+            response, public=True,
+            max_age=settings.ANONYMOUS_PAGE_CACHE_TIMEOUT,
+        )
+        cache.set(key, response, settings.ANONYMOUS_PAGE_CACHE_TIMEOUT)
+        return response
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    """Отвечает 429 на запросы сверх правил ``RATELIMITS``.
+
+    Стоит после ``AnonymousPageCacheMiddleware``: гостевые страницы
+    из кэша отдаются без проверки, считаются только запросы,
+    которые доходят до представления.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        retry_after = check(request, request.resolver_match.view_name)
+        if retry_after:
+            return too_many_requests(request, retry_after)
+        return None
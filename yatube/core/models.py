@@ -0,0 +1,43 @@
+from django.db import models
+from django.utils import timezone
+
+
+class QueuedEmail(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'В очереди'),
+        (STATUS_DEAD, 'Не доставлено'),
+    )
+
+    message = models.TextField(verbose_name='Сообщение (JSON)')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток отправки'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата постановки в очередь'
+    )
+    next_attempt = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Следующая попытка'
+    )
+
+    class Meta:
+        ordering = ('next_attempt', 'pk')
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt']),
+        ]
+
+    def __str__(self):
+        return f'{self.pk} ({self.get_status_display()})'
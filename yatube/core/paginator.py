@@ -0,0 +1,96 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import (Count, F, Func, IntegerField, Subquery,
+                              Window)
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор для больших таблиц без COUNT(*) на каждый запрос.
+
+    Для нефильтрованной таблицы в PostgreSQL берём оценку из статистики
+    планировщика, в остальных случаях точное значение кэшируется
+    на ``ESTIMATED_COUNT_CACHE_TIMEOUT`` секунд.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+        estimate = self._estimate(queryset)
+        if estimate is not None:
+            return estimate
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = 'paginator-count:' + md5(
+            f'{queryset.db}:{sql}:{params}'.encode()
+        ).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.ESTIMATED_COUNT_CACHE_TIMEOUT)
+        return count
+
+    def _estimate(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < settings.ESTIMATED_COUNT_THRESHOLD:
+            return None
+        return row[0]
+
+
+class WindowCountPaginator(Paginator):
+    """Пагинатор, который получает число строк вместе со страницей.
+
+    Строки страницы выбираются с ``COUNT(*) OVER ()``, а там, где Django
+    не поддерживает оконные функции, — с некоррелированным подзапросом
+    COUNT. Отдельный запрос COUNT не нужен. Для пустой страницы
+    работает как обычный ``Paginator``.
+    """
+    count_annotation = 'paginator_total_count'
+
+    def get_page(self, number):
+        queryset = self.object_list
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        if number < 1 or self.orphans or not hasattr(queryset, 'query'):
+            return super().get_page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(queryset.annotate(**{
+            self.count_annotation: self._count_expression(queryset),
+        })[bottom:bottom + self.per_page])
+        if rows:
+            self.__dict__['count'] = getattr(rows[0], self.count_annotation)
+        elif number == 1 and self.allow_empty_first_page:
+            self.__dict__['count'] = 0
+        else:
+            return super().get_page(number)
+        return self._get_page(rows, number, self)
+
+    def _count_expression(self, queryset):
+        if connections[queryset.db].features.supports_over_clause:
+            return Window(Count('pk'))
+        # Подзапрос не зависит от строки, база вычисляет его один раз.
+        return Subquery(
+            queryset.order_by().annotate(
+                total=Func(F('pk'), function='COUNT')
+            ).values('total'),
+            output_field=IntegerField(),
+        )
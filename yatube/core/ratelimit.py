@@ -0,0 +1,88 @@
+"""Ограничение частоты запросов к представлениям.
+
+Правила задаются в ``RATELIMITS`` по имени представления::
+
+    RATELIMITS = {
+        'posts:add_comment': {'rate': (10, 60), 'methods': ['POST']},
+        'posts:profile': {'rate': (60, 60), 'anonymous': True},
+    }
+
+``rate`` — ёмкость ведра и период в секундах, за который оно наполняется
+целиком; ``methods`` — ограничиваемые методы (по умолчанию все);
+``anonymous`` — ограничивать только гостей. Вёдра считаются отдельно
+для каждого пользователя, а для гостей — для каждого IP.
+
+Ведро хранится в кэше одним числом — временем (в мс), когда оно снова
+станет полным (алгоритм GCRA). Запрос сдвигает это время атомарным
+``cache.incr()`` на интервал одного токена, поэтому обычный запрос
+стоит двух обращений к кэшу, а одновременные запросы не затирают друг
+друга. Только сброс наполнившегося ведра делается обычным ``set()``:
+в худшем случае пара одновременных запросов после простоя пройдёт
+сверх ёмкости.
+
+Вёдра считаются верно, только если кэш общий для всех воркеров
+(memcached, ``SHARED_CACHE``): в ``LocMemCache`` у каждого процесса
+свои вёдра, и предел умножается на число воркеров. Поэтому правила
+без общего кэша не проходят проверку ``core.E003``.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+KEY = 'ratelimit:{}:{}'
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def client_key(request):
+    user = request.user
+    if user.is_authenticated:
+        return f'user:{user.pk}'
+    return 'ip:' + request.META.get(settings.RATELIMIT_IP_META, '')
+
+
+def hit(name, ident, capacity, period):
+    """Забираем токен из ведра.
+
+    Возвращаем 0, если запрос разрешён, иначе число секунд до
+    следующего токена.
+    """
+    key = KEY.format(name, ident)
+    interval = period * 1000 // capacity
+    timeout = period + 1
+    now = _now_ms()
+    try:
+        tat = cache.incr(key, interval)
+    except ValueError:
+        if cache.add(key, now + interval, timeout):
+            return 0
+        tat = cache.incr(key, interval)
+    if tat <= now + interval:
+        # Ведро успело наполниться: отсчёт начинается заново.
+        cache.set(key, now + interval, timeout)
+        return 0
+    excess = tat - now - capacity * interval
+    if excess > 0:
+        # Отказ токен не тратит.
+        cache.decr(key, interval)
+        return math.ceil(excess / 1000)
+    cache.touch(key, timeout)
+    return 0
+
+
+def check(request, name):
+    """Проверяем запрос по правилу ``RATELIMITS[name]``, если оно есть."""
+    rule = settings.RATELIMITS.get(name)
+    if rule is None:
+        return 0
+    methods = rule.get('methods')
+    if methods and request.method not in methods:
+        return 0
+    if rule.get('anonymous') and request.user.is_authenticated:
+        return 0
+    capacity, period = rule['rate']
+    return hit(name, client_key(request), capacity, period)
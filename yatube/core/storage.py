@@ -0,0 +1,52 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.ico', '.txt', '.html', '.json', '.xml', '.map',
+)
+
+
+def gzip_compress(data):
+    # mtime=0, чтобы одинаковые файлы давали одинаковый архив.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хэшем в имени и заранее сжатыми копиями.
+
+    При collectstatic рядом с каждым текстовым файлом сохраняются
+    ``.gz`` и, если установлен пакет brotli, ``.br``. Отдаёт их
+    ``core.middleware.PrecompressedStaticMiddleware``.
+    """
+
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            data = original.read()
+        variants = [('.gz', gzip_compress)]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress))
+        for suffix, compressor in variants:
+            compressed = compressor(data)
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
@@ -0,0 +1,43 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_TASKS_WORKERS,
+            thread_name_prefix='yatube-task',
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась с ошибкой',
+                         func.__name__)
+    finally:
+        connections.close_all()
+
+
+def dispatch(func, *args, **kwargs):
+    """Выполняем функцию в фоновом потоке после фиксации транзакции.
+
+    При ``TASKS_ALWAYS_EAGER`` функция выполняется сразу, в текущем
+    потоке: так удобнее в тестах и при запуске из консоли.
+    """
+    if settings.TASKS_ALWAYS_EAGER:
+        return func(*args, **kwargs)
+    transaction.on_commit(
+        lambda: _get_executor().submit(_run, func, args, kwargs)
+    )
@@ -0,0 +1,86 @@
+"""Загрузчики шаблонов, убирающие лишние пробелы при компиляции.
+
+Отступы и пустые строки удаляются один раз при загрузке исходника,
+поэтому с cached.Loader минификация ничего не стоит на запросе.
+"""
+import re
+from fnmatch import fnmatch
+
+from django.conf import settings
+from django.template.loaders import app_directories, filesystem
+
+PRESERVE_RE = re.compile(
+    r'(<(pre|textarea|script)\b.*?</\2>)', re.IGNORECASE | re.DOTALL
+)
+TAG_RE = re.compile(r'\{%\s*(\w+)\b[^%]*%\}')
+TAG_LINE_RE = re.compile(r'(?:\{%[^%]*%\})+')
+# Теги, которые сами ничего не выводят: перевод строки после них
+# можно убрать.
+SILENT_TAGS = {
+    'block', 'endblock', 'extends', 'load', 'if', 'elif', 'else', 'endif',
+    'for', 'empty', 'endfor', 'with', 'endwith', 'cache', 'endcache',
+    'thumbnail', 'endthumbnail', 'comment', 'endcomment',
+}
+
+
+def _is_silent_line(line):
+    # Строка должна состоять только из «немых» тегов: текст после
+    # {% if %} в той же строке выводится, и перевод строки нужен.
+    return TAG_LINE_RE.fullmatch(line) is not None and all(
+        name in SILENT_TAGS for name in TAG_RE.findall(line)
+    )
+
+
+def _join_lines(text):
+    lines = [line.strip() for line in text.splitlines()]
+    result = []
+    for line in lines:
+        if not line:
+            continue
+        result.append(line)
+        if not _is_silent_line(line):
+            result.append('\n')
+    return ''.join(result).rstrip('\n')
+
+
+def minify_html(source):
+    """Убираем отступы, хвостовые пробелы и пустые строки.
+
+    Содержимое <pre>, <textarea> и <script> не меняется.
+    Перевод строки между строками разметки сохраняется, поэтому пробел
+    между строчными элементами не пропадает; он убирается только после
+    строк, состоящих из одних «немых» тегов шаблона.
+    """
+    parts = PRESERVE_RE.split(source)
+    result = []
+    # split() с двумя группами отдаёт: текст, блок, имя тега, текст, ...
+    for index in range(0, len(parts), 3):
+        text = _join_lines(parts[index])
+        if parts[index][:1].isspace() and text:
+            text = '\n' + text
+        if parts[index][-1:].isspace() and text:
+            text += '\n'
+        result.append(text)
+        if index + 1 < len(parts):
+            result.append(parts[index + 1])
+    return ''.join(result)
+
+
+class MinifyingLoaderMixin:
+    def get_contents(self, origin):
+        contents = super().get_contents(origin)
+        name = origin.template_name or ''
+        if name.endswith('.html') and not any(
+            fnmatch(name, pattern)
+            for pattern in settings.TEMPLATE_MINIFY_EXCLUDE
+        ):
+            contents = minify_html(contents)
+        return contents
+
+
+class FilesystemLoader(MinifyingLoaderMixin, filesystem.Loader):
+    pass
+
+
+class AppDirectoriesLoader(MinifyingLoaderMixin, app_directories.Loader):
+    pass
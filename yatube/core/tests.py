@@ -1,6 +1,41 @@
+import gzip
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from email.mime.text import MIMEText
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.auth import CachedModelBackend
+from core.checks import check_shared_cache
+from core.mail import send_queued_mail
+from core.middleware import CompressionMiddleware
+from core.paginator import WindowCountPaginator
+from core.ratelimit import hit
+from core.models import QueuedEmail
+from core.template_loaders import minify_html
+from core.warmup import (iter_template_names, prime_caches,
+                         profile_imports, warm_templates, warmup)
+from posts.models import Post
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
 
 
 class ViewTestClass(TestCase):
@@ -10,3 +45,413 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    QUEUED_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class QueuedEmailTests(TestCase):
+    def test_send_mail_only_enqueues(self):
+        """Отправка письма только ставит его в очередь"""
+        mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(QueuedEmail.objects.count(), 1)
+
+    def test_queue_is_delivered_in_batches(self):
+        """Очередь доставляется пачками и очищается"""
+        for i in range(3):
+            mail.send_mail(f'Тема {i}', 'Текст', 'from@yatube.ru',
+                           ['to@yatube.ru'])
+        self.assertEqual(send_queued_mail(batch_size=2), (2, 0))
+        self.assertEqual(send_queued_mail(batch_size=2), (1, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].subject, 'Тема 0')
+        self.assertFalse(QueuedEmail.objects.exists())
+
+    def test_attachments_survive_queue(self):
+        """Вложения, в том числе готовые MIME-части, доставляются"""
+        message = mail.EmailMessage('Тема', 'Текст', 'from@yatube.ru',
+                                    ['to@yatube.ru'])
+        message.attach('data.bin', b'\x00\x01', 'application/octet-stream')
+        message.attach(MIMEText('Часть', 'plain', 'utf-8'))
+        self.assertEqual(message.send(), 1)
+        self.assertEqual(mail.get_connection().send_messages(
+            [message, 'не письмо']
+        ), 1)
+        self.assertEqual(send_queued_mail(), (2, 0))
+        sent = mail.outbox[0]
+        self.assertEqual(sent.attachments[0],
+                         ('data.bin', b'\x00\x01',
+                          'application/octet-stream'))
+        part = sent.attachments[1]
+        self.assertEqual(part.get_content_type(), 'text/plain')
+        self.assertEqual(part.get_payload(decode=True).decode(), 'Часть')
+
+    def test_password_reset_is_queued(self):
+        """Письмо сброса пароля уходит в очередь"""
+        get_user_model().objects.create_user(
+            username='reset', email='reset@yatube.ru', password='pass'
+        )
+        self.client.post('/auth/password_reset/',
+                         {'email': 'reset@yatube.ru'})
+        self.assertEqual(QueuedEmail.objects.count(), 1)
+        send_queued_mail()
+        self.assertEqual(mail.outbox[0].to, ['reset@yatube.ru'])
+
+    @override_settings(QUEUED_EMAIL_BACKEND='core.tests.FailingEmailBackend',
+                       EMAIL_QUEUE_RETRY_DELAY=0)
+    def test_failed_mail_goes_to_dead_letter(self):
+        """После исчерпания попыток письмо помечается недоставленным"""
+        mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+        for _ in range(3):
+            send_queued_mail(max_attempts=3)
+        item = QueuedEmail.objects.get()
+        self.assertEqual(item.status, QueuedEmail.STATUS_DEAD)
+        self.assertEqual(item.attempts, 3)
+        self.assertIn('SMTP недоступен', item.last_error)
+
+
+class WarmupTests(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_all_templates_are_compiled(self):
+        """Прогрев компилирует шаблоны проекта и приложений"""
+        names = list(iter_template_names())
+        self.assertIn('posts/index.html', names)
+        self.assertIn('admin/base.html', names)
+        self.assertEqual(warm_templates(), len(names))
+
+    def test_warmup_steps(self):
+        """Прогрев импортирует модули, строит URL и заполняет кэш"""
+        report = warmup()
+        self.assertEqual(set(report), {'imports', 'urls', 'templates',
+                                       'caches'})
+        self.assertGreater(report['urls'][0], 0)
+        self.assertEqual(report['caches'][0], 2)
+
+    @override_settings(WARMUP_BASE_URL='http://testserver')
+    def test_prime_caches_fills_page_cache(self):
+        """Прогрев проходит через middleware и заполняет кэш страниц"""
+        prime_caches()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('posts:index'), {'page': 2})
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_imports(self):
+        """Отчёт о времени импорта содержит модули проекта"""
+        report = '\n'.join(profile_imports(top=100))
+        self.assertIn('yatube.wsgi', report)
+
+    def test_templates_benchmark(self):
+        """Замер рендера шаблонов выводит строку на каждый шаблон"""
+        out = StringIO()
+        call_command('benchmark', 'templates', repeat=1, stdout=out)
+        self.assertIn('posts/profile.html', out.getvalue())
+
+    def test_feed_benchmark(self):
+        """Замер ленты не оставляет данных в базе"""
+        out = StringIO()
+        call_command('benchmark', 'feed', repeat=1, stdout=out)
+        self.assertIn('for_feed()', out.getvalue())
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class LazyImageStackTests(TestCase):
+    def test_check_does_not_import_pillow(self):
+        """manage.py check не загружает Pillow"""
+        script = (
+            'import os, sys, django;'
+            'os.environ.setdefault("DJANGO_SETTINGS_MODULE", '
+            '"yatube.settings");'
+            'django.setup();'
+            'from django.core.management import call_command;'
+            'call_command("check");'
+            'print("PIL" in sys.modules)'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=settings.BASE_DIR,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip().splitlines()[-1], 'False')
+
+
+STATIC_SOURCE = tempfile.mkdtemp(dir=settings.BASE_DIR)
+STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+STYLES = b'body { color: black; }\n' * 100
+
+
+@override_settings(
+    STATICFILES_DIRS=[STATIC_SOURCE],
+    STATIC_ROOT=STATIC_ROOT,
+    STATICFILES_FINDERS=[
+        'django.contrib.staticfiles.finders.FileSystemFinder',
+    ],
+    STATICFILES_STORAGE='core.storage.CompressedManifestStaticFilesStorage',
+)
+class PrecompressedStaticTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(STATIC_SOURCE, 'css'), exist_ok=True)
+        with open(os.path.join(STATIC_SOURCE, 'css', 'site.css'), 'wb') as f:
+            f.write(STYLES)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(STATIC_SOURCE, ignore_errors=True)
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.url = staticfiles_storage.url('css/site.css')
+
+    def test_collectstatic_fingerprints_and_compresses(self):
+        """collectstatic добавляет хэш в имя и сохраняет .gz копию"""
+        self.assertRegex(self.url, r'/static/css/site\.[0-9a-f]{12}\.css$')
+        name = staticfiles_storage.stored_name('css/site.css')
+        self.assertTrue(staticfiles_storage.exists(name + '.gz'))
+
+    def test_middleware_serves_gzip_variant(self):
+        """Сжатая копия отдаётся с долгим кэшированием и Vary"""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), STYLES)
+
+    def test_middleware_serves_plain_file(self):
+        """Без Accept-Encoding отдаётся исходный файл"""
+        response = self.client.get('/static/css/site.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), STYLES)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+
+class MinifyTests(TestCase):
+    def test_minify_html(self):
+        """Отступы и пустые строки убираются, <pre> не трогается"""
+        source = (
+            '<ul>\n  {% for i in items %}\n    <li>{{ i }}</li>\n'
+            '  {% endfor %}\n</ul>\n\n<pre>\n  код\n</pre>\n'
+        )
+        self.assertEqual(
+            minify_html(source),
+            '<ul>\n{% for i in items %}<li>{{ i }}</li>\n'
+            '{% endfor %}</ul>\n<pre>\n  код\n</pre>',
+        )
+
+    def test_line_with_text_keeps_newline(self):
+        """Перевод строки остаётся после строки с тегом и текстом"""
+        source = (
+            '{% if a %}<span>a</span>{% endif %}\n<span>b</span>\n'
+            '{% endif %}{% if b %}\nc\n{% endif %}\n'
+        )
+        self.assertEqual(
+            minify_html(source),
+            '{% if a %}<span>a</span>{% endif %}\n<span>b</span>\n'
+            '{% endif %}{% if b %}c\n{% endif %}\n',
+        )
+
+    def test_rendered_page_has_no_indentation(self):
+        """Страницы отдаются без отступов шаблонов"""
+        response = self.client.get('/about/author/')
+        self.assertNotIn('\n  ', response.content.decode())
+
+
+@override_settings(GZIP_MIN_LENGTH=100)
+class CompressionTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = CompressionMiddleware(lambda request: None)
+
+    def tearDown(self):
+        cache.clear()
+
+    def process(self, response, encoding='gzip'):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING=encoding)
+        return self.middleware.process_response(request, response)
+
+    def test_small_response_is_not_compressed(self):
+        """Короткие ответы не сжимаются"""
+        response = self.process(HttpResponse('a' * 50))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_response_is_compressed(self):
+        """Потоковый ответ сжимается по частям"""
+        response = self.process(
+            StreamingHttpResponse(iter([b'a' * 1000, b'b' * 1000]))
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), b'a' * 1000 + b'b' * 1000)
+
+    def test_cacheable_response_is_compressed_once(self):
+        """Сжатое тело кэшируемой страницы берётся из кэша"""
+        content = 'страница ' * 100
+        response = HttpResponse(content)
+        response['Cache-Control'] = 'max-age=20'
+        compressed = self.process(response).content
+        cached = HttpResponse(content)
+        cached['Cache-Control'] = 'max-age=20'
+        with mock.patch('core.middleware.compress_string') as compress:
+            self.assertEqual(self.process(cached).content, compressed)
+            compress.assert_not_called()
+        self.assertEqual(gzip.decompress(compressed).decode(), content)
+
+
+@override_settings(
+    SHARED_CACHE=True,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    AUTHENTICATION_BACKENDS=['core.auth.CachedModelBackend'],
+)
+class CachedAuthTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='StasBasov', password='old-password'
+        )
+        self.client.force_login(self.user)
+        self.url = reverse('about:author')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_request_does_not_query_session_and_user(self):
+        """Сессия и пользователь берутся из кэша"""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'StasBasov')
+
+    def test_user_is_invalidated_on_save(self):
+        """Смена пароля сбрасывает пользователя в кэше"""
+        self.client.get(self.url)
+        self.user.set_password('new-password')
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'StasBasov')
+
+    def test_user_is_invalidated_on_logout(self):
+        """Выход из аккаунта сбрасывает пользователя в кэше"""
+        self.client.get(self.url)
+        self.client.logout()
+        with self.assertNumQueries(1):
+            CachedModelBackend().get_user(self.user.pk)
+
+    def test_inactive_user_is_not_returned(self):
+        """Заблокированный пользователь не авторизуется"""
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save(update_fields=('is_active',))
+        self.assertIsNone(CachedModelBackend().get_user(self.user.pk))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_requires_shared_cache(self):
+        """Без общего кэша настройки кэширования не проходят проверку"""
+        errors = check_shared_cache(None)
+        self.assertEqual([error.id for error in errors],
+                         ['core.E001', 'core.E002'])
+        with override_settings(RATELIMITS={'posts:follow': {'rate': (1, 1)}}):
+            errors = check_shared_cache(None)
+        self.assertEqual(errors[-1].id, 'core.E003')
+
+    def test_queries_benchmark(self):
+        """Замер показывает запросы на страницу для обеих конфигураций"""
+        out = StringIO()
+        call_command('benchmark', 'queries', repeat=2, stdout=out)
+        self.assertIn('CachedModelBackend: 0.0', out.getvalue())
+
+
+class WindowCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = get_user_model().objects.bulk_create([
+            get_user_model()(username=f'user{i}') for i in range(5)
+        ])
+
+    def test_page_and_count_in_one_query(self):
+        """Страница и общее число строк получаются одним запросом"""
+        paginator = WindowCountPaginator(
+            get_user_model().objects.order_by('pk'), 2
+        )
+        with self.assertNumQueries(1):
+            page = paginator.get_page('2')
+            self.assertEqual(paginator.count, 5)
+            self.assertEqual(paginator.num_pages, 3)
+            self.assertEqual([user.username for user in page],
+                             ['user2', 'user3'])
+
+    def test_out_of_range_page(self):
+        """Неверный номер страницы ведёт себя как у Paginator"""
+        paginator = WindowCountPaginator(
+            get_user_model().objects.order_by('pk'), 2
+        )
+        self.assertEqual(paginator.get_page('10').number, 3)
+        self.assertEqual(paginator.get_page('abc').number, 1)
+        empty = WindowCountPaginator(get_user_model().objects.none(), 2)
+        self.assertEqual(len(empty.get_page(1)), 0)
+        self.assertEqual(empty.count, 0)
+
+
+@override_settings(RATELIMITS={
+    'posts:add_comment': {'rate': (2, 60), 'methods': ['POST']},
+    'posts:profile': {'rate': (1, 60), 'anonymous': True},
+})
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username='StasBasov')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_token_bucket(self):
+        """Ведро пропускает ёмкость сразу и пополняется со временем"""
+        with mock.patch('core.ratelimit.time.time', return_value=1000.0):
+            self.assertEqual([hit('view', 'ip:1', 3, 60) for _ in range(3)],
+                             [0, 0, 0])
+            self.assertEqual(hit('view', 'ip:1', 3, 60), 20)
+            self.assertEqual(hit('view', 'ip:1', 3, 60), 20)
+            self.assertEqual(hit('view', 'ip:2', 3, 60), 0)
+        with mock.patch('core.ratelimit.time.time', return_value=1020.0):
+            self.assertEqual(hit('view', 'ip:1', 3, 60), 0)
+            self.assertEqual(hit('view', 'ip:1', 3, 60), 20)
+        with mock.patch('core.ratelimit.time.time', return_value=2000.0):
+            self.assertEqual([hit('view', 'ip:1', 3, 60) for _ in range(4)],
+                             [0, 0, 0, 20])
+
+    def test_middleware_returns_429(self):
+        """Запросы сверх правила получают 429 с Retry-After"""
+        post = Post.objects.create(text='Пост', author=self.user)
+        url = reverse('posts:add_comment', args=(post.pk,))
+        self.client.force_login(self.user)
+        for _ in range(2):
+            response = self.client.post(url, {'text': 'Комментарий'})
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.client.post(url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code,
+                         HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(post.comments.count(), 2)
+        self.assertNotEqual(self.client.get(url).status_code,
+                            HTTPStatus.TOO_MANY_REQUESTS)
+
+    def test_anonymous_rule_skips_users(self):
+        """Правило только для гостей не ограничивает пользователей"""
+        url = reverse('posts:profile', args=(self.user.username,))
+        self.assertEqual(self.client.get(url, {'page': 1}).status_code,
+                         HTTPStatus.OK)
+        self.assertEqual(self.client.get(url, {'page': 2}).status_code,
+                         HTTPStatus.TOO_MANY_REQUESTS)
+        self.client.force_login(self.user)
+        for page in (3, 4):
+            self.assertEqual(self.client.get(url, {'page': page}).status_code,
+                             HTTPStatus.OK)
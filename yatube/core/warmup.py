@@ -0,0 +1,190 @@
+"""Прогрев воркера перед первыми запросами.
+
+Шаги прогрева:
+
+* ``imports`` — импорт тяжёлых модулей из ``WARMUP_IMPORTS``;
+* ``urls`` — построение резолвера для всех пространств имён URL;
+* ``templates`` — компиляция всех шаблонов в cached.Loader;
+* ``caches`` — заполнение горячих ключей кэша (первые страницы ленты
+  вместе с кэшем страниц для гостей, список групп).
+
+Первые два шага не обращаются к БД и могут выполняться в
+``CoreConfig.ready()``.
+"""
+import importlib
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+
+def import_heavy_modules():
+    imported = 0
+    for name in settings.WARMUP_IMPORTS:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            logger.warning('Прогрев: модуль %s не найден', name)
+        else:
+            imported += 1
+    return imported
+
+
+def resolve_urls():
+    """Заполняем таблицы резолвера, чтобы первый reverse() был быстрым."""
+    resolver = get_resolver()
+    count = len(resolver.reverse_dict)
+    for namespace in settings.WARMUP_URL_NAMESPACES:
+        _, namespace_resolver = resolver.namespace_dict[namespace]
+        count += len(namespace_resolver.reverse_dict)
+    return count
+
+
+def iter_template_names():
+    """Имена всех шаблонов из TEMPLATES['DIRS'] и каталогов приложений."""
+    dirs = []
+    for config in settings.TEMPLATES:
+        dirs.extend(config.get('DIRS', []))
+    dirs.extend(get_app_template_dirs('templates'))
+    seen = set()
+    for template_dir in dirs:
+        for root, _, files in os.walk(template_dir):
+            for filename in files:
+                if not filename.endswith(('.html', '.txt', '.xml')):
+                    continue
+                name = os.path.relpath(
+                    os.path.join(root, filename), template_dir
+                ).replace(os.sep, '/')
+                if name not in seen:
+                    seen.add(name)
+                    yield name
+
+
+def warm_templates():
+    """Компилируем все шаблоны, чтобы они попали в cached.Loader."""
+    compiled = 0
+    for engine in engines.all():
+        for name in iter_template_names():
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                # Например, шаблоны приложений, которые не установлены.
+                logger.debug('Шаблон %s не скомпилирован', name)
+            else:
+                compiled += 1
+    return compiled
+
+
+def prime_caches():
+    """Заполняем горячие ключи кэша: список групп и первые страницы ленты.
+
+    Запросы гостя к ленте проходят через обработчик со всеми middleware,
+    без сети, поэтому кэш страниц для гостей, фрагменты шаблонов и числа
+    реакций заполняются так же, как при обычном запросе по адресу
+    ``WARMUP_BASE_URL``.
+    """
+    from django.test import RequestFactory
+    from posts.caching import get_group_choices
+
+    get_group_choices()
+    base_url = urlsplit(settings.WARMUP_BASE_URL)
+    factory = RequestFactory(HTTP_HOST=base_url.netloc)
+    handler = BaseHandler()
+    handler.load_middleware()
+    primed = 0
+    for page in range(1, settings.WARMUP_INDEX_PAGES + 1):
+        response = handler.get_response(factory.get(
+            reverse('posts:index'), {'page': page},
+            secure=base_url.scheme == 'https',
+        ))
+        if response.status_code == 200:
+            primed += 1
+        else:
+            logger.warning('Прогрев: страница %s вернула %s',
+                           page, response.status_code)
+    return primed
+
+
+STEPS = {
+    'imports': import_heavy_modules,
+    'urls': resolve_urls,
+    'templates': warm_templates,
+    'caches': prime_caches,
+}
+
+
+def warmup(steps=None):
+    """Выполняем шаги прогрева, возвращаем {шаг: (результат, секунды)}."""
+    report = {}
+    for name in steps or STEPS:
+        started = time.perf_counter()
+        result = STEPS[name]()
+        report[name] = (result, time.perf_counter() - started)
+        logger.info('Прогрев %s: %s за %.3f с', name, result,
+                    report[name][1])
+    return report
+
+
+IMPORTTIME_LINE = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$'
+)
+
+
+def profile_imports(top=20):
+    """Замеряем время импорта модулей при старте воркера.
+
+    Запускаем отдельный интерпретатор с ``-X importtime``, который
+    загружает WSGI-приложение, и возвращаем строки отчёта: самые
+    долгие модули и суммарное время по пакетам верхнего уровня.
+    """
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'yatube.settings'
+        ),
+        DJANGO_WARMUP='False',
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import yatube.wsgi'],
+        cwd=settings.BASE_DIR,
+        env=env,
+        stderr=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        universal_newlines=True,
+        check=True,
+    )
+    modules = []
+    packages = defaultdict(int)
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        own, cumulative, _, name = match.groups()
+        modules.append((int(cumulative), int(own), name))
+        packages[name.split('.')[0]] += int(own)
+    total = sum(own for _, own, _ in modules)
+    lines = [f'Всего на импорт: {total / 1000:.1f} мс', '',
+             'Самые долгие модули (с зависимостями / собственное время):']
+    for cumulative, own, name in sorted(modules, reverse=True)[:top]:
+        lines.append(
+            f'  {cumulative / 1000:8.1f} мс {own / 1000:8.1f} мс  {name}'
+        )
+    lines += ['', 'По пакетам:']
+    for name, own in sorted(
+        packages.items(), key=lambda item: item[1], reverse=True
+    )[:top]:
+        lines.append(f'  {own / 1000:8.1f} мс  {name}')
+    return lines
@@ -1,9 +1,87 @@
+from datetime import datetime, time, timedelta
+
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.utils import timezone
+
+from core.paginator import EstimatedCountPaginator
+from core.tasks import dispatch
+from . import moderation
+from .caching import get_group_choices
+from .models import Post, Group, Comment, Follow, PendingPurge
+from .purge import schedule_group_deletion, schedule_user_deletion
+
+User = get_user_model()
+
+
+def group_choices_with_empty():
+    return [('', '---------')] + get_group_choices()
+
+
+class PostActionForm(ActionForm):
+    target_group = forms.TypedChoiceField(
+        label='Группа',
+        choices=group_choices_with_empty,
+        coerce=int,
+        empty_value=None,
+        required=False,
+    )
+    date_from = forms.DateField(label='С даты', required=False)
+    date_to = forms.DateField(label='По дату', required=False)
+
+
+class ModerationMixin:
+    """Запуск массовых операций сразу или в фоне."""
+
+    def run_moderation(self, request, func, *args):
+        if settings.MODERATION_IN_BACKGROUND:
+            dispatch(func, *args)
+            self.message_user(request, 'Операция запущена в фоне')
+            return
+        result = func(*args)
+        self.message_user(request, f'Обработано строк: {result}')
 
-from .models import Post, Group, Comment, Follow
+    def get_action_params(self, request):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        form.is_valid()
+        return form.cleaned_data
 
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Стандартное удаление загружает и удаляет объекты по одному.
+        actions.pop('delete_selected', None)
+        return actions
 
-class PostAdmin(admin.ModelAdmin):
+
+class SoftDeleteMixin:
+    """Удаление из админки только скрывает объект.
+
+    Зависимые строки удаляются потом, в фоне (см. ``posts.purge``).
+    """
+    schedule_deletion = None
+
+    def delete_model(self, request, obj):
+        self.schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.schedule_deletion(obj)
+
+    def get_deleted_objects(self, objs, request):
+        # Не перебираем все зависимые объекты ради страницы подтверждения.
+        return [str(obj) for obj in objs], {}, set(), []
+
+
+def to_datetime(value):
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
+class PostAdmin(ModerationMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,23 +90,72 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    ordering = ('-pk',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    action_form = PostActionForm
+    actions = ('delete_posts', 'move_to_group', 'purge_by_date')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if db_field.name == 'group':
+            # Без этого каждая строка list_editable заново выбирает
+            # все группы из БД.
+            formfield.choices = (
+                [('', formfield.empty_label)] + get_group_choices()
+            )
+        return formfield
+
+    def delete_posts(self, request, queryset):
+        self.run_moderation(request, moderation.delete_posts, queryset)
+    delete_posts.short_description = 'Удалить выбранные посты'
 
+    def move_to_group(self, request, queryset):
+        group_id = self.get_action_params(request).get('target_group')
+        self.run_moderation(
+            request, moderation.move_posts, queryset, group_id
+        )
+    move_to_group.short_description = 'Перенести посты в группу'
 
-class GroupAdmin(admin.ModelAdmin):
+    def purge_by_date(self, request, queryset):
+        params = self.get_action_params(request)
+        date_from, date_to = params.get('date_from'), params.get('date_to')
+        if date_from is None and date_to is None:
+            self.message_user(request, 'Укажите хотя бы одну дату')
+            return
+        self.run_moderation(
+            request,
+            moderation.purge_posts,
+            queryset,
+            date_from and to_datetime(date_from),
+            date_to and to_datetime(date_to + timedelta(days=1)),
+        )
+    purge_by_date.short_description = 'Удалить выбранные посты за период'
+
+
+class GroupAdmin(SoftDeleteMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'title',
         'description',
         'slug',
+        'is_deleted',
     )
     search_fields = ('title',)
+    list_filter = ('is_deleted',)
     empty_value_display = '-пусто-'
 
+    def schedule_deletion(self, obj):
+        schedule_group_deletion(obj)
+
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ModerationMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'post',
@@ -36,9 +163,20 @@ class CommentAdmin(admin.ModelAdmin):
         'text',
         'created',
     )
+    list_select_related = ('post', 'author')
     search_fields = ('text',)
     list_filter = ('created',)
+    # Путь ответа строится при создании, перенос в другую ветку не нужен.
+    readonly_fields = ('parent',)
+    ordering = ('-pk',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    actions = ('delete_comments',)
+
+    def delete_comments(self, request, queryset):
+        self.run_moderation(request, moderation.delete_comments, queryset)
+    delete_comments.short_description = 'Удалить выбранные комментарии'
 
 
 class FollowAdmin(admin.ModelAdmin):
@@ -47,11 +185,71 @@ class FollowAdmin(admin.ModelAdmin):
         'user',
         'author',
     )
+    list_select_related = ('user', 'author')
     search_fields = ('user', 'author')
     empty_value_display = '-пусто-'
 
 
+class PendingPurgeAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'user',
+        'group',
+        'created',
+    )
+    list_select_related = ('user', 'group')
+    empty_value_display = '-пусто-'
+
+
+class ModeratedUserAdmin(SoftDeleteMixin, ModerationMixin, UserAdmin):
+    list_display = UserAdmin.list_display + ('pending_deletion',)
+    list_select_related = ('pending_purge',)
+    actions = ('delete_user_posts', 'delete_user_comments')
+
+    def get_actions(self, request):
+        # Удаление самих пользователей оставляем стандартным.
+        return admin.ModelAdmin.get_actions(self, request)
+
+    def pending_deletion(self, obj):
+        # Удалённый пользователь неактивен так же, как заблокированный,
+        # отличает его только запись PendingPurge.
+        return hasattr(obj, 'pending_purge')
+    pending_deletion.boolean = True
+    pending_deletion.short_description = 'Ожидает удаления'
+
+    def get_readonly_fields(self, request, obj=None):
+        fields = super().get_readonly_fields(request, obj)
+        if obj is not None and self.pending_deletion(obj):
+            # Разблокировка не отменяет удаления.
+            fields = tuple(fields) + ('is_active',)
+        return fields
+
+    def delete_user_posts(self, request, queryset):
+        self.run_moderation(
+            request,
+            moderation.delete_posts,
+            Post.objects.filter(author__in=queryset),
+        )
+    delete_user_posts.short_description = 'Удалить все посты пользователей'
+
+    def delete_user_comments(self, request, queryset):
+        self.run_moderation(
+            request,
+            moderation.delete_comments,
+            Comment.objects.filter(author__in=queryset),
+        )
+    delete_user_comments.short_description = (
+        'Удалить все комментарии пользователей'
+    )
+
+    def schedule_deletion(self, obj):
+        schedule_user_deletion(obj)
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(PendingPurge, PendingPurgeAdmin)
+admin.site.unregister(User)
+admin.site.register(User, ModeratedUserAdmin)
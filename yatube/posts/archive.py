@@ -0,0 +1,223 @@
+"""Архив постов по датам и счётчики постов за месяц и за день.
+
+Счётчики хранятся в ``MonthlyPostCount`` и ``DailyPostCount`` для общей
+ленты, каждой группы и каждого автора и обновляются инкрементально:
+сигналами при сохранении и удалении поста и явными вызовами из массовых
+операций модерации, которые сигналов не отправляют. Считаются только
+видимые посты (``Post.objects.visible()``), поэтому блокировка автора
+вычитает его посты, а разблокировка возвращает.
+"""
+import datetime
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest, TruncDay
+from django.utils import timezone
+
+from .models import DailyPostCount, MonthlyPostCount, Post
+
+ALL_SCOPE = 'all'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def day_of(value):
+    """День, к которому относится дата публикации."""
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        value = value.date()
+    return value
+
+
+def month_of(value):
+    """Первое число месяца, к которому относится дата публикации."""
+    return day_of(value).replace(day=1)
+
+
+def period_bounds(year, month=None, day=None):
+    """Полуинтервал дат публикации за год, месяц или день."""
+    start = datetime.datetime(year, month or 1, day or 1)
+    if day is not None:
+        end = start + datetime.timedelta(days=1)
+    elif month is not None:
+        end = (start + datetime.timedelta(days=32)).replace(day=1)
+    else:
+        end = start.replace(year=year + 1)
+    if settings.USE_TZ:
+        start = timezone.make_aware(start)
+        end = timezone.make_aware(end)
+    return start, end
+
+
+def _scopes(author_id, group_id):
+    scopes = [ALL_SCOPE, author_scope(author_id)]
+    if group_id is not None:
+        scopes.append(group_scope(group_id))
+    return scopes
+
+
+def _apply_to(model, field_name, deltas):
+    for (scope, value), delta in deltas.items():
+        if not delta:
+            continue
+        counts = model.objects.filter(scope=scope, **{field_name: value})
+        # Не уходим ниже нуля, даже если счётчик разошёлся с постами.
+        if (counts.update(count=Greatest(F('count') + delta, 0))
+                or delta < 0):
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(scope=scope, count=delta,
+                                     **{field_name: value})
+        except IntegrityError:
+            counts.update(count=F('count') + delta)
+
+
+def _by_month(deltas):
+    months = Counter()
+    for (scope, day), delta in deltas.items():
+        months[scope, day.replace(day=1)] += delta
+    return months
+
+
+def apply(deltas):
+    """Прибавляем к счётчикам ``{(scope, день): изменение}``."""
+    _apply_to(DailyPostCount, 'day', deltas)
+    _apply_to(MonthlyPostCount, 'month', _by_month(deltas))
+
+
+def post_saved(post, created, old_group_id):
+    if not post.is_visible():
+        return
+    day = day_of(post.pub_date)
+    deltas = Counter()
+    if created:
+        for scope in _scopes(post.author_id, post.group_id):
+            deltas[scope, day] += 1
+    elif old_group_id != post.group_id:
+        if old_group_id is not None:
+            deltas[group_scope(old_group_id), day] -= 1
+        if post.group_id is not None:
+            deltas[group_scope(post.group_id), day] += 1
+    apply(deltas)
+
+
+def post_deleted(post):
+    if not post.is_visible():
+        return
+    day = day_of(post.pub_date)
+    apply({
+        (scope, day): -1
+        for scope in _scopes(post.author_id, post.group_id)
+    })
+
+
+def _grouped(queryset):
+    return (
+        queryset.annotate(day=TruncDay('pub_date'))
+        .values('day', 'author_id', 'group_id')
+        .annotate(posts=Count('pk'))
+        .order_by()
+    )
+
+
+def _collect(rows, scopes, sign=1):
+    deltas = Counter()
+    for row in rows:
+        for scope in scopes(row):
+            deltas[scope, day_of(row['day'])] += sign * row['posts']
+    return deltas
+
+
+def _all_scopes(row):
+    return _scopes(row['author_id'], row['group_id'])
+
+
+def remove_posts(pks):
+    """Вычитаем посты, которые сейчас будут удалены без сигналов."""
+    apply(_collect(
+        _grouped(Post.objects.visible().filter(pk__in=pks)),
+        _all_scopes,
+        sign=-1,
+    ))
+
+
+def move_posts(pks, group_id):
+    """Переносим посты между счётчиками групп до UPDATE group_id."""
+    rows = list(_grouped(Post.objects.visible().filter(pk__in=pks)))
+    deltas = _collect(
+        rows,
+        lambda row: [group_scope(row['group_id'])]
+        if row['group_id'] is not None else [],
+        sign=-1,
+    )
+    if group_id is not None:
+        deltas.update(_collect(rows, lambda row: [group_scope(group_id)]))
+    apply(deltas)
+
+
+def author_visibility_changed(author_id, visible):
+    """Прибавляем или вычитаем посты автора при (раз)блокировке."""
+    apply(_collect(
+        _grouped(Post.objects.filter(author_id=author_id)),
+        _all_scopes,
+        sign=1 if visible else -1,
+    ))
+
+
+def delete_scope(scope):
+    MonthlyPostCount.objects.filter(scope=scope).delete()
+    DailyPostCount.objects.filter(scope=scope).delete()
+
+
+def rebuild():
+    """Пересчитываем все счётчики по таблице постов."""
+    days = _collect(_grouped(Post.objects.visible()), _all_scopes)
+    months = _by_month(days)
+    with transaction.atomic():
+        MonthlyPostCount.objects.all().delete()
+        DailyPostCount.objects.all().delete()
+        MonthlyPostCount.objects.bulk_create(
+            MonthlyPostCount(scope=scope, month=month, count=count)
+            for (scope, month), count in months.items()
+        )
+        DailyPostCount.objects.bulk_create(
+            DailyPostCount(scope=scope, day=day, count=count)
+            for (scope, day), count in days.items()
+        )
+    return len(months)
+
+
+def get_years(scope):
+    """Годы с постами и число постов за каждый."""
+    totals = Counter()
+    for month, count in MonthlyPostCount.objects.filter(
+        scope=scope, count__gt=0
+    ).values_list('month', 'count'):
+        totals[month.year] += count
+    return sorted(totals.items(), reverse=True)
+
+
+def get_months(scope, year):
+    return list(
+        MonthlyPostCount.objects.filter(
+            scope=scope, count__gt=0, month__year=year
+        ).order_by('month').values_list('month', 'count')
+    )
+
+
+def get_days(scope, year, month):
+    return list(
+        DailyPostCount.objects.filter(
+            scope=scope, count__gt=0, day__year=year, day__month=month
+        ).order_by('day').values_list('day', flat=True)
+    )
@@ -0,0 +1,130 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+
+from .models import Group, Post, User
+
+GROUP_CHOICES_KEY = 'posts:group-choices'
+GROUP_KEY = 'posts:group:{}'
+AUTHOR_KEY = 'posts:author:{}'
+POST_KEY = 'posts:post:{}'
+STATS_KEY = 'posts:object-cache:{}'
+
+
+def get_group_choices():
+    """Список групп для выпадающих списков, общий для всех форм."""
+    choices = cache.get(GROUP_CHOICES_KEY)
+    if choices is None:
+        choices = [
+            (group.pk, str(group))
+            for group in Group.objects.filter(is_deleted=False)
+            .only('pk', 'title').order_by('pk')
+        ]
+        cache.set(GROUP_CHOICES_KEY, choices,
+                  settings.GROUP_CHOICES_CACHE_TIMEOUT)
+    return choices
+
+
+def invalidate_group_choices():
+    cache.delete(GROUP_CHOICES_KEY)
+
+
+def _count(name):
+    key = STATS_KEY.format(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_object_cache_stats():
+    """Попадания и промахи кэша объектов с момента последнего сброса."""
+    stats = cache.get_many([STATS_KEY.format(name)
+                            for name in ('hits', 'misses')])
+    hits = stats.get(STATS_KEY.format('hits'), 0)
+    misses = stats.get(STATS_KEY.format('misses'), 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+    }
+
+
+def reset_object_cache_stats():
+    cache.delete_many([STATS_KEY.format(name) for name in ('hits', 'misses')])
+
+
+def _hashed(value):
+    # Слаг и имя пользователя могут содержать недопустимые в ключе символы.
+    return md5(value.encode()).hexdigest()
+
+
+def _get_or_404(key, queryset, **lookup):
+    # В кэше процесса сброс после изменения не дошёл бы до других
+    # воркеров, и они час отдавали бы старый объект.
+    if not settings.SHARED_CACHE:
+        return get_object_or_404(queryset, **lookup)
+    obj = cache.get(key)
+    if obj is not None:
+        _count('hits')
+        return obj
+    _count('misses')
+    obj = get_object_or_404(queryset, **lookup)
+    cache.set(key, obj, settings.OBJECT_CACHE_TIMEOUT)
+    return obj
+
+
+def get_group_or_404(slug):
+    return _get_or_404(GROUP_KEY.format(_hashed(slug)),
+                       Group.objects.filter(is_deleted=False), slug=slug)
+
+
+def get_author_or_404(username):
+    return _get_or_404(AUTHOR_KEY.format(_hashed(username)),
+                       User.objects.filter(is_active=True), username=username)
+
+
+def get_post_or_404(post_id):
+    """Видимый пост вместе с автором и группой."""
+    return _get_or_404(
+        POST_KEY.format(post_id),
+        Post.objects.visible().select_related('author', 'group'),
+        pk=post_id,
+    )
+
+
+def invalidate_posts(pks):
+    cache.delete_many([POST_KEY.format(pk) for pk in pks])
+
+
+def _invalidate_related_posts(queryset):
+    # Автор и группа лежат в кэше внутри постов, сбрасываем и их.
+    pks = []
+    for pk in queryset.values_list('pk', flat=True).iterator():
+        pks.append(pk)
+        if len(pks) == settings.MODERATION_CHUNK_SIZE:
+            invalidate_posts(pks)
+            pks = []
+    invalidate_posts(pks)
+
+
+def invalidate_group(group, old_slug=None):
+    """Сбрасываем группу и её посты.
+
+    После смены слага сбрасываем и ключ старого слага, иначе старый
+    адрес ещё ``OBJECT_CACHE_TIMEOUT`` отдавал бы группу из кэша.
+    """
+    cache.delete_many([GROUP_KEY.format(_hashed(slug))
+                       for slug in {group.slug, old_slug} if slug])
+    _invalidate_related_posts(Post.objects.filter(group_id=group.pk))
+
+
+def invalidate_author(user, old_username=None):
+    """Сбрасываем автора и его посты, в том числе по старому имени."""
+    cache.delete_many([AUTHOR_KEY.format(_hashed(username))
+                       for username in {user.username, old_username}
+                       if username])
+    _invalidate_related_posts(Post.objects.filter(author_id=user.pk))
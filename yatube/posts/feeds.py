@@ -0,0 +1,201 @@
+"""RSS и Atom для общей ленты, групп и авторов.
+
+У каждой ленты (``archive.ALL_SCOPE``, группы, автора) есть метка
+времени последнего изменения в кэше. Сигналы и массовые операции
+модерации обновляют метки затронутых лент, а по метке строятся ETag,
+Last-Modified и ключ готового XML в кэше. Поэтому повторный опрос
+без изменений получает 304 без запросов к базе, а первый после
+изменения — XML, собранный один раз на всех. Без SHARED_CACHE метки
+живут FEED_MAX_AGE секунд: сброс в одном воркере другие не увидят.
+"""
+import time
+from hashlib import md5
+from html import unescape
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.html import strip_tags
+from django.utils.http import http_date, quote_etag
+from django.utils.text import Truncator
+
+from .archive import ALL_SCOPE, author_scope, group_scope
+from .caching import get_author_or_404, get_group_or_404
+from .models import Post
+
+STAMP_KEY = 'posts:feed-stamp:{}'
+FEED_KEY = 'posts:feed:{}'
+FEED_TYPES = {'rss': Rss201rev2Feed, 'atom': Atom1Feed}
+
+
+def _stamp_timeout():
+    # В кэше процесса метку обновляет только воркер, где случилось
+    # изменение, поэтому остальные держат старую не дольше FEED_MAX_AGE.
+    return None if settings.SHARED_CACHE else settings.FEED_MAX_AGE
+
+
+def get_stamp(scope):
+    """Время последнего изменения ленты, в секундах от эпохи."""
+    key = STAMP_KEY.format(scope)
+    stamp = cache.get(key)
+    if stamp is None:
+        # Метка потерялась: считаем ленту изменённой сейчас.
+        cache.add(key, time.time(), _stamp_timeout())
+        stamp = cache.get(key)
+    return stamp
+
+
+def touch(scopes):
+    now = time.time()
+    cache.set_many({STAMP_KEY.format(scope): now for scope in scopes},
+                   _stamp_timeout())
+
+
+def post_scopes(author_id, *group_ids):
+    """Ленты, в которые входит пост автора из перечисленных групп."""
+    scopes = {ALL_SCOPE, author_scope(author_id)}
+    scopes.update(group_scope(group_id) for group_id in group_ids
+                  if group_id is not None)
+    return scopes
+
+
+def group_scopes(group_id):
+    """Ленты, где выводится название группы: её, общая и её авторов."""
+    scopes = {ALL_SCOPE, group_scope(group_id)}
+    scopes.update(
+        author_scope(author_id)
+        for author_id in Post.objects.filter(group_id=group_id)
+        .values_list('author_id', flat=True).distinct().order_by()
+    )
+    return scopes
+
+
+def scopes_of_posts(pks):
+    """Ленты постов из ``pks``; вызывается до их удаления или переноса."""
+    scopes = set()
+    rows = (
+        Post.objects.filter(pk__in=pks)
+        .values_list('author_id', 'group_id').distinct().order_by()
+    )
+    for author_id, group_id in rows:
+        scopes.update(post_scopes(author_id, group_id))
+    return scopes
+
+
+class PostsFeed(Feed):
+    """Последние посты общей ленты, группы или автора.
+
+    ``kind`` — None, 'group' или 'author', ``fmt`` — ключ ``FEED_TYPES``.
+    """
+
+    def __init__(self, kind, fmt):
+        self.kind = kind
+        self.fmt = fmt
+        self.feed_type = FEED_TYPES[fmt]
+
+    def __call__(self, request, *args, **kwargs):
+        obj = self.get_object(request, *args, **kwargs)
+        scope = self.scope(obj)
+        stamp = get_stamp(scope)
+        etag = quote_etag(md5(
+            f'{self.fmt}:{scope}:{stamp!r}'.encode()
+        ).hexdigest())
+        last_modified = int(stamp)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = self.cached_response(obj, request, etag)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True,
+                            max_age=settings.FEED_MAX_AGE)
+        return response
+
+    def cached_response(self, obj, request, etag):
+        # Ссылки в XML абсолютные, поэтому ключ зависит от схемы и хоста.
+        key = FEED_KEY.format(md5(
+            f'{request.scheme}://{request.get_host()}:{etag}'.encode()
+        ).hexdigest())
+        cached = cache.get(key)
+        if cached is None:
+            feed = self.get_feed(obj, request)
+            response = HttpResponse(content_type=feed.content_type)
+            feed.write(response, 'utf-8')
+            cache.set(key, (response['Content-Type'], response.content),
+                      settings.FEED_CACHE_TIMEOUT)
+            return response
+        content_type, content = cached
+        return HttpResponse(content, content_type=content_type)
+
+    def get_object(self, request, slug=None, username=None):
+        if self.kind == 'group':
+            return get_group_or_404(slug)
+        if self.kind == 'author':
+            return get_author_or_404(username)
+        return None
+
+    def scope(self, obj):
+        if self.kind == 'group':
+            return group_scope(obj.pk)
+        if self.kind == 'author':
+            return author_scope(obj.pk)
+        return ALL_SCOPE
+
+    def title(self, obj):
+        if self.kind == 'group':
+            return obj.title
+        if self.kind == 'author':
+            return f'Посты пользователя {obj.get_full_name() or obj}'
+        return 'Последние обновления на сайте'
+
+    def link(self, obj):
+        if self.kind == 'group':
+            return reverse('posts:group_list', args=(obj.slug,))
+        if self.kind == 'author':
+            return reverse('posts:profile', args=(obj.username,))
+        return reverse('posts:index')
+
+    def description(self, obj):
+        if self.kind == 'group':
+            return obj.description
+        return self.title(obj)
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+    def items(self, obj):
+        posts = Post.objects.visible()
+        if self.kind == 'group':
+            posts = posts.filter(group=obj)
+        elif self.kind == 'author':
+            posts = posts.filter(author=obj)
+        return posts.for_feed().order_by(
+            '-pub_date', '-pk'
+        )[:settings.FEED_ITEMS]
+
+    def item_title(self, post):
+        # Заголовков у постов нет, берём начало уже готового HTML:
+        # полный текст в выборку не входит.
+        return Truncator(unescape(strip_tags(post.excerpt_html))).chars(
+            settings.FEED_TITLE_LENGTH
+        )
+
+    def item_description(self, post):
+        return post.excerpt_html
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=(post.pk,))
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_categories(self, post):
+        return (post.group.title,) if post.group else ()
@@ -10,6 +10,8 @@ class PostForm(forms.ModelForm):
 
 
 class CommentForm(forms.ModelForm):
+    parent = forms.IntegerField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = Comment
         fields = ('text',)
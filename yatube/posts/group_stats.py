@@ -0,0 +1,128 @@
+"""Счётчики постов и последний пост группы для каталога групп.
+
+``GroupStats`` обновляется по одной строке на изменение: сигналами при
+сохранении и удалении поста и явными вызовами из массовых операций
+модерации. Каталог читает готовые значения без COUNT и MAX по постам.
+Как и в лентах, учитываются только видимые посты
+(``Post.objects.visible()``).
+"""
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+
+from .models import Group, GroupStats, Post
+
+
+def _change_count(group_id, delta):
+    # Не уходим ниже нуля, даже если счётчик разошёлся с постами.
+    post_count = Greatest(F('post_count') + delta, 0)
+    if not GroupStats.objects.filter(pk=group_id).update(
+        post_count=post_count
+    ) and delta > 0:
+        GroupStats.objects.get_or_create(group_id=group_id)
+        GroupStats.objects.filter(pk=group_id).update(post_count=post_count)
+
+
+def refresh_latest(group_ids):
+    """Заново находим последний пост групп одним запросом на группу."""
+    for group_id in group_ids:
+        latest = (
+            Post.objects.visible().filter(group_id=group_id)
+            .order_by('-pub_date', '-pk').only('pk', 'pub_date').first()
+        )
+        GroupStats.objects.filter(pk=group_id).update(
+            last_post=latest,
+            last_pub_date=latest.pub_date if latest else None,
+        )
+
+
+def _add(group_id, post):
+    _change_count(group_id, 1)
+    GroupStats.objects.filter(
+        Q(last_pub_date__isnull=True) | Q(last_pub_date__lte=post.pub_date),
+        pk=group_id,
+    ).update(last_post=post, last_pub_date=post.pub_date)
+
+
+def _remove(group_id, post_id):
+    _change_count(group_id, -1)
+    last_post_id = GroupStats.objects.filter(pk=group_id).values_list(
+        'last_post_id', flat=True
+    ).first()
+    # При удалении поста ссылка на него уже обнулена (SET_NULL).
+    if last_post_id in (None, post_id):
+        refresh_latest([group_id])
+
+
+def post_saved(post, created, old_group_id):
+    if not post.is_visible():
+        return
+    if created:
+        if post.group_id is not None:
+            _add(post.group_id, post)
+    elif old_group_id != post.group_id:
+        if old_group_id is not None:
+            _remove(old_group_id, post.pk)
+        if post.group_id is not None:
+            _add(post.group_id, post)
+
+
+def post_deleted(post):
+    if not post.is_visible():
+        return
+    if post.group_id is not None:
+        _remove(post.group_id, post.pk)
+
+
+def remove_posts(pks):
+    """Вычитаем посты из счётчиков их групп до удаления или переноса.
+
+    Возвращаем группы, у которых последний пост входит в ``pks``:
+    после изменения для них нужно вызвать ``refresh_latest``.
+    """
+    rows = (
+        Post.objects.visible().filter(pk__in=pks).exclude(group=None)
+        .values('group_id').annotate(posts=Count('pk')).order_by()
+    )
+    for row in rows:
+        _change_count(row['group_id'], -row['posts'])
+    return list(GroupStats.objects.filter(last_post_id__in=pks).values_list(
+        'group_id', flat=True
+    ))
+
+
+def add_posts(pks, group_id):
+    """Прибавляем перенесённые в группу посты."""
+    _change_count(group_id,
+                  Post.objects.visible().filter(pk__in=pks).count())
+    refresh_latest([group_id])
+
+
+def author_visibility_changed(author_id, visible):
+    """Прибавляем или вычитаем посты автора при (раз)блокировке."""
+    rows = (
+        Post.objects.filter(author_id=author_id).exclude(group=None)
+        .values_list('group_id').annotate(posts=Count('pk')).order_by()
+    )
+    sign = 1 if visible else -1
+    group_ids = []
+    for group_id, posts in rows:
+        _change_count(group_id, sign * posts)
+        group_ids.append(group_id)
+    refresh_latest(group_ids)
+
+
+def rebuild():
+    """Пересчитываем статистику всех групп по таблице постов."""
+    counts = dict(
+        Post.objects.visible().exclude(group=None).values_list('group_id')
+        .annotate(posts=Count('pk')).order_by()
+    )
+    group_ids = list(Group.objects.values_list('pk', flat=True))
+    GroupStats.objects.exclude(group_id__in=group_ids).delete()
+    for group_id in group_ids:
+        GroupStats.objects.update_or_create(
+            group_id=group_id,
+            defaults={'post_count': counts.get(group_id, 0)},
+        )
+    refresh_latest(group_ids)
+    return len(group_ids)
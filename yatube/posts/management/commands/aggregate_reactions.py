@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.reactions import aggregate
+
+
+class Command(BaseCommand):
+    help = 'Сводит части счётчиков реакций в итоговые числа'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.MODERATION_CHUNK_SIZE,
+            help='Сколько строк обновлять в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        done = aggregate(options['chunk_size'])
+        self.stdout.write(f'Сведено частей счётчиков: {done}')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts.sitemaps import build
+
+
+class Command(BaseCommand):
+    help = ('Пишет карты сайта для постов, профилей и групп в SITEMAP_ROOT, '
+            'перезаписывая только изменившиеся куски')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Перезаписать все куски, например после смены имён',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за раз',
+        )
+
+    def handle(self, *args, **options):
+        written, removed = build(options['force'], options['chunk_size'])
+        self.stdout.write(
+            f'Записано кусков: {len(written)}, удалено: {len(removed)}'
+        )
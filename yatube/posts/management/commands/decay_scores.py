@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.ranking import decay_scores
+
+
+class Command(BaseCommand):
+    help = 'Уменьшает рейтинги постов для ленты популярного'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.MODERATION_CHUNK_SIZE,
+            help='Сколько строк обновлять в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        done = decay_scores(options['chunk_size'])
+        self.stdout.write(f'Обработано рейтингов: {done}')
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import export_content
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии и подписки '
+            'в формате JSON Lines')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            nargs='?',
+            default='-',
+            help='Файл выгрузки, по умолчанию стандартный вывод',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за раз',
+        )
+        parser.add_argument(
+            '--with-credentials',
+            action='store_true',
+            help='Выгрузить почту и хэши паролей пользователей',
+        )
+
+    def progress(self, kind, done, rate):
+        self.stderr.write(f'{kind}: {done} ({rate:.0f} строк/с)')
+
+    def export(self, stream, options):
+        return export_content(stream, options['chunk_size'], self.progress,
+                              options['with_credentials'])
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            counts = self.export(sys.stdout, options)
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                counts = self.export(stream, options)
+        self.stderr.write(', '.join(
+            f'{kind}: {count}' for kind, count in counts.items()
+        ))
@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import ImportConflict, import_content
+
+
+class Command(BaseCommand):
+    help = 'Загружает выгрузку export_content в формате JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            nargs='?',
+            default='-',
+            help='Файл выгрузки, по умолчанию стандартный ввод',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк вставлять одним запросом',
+        )
+
+    def progress(self, kind, done, rate):
+        self.stdout.write(f'{kind}: {done} ({rate:.0f} строк/с)')
+
+    def load(self, stream, batch_size):
+        try:
+            return import_content(stream, batch_size, self.progress)
+        except ImportConflict as error:
+            raise CommandError(error)
+
+    def handle(self, *args, **options):
+        if options['input'] == '-':
+            importer = self.load(sys.stdin, options['batch_size'])
+        else:
+            with open(options['input'], encoding='utf-8') as stream:
+                importer = self.load(stream, options['batch_size'])
+        self.stdout.write(', '.join(
+            f'{kind}: {count}' for kind, count
+            in importer.progress.counts.items()
+        ))
+        if importer.skipped:
+            self.stdout.write(
+                f'Пропущено строк без автора или поста: {importer.skipped}'
+            )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts.caching import get_object_cache_stats, reset_object_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает долю попаданий в кэш групп, авторов и постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить счётчики после вывода',
+        )
+
+    def handle(self, *args, **options):
+        stats = get_object_cache_stats()
+        self.stdout.write(
+            f'Попаданий: {stats["hits"]}, промахов: {stats["misses"]}, '
+            f'доля попаданий: {stats["hit_rate"]:.1%}'
+        )
+        if options['reset']:
+            reset_object_cache_stats()
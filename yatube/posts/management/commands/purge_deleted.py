@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.purge import purge_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Окончательно удаляет пользователей и группы, '
+        'помеченные на удаление'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.MODERATION_CHUNK_SIZE,
+            help='Сколько строк удалять в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        done = purge_pending(options['chunk_size'])
+        self.stdout.write(f'Удалено объектов: {done}')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.archive import rebuild
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает число постов за месяц для архива, например '
+            'после миграции или ручных правок в базе')
+
+    def handle(self, *args, **options):
+        done = rebuild()
+        self.stdout.write(f'Счётчиков за месяц: {done}')
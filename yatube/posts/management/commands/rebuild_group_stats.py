@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.group_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает число постов и последний пост групп, например '
+            'после миграции или ручных правок в базе')
+
+    def handle(self, *args, **options):
+        done = rebuild()
+        self.stdout.write(f'Обновлено групп: {done}')
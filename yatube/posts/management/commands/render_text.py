@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Comment, Post
+from posts.moderation import iter_pk_chunks
+
+
+class Command(BaseCommand):
+    help = ('Заполняет сохранённый HTML текстов постов и комментариев, '
+            'например после миграции или смены разметки')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.MODERATION_CHUNK_SIZE,
+            help='Сколько строк обновлять одним запросом',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Перерисовать все записи, а не только пустые',
+        )
+
+    def handle(self, *args, **options):
+        for model, fields in (
+            (Post, ('text_html', 'excerpt_html')),
+            (Comment, ('text_html',)),
+        ):
+            queryset = model.objects.all()
+            if not options['all']:
+                queryset = queryset.filter(text_html='')
+            done = 0
+            for pks in iter_pk_chunks(queryset, options['chunk_size']):
+                objs = list(
+                    model.objects.filter(pk__in=pks).only('pk', 'text')
+                )
+                for obj in objs:
+                    obj.render()
+                model.objects.bulk_update(objs, fields)
+                done += len(objs)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: обновлено {done}'
+            )
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0011_indexed_dates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='is_deleted',
+            field=models.BooleanField(default=False, help_text='Группа скрыта и ожидает окончательного удаления', verbose_name='Удалена'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='group',
+            field=models.ForeignKey(blank=True, help_text='Группа, в которую включить пост', limit_choices_to={'is_deleted': False}, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='posts', to='posts.Group', verbose_name='Группа'),
+        ),
+        migrations.CreateModel(
+            name='PendingPurge',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата запроса на удаление')),
+                ('group', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pending_purge', to='posts.Group', verbose_name='Группа')),
+                ('user', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pending_purge', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ожидает удаления',
+                'verbose_name_plural': 'Ожидают удаления',
+                'ordering': ('created',),
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:10
+
+import core.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=core.fields.LazyImageField(blank=True, help_text='Добавьте картинку', upload_to='posts/', verbose_name='Картинка'),
+        ),
+    ]
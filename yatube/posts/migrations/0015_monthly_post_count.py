@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_rendered_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyPostCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(help_text='all, group:<id> или author:<id>', max_length=50, verbose_name='Лента')),
+                ('month', models.DateField(verbose_name='Месяц')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+            ],
+            options={
+                'verbose_name': 'Постов за месяц',
+                'verbose_name_plural': 'Постов за месяц',
+                'ordering': ('scope', 'month'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlypostcount',
+            constraint=models.UniqueConstraint(fields=('scope', 'month'), name='unique_monthly_post_count'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0018_comment_tree'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReactionCounterShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16, verbose_name='Реакция')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Номер части')),
+                ('count', models.IntegerField(default=0, verbose_name='Число реакций')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Часть счётчика реакций',
+                'verbose_name_plural': 'Части счётчиков реакций',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReactionCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16, verbose_name='Реакция')),
+                ('count', models.IntegerField(default=0, verbose_name='Число реакций')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Число реакций',
+                'verbose_name_plural': 'Числа реакций',
+            },
+        ),
+        migrations.CreateModel(
+            name='Reaction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('like', 'Нравится'), ('fire', 'Огонь'), ('sad', 'Грустно')], max_length=16, verbose_name='Реакция')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата реакции')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Реакция',
+                'verbose_name_plural': 'Реакции',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reactioncountershard',
+            constraint=models.UniqueConstraint(fields=('post', 'kind', 'shard'), name='unique_reaction_counter_shard'),
+        ),
+        migrations.AddConstraint(
+            model_name='reactioncount',
+            constraint=models.UniqueConstraint(fields=('post', 'kind'), name='unique_reaction_count'),
+        ),
+        migrations.AddConstraint(
+            model_name='reaction',
+            constraint=models.UniqueConstraint(fields=('user', 'post', 'kind'), name='unique_reaction'),
+        ),
+    ]
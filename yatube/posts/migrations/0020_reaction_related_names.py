@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_reactions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reactioncount',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reaction_totals', to='posts.Post', verbose_name='Пост'),
+        ),
+        migrations.AlterField(
+            model_name='reactioncountershard',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reaction_shards', to='posts.Post', verbose_name='Пост'),
+        ),
+    ]
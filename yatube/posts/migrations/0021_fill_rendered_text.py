@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-19 07:20
+
+from django.conf import settings
+from django.db import migrations
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+
+def render_post(post):
+    post.text_html = linebreaks(post.text, autoescape=True)
+    post.excerpt_html = linebreaks(
+        Truncator(post.text).chars(settings.POST_EXCERPT_LENGTH),
+        autoescape=True,
+    )
+
+
+def render_comment(comment):
+    comment.text_html = linebreaks(comment.text, autoescape=True)
+
+
+def fill_rendered_text(apps, schema_editor):
+    # Записи, сохранённые до 0014, без HTML выводились бы пустыми.
+    for name, render, fields in (
+        ('Post', render_post, ['text_html', 'excerpt_html']),
+        ('Comment', render_comment, ['text_html']),
+    ):
+        model = apps.get_model('posts', name)
+        batch = []
+        for obj in model.objects.filter(text_html='').only('text').iterator(
+            chunk_size=1000
+        ):
+            render(obj)
+            batch.append(obj)
+            if len(batch) == 1000:
+                model.objects.bulk_update(batch, fields)
+                batch = []
+        model.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_reaction_related_names'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_rendered_text, migrations.RunPython.noop),
+    ]
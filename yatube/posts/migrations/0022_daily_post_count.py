@@ -0,0 +1,72 @@
+# Generated by Django 2.2.16 on 2026-10-19 07:06
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+
+
+def fill_counts(apps, schema_editor):
+    # Счётчики за месяц не заполнялись с 0015: считаем оба по видимым
+    # постам, как rebuild_archive.
+    Post = apps.get_model('posts', 'Post')
+    MonthlyPostCount = apps.get_model('posts', 'MonthlyPostCount')
+    DailyPostCount = apps.get_model('posts', 'DailyPostCount')
+    days = Counter()
+    months = Counter()
+    for row in (
+        Post.objects.filter(author__is_active=True)
+        .annotate(day=TruncDay('pub_date'))
+        .values('day', 'author_id', 'group_id')
+        .annotate(posts=Count('pk')).order_by()
+    ):
+        day = row['day']
+        if timezone.is_aware(day):
+            day = timezone.localtime(day)
+        day = day.date()
+        scopes = ['all', f'author:{row["author_id"]}']
+        if row['group_id'] is not None:
+            scopes.append(f'group:{row["group_id"]}')
+        for scope in scopes:
+            days[scope, day] += row['posts']
+            months[scope, day.replace(day=1)] += row['posts']
+    MonthlyPostCount.objects.all().delete()
+    MonthlyPostCount.objects.bulk_create([
+        MonthlyPostCount(scope=scope, month=month, count=count)
+        for (scope, month), count in months.items()
+    ], batch_size=1000)
+    DailyPostCount.objects.bulk_create([
+        DailyPostCount(scope=scope, day=day, count=count)
+        for (scope, day), count in days.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_fill_rendered_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPostCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(help_text='all, group:<id> или author:<id>', max_length=50, verbose_name='Лента')),
+                ('day', models.DateField(verbose_name='День')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+            ],
+            options={
+                'verbose_name': 'Постов за день',
+                'verbose_name_plural': 'Постов за день',
+                'ordering': ('scope', 'day'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailypostcount',
+            constraint=models.UniqueConstraint(fields=('scope', 'day'), name='unique_daily_post_count'),
+        ),
+        migrations.RunPython(fill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:10
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def fill_group_stats(apps, schema_editor):
+    # Без строк статистики удаление старых постов уводило бы счётчик
+    # ниже нуля, а каталог показывал бы пустые группы.
+    Group = apps.get_model('posts', 'Group')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    Post = apps.get_model('posts', 'Post')
+    visible = Post.objects.filter(author__is_active=True)
+    counts = dict(
+        visible.exclude(group=None).values_list('group_id')
+        .annotate(posts=Count('pk')).order_by()
+    )
+    GroupStats.objects.all().delete()
+    stats = []
+    for group_id in Group.objects.values_list('pk', flat=True).iterator():
+        latest = (
+            visible.filter(group_id=group_id)
+            .order_by('-pub_date', '-pk').only('pk', 'pub_date').first()
+        )
+        stats.append(GroupStats(
+            group_id=group_id,
+            post_count=counts.get(group_id, 0),
+            last_post=latest,
+            last_pub_date=latest.pub_date if latest else None,
+        ))
+    GroupStats.objects.bulk_create(stats, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_daily_post_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
@@ -2,10 +2,20 @@ from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from core.fields import LazyImageField
+from .rendering import render_excerpt, render_text
+
 
 User = get_user_model()
 
 
+def _with_rendered(update_fields, *fields):
+    """Добавляем HTML-поля к update_fields, если сохраняется текст."""
+    if update_fields is None or 'text' not in update_fields:
+        return update_fields
+    return {*update_fields, *fields}
+
+
 class Group(models.Model):
     title = models.CharField(
         max_length=200,
@@ -14,6 +24,11 @@ class Group(models.Model):
     )
     slug = models.SlugField(max_length=200, unique=True)
     description = models.TextField(verbose_name="Описание")
+    is_deleted = models.BooleanField(
+        default=False,
+        verbose_name="Удалена",
+        help_text='Группа скрыта и ожидает окончательного удаления'
+    )
 
     def __str__(self) -> str:
         return self.title
@@ -23,10 +38,29 @@ class Group(models.Model):
         verbose_name_plural = "Группы"
 
 
+class PostQuerySet(models.QuerySet):
+    def visible(self):
+        """Посты без авторов, удалённых или заблокированных."""
+        return self.filter(author__is_active=True)
+
+    def for_feed(self):
+        """Только колонки, которые выводят карточки в лентах."""
+        return self.select_related('author', 'group').only(
+            'pub_date', 'excerpt_html', 'image', 'author', 'group',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__slug', 'group__title',
+        )
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name="Текст поста",
                             help_text='Текст нового поста')
+    text_html = models.TextField(blank=True, editable=False,
+                                 verbose_name="HTML текста поста")
+    excerpt_html = models.TextField(blank=True, editable=False,
+                                    verbose_name="HTML начала поста")
     pub_date = models.DateTimeField(auto_now_add=True,
+                                    db_index=True,
                                     verbose_name="Дата рубликации")
     author = models.ForeignKey(
         User,
@@ -40,24 +74,71 @@ class Post(models.Model):
         blank=True,
         null=True,
         related_name='posts',
+        limit_choices_to={'is_deleted': False},
         verbose_name="Группа",
         help_text='Группа, в которую включить пост'
     )
-    image = models.ImageField(
+    image = LazyImageField(
         'Картинка',
         upload_to='posts/',
         blank=True,
         help_text='Добавьте картинку'
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ('pub_date',)
         verbose_name = 'Статья'
         verbose_name_plural = 'Статьи'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Группа на момент загрузки нужна архиву при переносе поста.
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        return instance
+
     def __str__(self):
         return self.text[:settings.COUNT_PREVIEW_SYMBOL]
 
+    def is_visible(self):
+        """Пост выводится на сайте, как в ``PostQuerySet.visible()``."""
+        return self.author.is_active
+
+    def render(self):
+        self.text_html = render_text(self.text)
+        self.excerpt_html = render_excerpt(self.text)
+
+    def save(self, *args, **kwargs):
+        if 'text' not in self.get_deferred_fields():
+            self.render()
+            kwargs['update_fields'] = _with_rendered(
+                kwargs.get('update_fields'), 'text_html', 'excerpt_html'
+            )
+        super().save(*args, **kwargs)
+
+
+# Путь комментария — номера всех его предков и его самого, каждый
+# в base36 ровно на COMMENT_PATH_STEP символов. Сортировка по пути даёт
+# порядок обхода дерева, а поддерево — это диапазон путей с общим началом.
+COMMENT_PATH_STEP = 8
+COMMENT_PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def comment_path_segment(pk):
+    digits = []
+    while pk:
+        pk, digit = divmod(pk, 36)
+        digits.append(COMMENT_PATH_DIGITS[digit])
+    return ''.join(reversed(digits)).rjust(COMMENT_PATH_STEP, '0')
+
+
+def subtree_bounds(path):
+    """Полуинтервал путей поддерева, включая сам комментарий."""
+    # '~' больше любой цифры base36.
+    return path, path + '~'
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -76,19 +157,72 @@ class Comment(models.Model):
         verbose_name='Текст комментария',
         help_text='Введите текст комментария'
     )
+    text_html = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='HTML текста комментария'
+    )
     created = models.DateTimeField(
         auto_now_add=True,
+        db_index=True,
         verbose_name='Дата и время публикации комментария'
     )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='replies',
+        verbose_name='Ответ на комментарий'
+    )
+    path = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name='Путь в дереве комментариев'
+    )
+    depth = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Уровень вложенности'
+    )
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(fields=('post', 'depth', 'path')),
+            models.Index(fields=('post', 'path')),
+        )
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
     def __str__(self):
         return self.text[:settings.COUNT_PREVIEW_SYMBOL]
 
+    def is_visible(self):
+        """Пост выводится на сайте, как в ``PostQuerySet.visible()``."""
+        return self.author.is_active
+
+    def render(self):
+        self.text_html = render_text(self.text)
+
+    def set_path(self, parent_path=''):
+        """Путь и уровень по пути родителя; нужен уже известный pk."""
+        self.path = parent_path + comment_path_segment(self.pk)
+        self.depth = len(self.path) // COMMENT_PATH_STEP - 1
+
+    def save(self, *args, **kwargs):
+        if 'text' not in self.get_deferred_fields():
+            self.render()
+            kwargs['update_fields'] = _with_rendered(
+                kwargs.get('update_fields'), 'text_html'
+            )
+        super().save(*args, **kwargs)
+        if not self.path:
+            self.set_path(self.parent.path if self.parent_id else '')
+            Comment.objects.filter(pk=self.pk).update(path=self.path,
+                                                      depth=self.depth)
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -113,3 +247,255 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+
+
+class PendingPurge(models.Model):
+    """Пользователь или группа, ожидающие фонового удаления."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='pending_purge',
+        verbose_name='Пользователь'
+    )
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='pending_purge',
+        verbose_name='Группа'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата запроса на удаление'
+    )
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'Ожидает удаления'
+        verbose_name_plural = 'Ожидают удаления'
+
+    def __str__(self):
+        return str(self.user or self.group)
+
+
+class MonthlyPostCount(models.Model):
+    """Число постов за месяц в ленте, группе или у автора.
+
+    Обновляется при сохранении и удалении постов (см. ``posts.archive``)
+    и позволяет строить навигацию по архиву без подсчёта по таблице постов.
+    """
+    scope = models.CharField(
+        max_length=50,
+        verbose_name='Лента',
+        help_text='all, group:<id> или author:<id>'
+    )
+    month = models.DateField(verbose_name='Месяц')
+    count = models.PositiveIntegerField(default=0,
+                                        verbose_name='Число постов')
+
+    class Meta:
+        ordering = ('scope', 'month')
+        verbose_name = 'Постов за месяц'
+        verbose_name_plural = 'Постов за месяц'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'month'],
+                name='unique_monthly_post_count'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.scope} {self.month:%Y-%m}: {self.count}'
+
+
+class DailyPostCount(models.Model):
+    """Число постов за день; из него строятся ссылки на дни месяца."""
+    scope = models.CharField(
+        max_length=50,
+        verbose_name='Лента',
+        help_text='all, group:<id> или author:<id>'
+    )
+    day = models.DateField(verbose_name='День')
+    count = models.PositiveIntegerField(default=0,
+                                        verbose_name='Число постов')
+
+    class Meta:
+        ordering = ('scope', 'day')
+        verbose_name = 'Постов за день'
+        verbose_name_plural = 'Постов за день'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'day'],
+                name='unique_daily_post_count'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.scope} {self.day:%Y-%m-%d}: {self.count}'
+
+
+class PostScore(models.Model):
+    """Рейтинг поста для ленты популярного.
+
+    Растёт на единицу с каждым комментарием и периодически затухает
+    (см. ``posts.ranking``).
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Пост'
+    )
+    score = models.FloatField(default=0, db_index=True,
+                              verbose_name='Рейтинг')
+    decayed_at = models.DateTimeField(
+        verbose_name='Время последнего затухания'
+    )
+
+    class Meta:
+        verbose_name = 'Рейтинг поста'
+        verbose_name_plural = 'Рейтинги постов'
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.2f}'
+
+
+class GroupStats(models.Model):
+    """Число постов и последний пост группы для каталога групп.
+
+    Обновляется при создании, удалении и переносе постов
+    (см. ``posts.group_stats``).
+    """
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Группа'
+    )
+    post_count = models.PositiveIntegerField(default=0, db_index=True,
+                                             verbose_name='Число постов')
+    last_post = models.ForeignKey(
+        Post,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Последний пост'
+    )
+    last_pub_date = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name='Дата последнего поста'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика группы'
+        verbose_name_plural = 'Статистика групп'
+
+    def __str__(self):
+        return f'{self.group_id}: {self.post_count}'
+
+
+class Reaction(models.Model):
+    """Реакция пользователя на пост, не больше одной каждого вида."""
+    LIKE = 'like'
+    FIRE = 'fire'
+    SAD = 'sad'
+    KINDS = (
+        (LIKE, 'Нравится'),
+        (FIRE, 'Огонь'),
+        (SAD, 'Грустно'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='reactions',
+        verbose_name='Пользователь'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='reactions',
+        verbose_name='Пост'
+    )
+    kind = models.CharField(max_length=16, choices=KINDS,
+                            verbose_name='Реакция')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Дата реакции')
+
+    class Meta:
+        verbose_name = 'Реакция'
+        verbose_name_plural = 'Реакции'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post', 'kind'],
+                name='unique_reaction'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} {self.kind} {self.post_id}'
+
+
+class ReactionCounterShard(models.Model):
+    """Часть счётчика реакций поста.
+
+    Реакция прибавляется к случайной из ``REACTION_COUNTER_SHARDS``
+    строк, поэтому одновременные реакции на популярный пост не ждут
+    блокировки одной строки. Команда ``aggregate_reactions`` переносит
+    накопленное в ``ReactionCount`` (см. ``posts.reactions``).
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='reaction_shards',
+        verbose_name='Пост'
+    )
+    kind = models.CharField(max_length=16, verbose_name='Реакция')
+    shard = models.PositiveSmallIntegerField(verbose_name='Номер части')
+    count = models.IntegerField(default=0, verbose_name='Число реакций')
+
+    class Meta:
+        verbose_name = 'Часть счётчика реакций'
+        verbose_name_plural = 'Части счётчиков реакций'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'kind', 'shard'],
+                name='unique_reaction_counter_shard'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} {self.kind} #{self.shard}: {self.count}'
+
+
+class ReactionCount(models.Model):
+    """Сведённое число реакций поста одного вида."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='reaction_totals',
+        verbose_name='Пост'
+    )
+    kind = models.CharField(max_length=16, verbose_name='Реакция')
+    count = models.IntegerField(default=0, verbose_name='Число реакций')
+
+    class Meta:
+        verbose_name = 'Число реакций'
+        verbose_name_plural = 'Числа реакций'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'kind'],
+                name='unique_reaction_count'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} {self.kind}: {self.count}'
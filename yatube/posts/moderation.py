@@ -0,0 +1,178 @@
+"""Массовые операции модерации.
+
+Строки обрабатываются пачками по первичному ключу: каждая пачка
+удаляется или обновляется несколькими SQL-запросами в короткой
+транзакции, без загрузки моделей и поштучного каскада.
+"""
+import logging
+
+from django.conf import settings
+from django.db import models, router, transaction
+
+from . import archive, feeds, group_stats
+from .caching import invalidate_posts
+from .models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+
+def iter_pk_chunks(queryset, chunk_size=None):
+    """Отдаём первичные ключи выборки пачками по возрастанию."""
+    chunk_size = chunk_size or settings.MODERATION_CHUNK_SIZE
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(
+            pk__gt=last_pk
+        )
+        pks = list(chunk[:chunk_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def raw_delete(model, pks):
+    """Удаляем строки и зависимые от них строки одним запросом на таблицу.
+
+    Сигналы не отправляются. Каскад обрабатывается на один уровень:
+    зависимые строки с CASCADE удаляются, с SET_NULL — обнуляются.
+    """
+    using = router.db_for_write(model)
+    for relation in model._meta.related_objects:
+        if relation.many_to_many:
+            continue
+        related = relation.related_model._base_manager.using(using).filter(
+            **{f'{relation.field.name}__in': pks}
+        )
+        if relation.on_delete is models.CASCADE:
+            related._raw_delete(using)
+        elif relation.on_delete is models.SET_NULL:
+            related.update(**{relation.field.name: None})
+    return model._base_manager.using(using).filter(pk__in=pks)._raw_delete(
+        using
+    )
+
+
+def delete_image_files(names):
+    """Удаляем картинки вместе с миниатюрами sorl."""
+    from sorl.thumbnail import delete
+
+    for name in names:
+        try:
+            delete(name)
+        except Exception:
+            logger.exception('Не удалось удалить файл %s', name)
+
+
+def _report(progress, done):
+    if progress is not None:
+        progress(done)
+    logger.info('Обработано строк: %s', done)
+
+
+def delete_posts(queryset, chunk_size=None, progress=None):
+    """Удаляем посты с комментариями и картинками. Возвращаем их число."""
+    done = 0
+    for pks in iter_pk_chunks(queryset, chunk_size):
+        images = list(
+            Post.objects.filter(pk__in=pks).exclude(image='')
+            .values_list('image', flat=True)
+        )
+        scopes = feeds.scopes_of_posts(pks)
+        with transaction.atomic():
+            archive.remove_posts(pks)
+            stale_groups = group_stats.remove_posts(pks)
+            raw_delete(Post, pks)
+            group_stats.refresh_latest(stale_groups)
+            transaction.on_commit(lambda images=images: delete_image_files(
+                images
+            ))
+        invalidate_posts(pks)
+        feeds.touch(scopes)
+        done += len(pks)
+        _report(progress, done)
+    return done
+
+
+def _with_replies(pks, chunk_size):
+    """Комментарии и все ответы на них, начиная с самых глубоких.
+
+    Уровней не больше ``COMMENT_MAX_DEPTH``; каждый уровень читается
+    запросами не больше чем по ``chunk_size`` родителей. Ответ стоит
+    в списке раньше родителя, поэтому список можно удалять частями.
+    """
+    levels = [list(pks)]
+    while levels[-1]:
+        parents = levels[-1]
+        levels.append([
+            pk for start in range(0, len(parents), chunk_size)
+            for pk in Comment.objects.filter(
+                parent_id__in=parents[start:start + chunk_size]
+            ).values_list('pk', flat=True)
+        ])
+    # Комментарий из выборки может оказаться и ответом на другой из неё:
+    # оставляем его самое глубокое место.
+    return list(dict.fromkeys(
+        pk for level in reversed(levels) for pk in level
+    ))
+
+
+def delete_comments(queryset, chunk_size=None, progress=None):
+    """Удаляем комментарии вместе с ветками ответов.
+
+    Ветки удаляются частями по ``chunk_size`` строк, от ответов
+    к корням, каждая часть в своей транзакции.
+    """
+    chunk_size = chunk_size or settings.MODERATION_CHUNK_SIZE
+    done = 0
+    for pks in iter_pk_chunks(queryset, chunk_size):
+        tree = _with_replies(pks, chunk_size)
+        for start in range(0, len(tree), chunk_size):
+            with transaction.atomic():
+                raw_delete(Comment, tree[start:start + chunk_size])
+        done += len(pks)
+        _report(progress, done)
+    return done
+
+
+def delete_user_content(user_ids, chunk_size=None, progress=None):
+    """Удаляем все комментарии и посты пользователей."""
+    comments = delete_comments(
+        Comment.objects.filter(author_id__in=user_ids), chunk_size, progress
+    )
+    posts = delete_posts(
+        Post.objects.filter(author_id__in=user_ids), chunk_size, progress
+    )
+    return posts, comments
+
+
+def move_posts(queryset, group_id, chunk_size=None, progress=None):
+    """Переносим посты в другую группу (или убираем из групп)."""
+    done = 0
+    for pks in iter_pk_chunks(queryset, chunk_size):
+        scopes = feeds.scopes_of_posts(pks)
+        if group_id is not None:
+            scopes.add(archive.group_scope(group_id))
+        with transaction.atomic():
+            archive.move_posts(pks, group_id)
+            stale_groups = group_stats.remove_posts(pks)
+            Post.objects.filter(pk__in=pks).update(group_id=group_id)
+            group_stats.refresh_latest(stale_groups)
+            if group_id is not None:
+                group_stats.add_posts(pks, group_id)
+        invalidate_posts(pks)
+        feeds.touch(scopes)
+        done += len(pks)
+        _report(progress, done)
+    return done
+
+
+def purge_posts(queryset, date_from=None, date_to=None, chunk_size=None,
+                progress=None):
+    """Удаляем посты, опубликованные в полуинтервале [date_from, date_to)."""
+    if date_from is not None:
+        queryset = queryset.filter(pub_date__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(pub_date__lt=date_to)
+    return delete_posts(queryset, chunk_size, progress)
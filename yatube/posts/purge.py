@@ -0,0 +1,75 @@
+"""Мягкое удаление пользователей и групп с последующей фоновой очисткой.
+
+Пользователь или группа сразу скрываются с сайта, а зависимые строки
+удаляются пачками в коротких транзакциях (см. ``posts.moderation``),
+чтобы не блокировать базу на время каскадного удаления.
+"""
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+
+from core.tasks import dispatch
+from . import moderation, reactions
+from .models import Follow, Group, PendingPurge, Post, Reaction
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def schedule_user_deletion(user):
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=('is_active',))
+        PendingPurge.objects.get_or_create(user=user)
+    dispatch(purge_user, user.pk)
+
+
+def schedule_group_deletion(group):
+    with transaction.atomic():
+        group.is_deleted = True
+        group.save(update_fields=('is_deleted',))
+        PendingPurge.objects.get_or_create(group=group)
+    dispatch(purge_group, group.pk)
+
+
+def purge_user(user_id, chunk_size=None):
+    posts, comments = moderation.delete_user_content([user_id], chunk_size)
+    follows = 0
+    for pks in moderation.iter_pk_chunks(
+        Follow.objects.filter(Q(user_id=user_id) | Q(author_id=user_id)),
+        chunk_size,
+    ):
+        moderation.raw_delete(Follow, pks)
+        follows += len(pks)
+    for pks in moderation.iter_pk_chunks(
+        Reaction.objects.filter(user_id=user_id), chunk_size
+    ):
+        reactions.remove_reactions(pks)
+    # Зависимых строк почти не осталось, каскад обойдётся дёшево.
+    User.objects.filter(pk=user_id).delete()
+    logger.info(
+        'Пользователь %s удалён: постов %s, комментариев %s, подписок %s',
+        user_id, posts, comments, follows,
+    )
+
+
+def purge_group(group_id, chunk_size=None):
+    posts = moderation.move_posts(
+        Post.objects.filter(group_id=group_id), None, chunk_size
+    )
+    Group.objects.filter(pk=group_id).delete()
+    logger.info('Группа %s удалена, постов без группы: %s', group_id, posts)
+
+
+def purge_pending(chunk_size=None):
+    """Дочищаем всё, что ожидает удаления. Возвращаем число объектов."""
+    done = 0
+    for pending in PendingPurge.objects.all():
+        if pending.user_id is not None:
+            purge_user(pending.user_id, chunk_size)
+        if pending.group_id is not None:
+            purge_group(pending.group_id, chunk_size)
+        done += 1
+    return done
@@ -0,0 +1,88 @@
+"""Рейтинг популярных постов по свежим комментариям.
+
+Каждый комментарий прибавляет к рейтингу поста единицу, а команда
+``decay_scores`` периодически уменьшает все рейтинги вдвое за каждые
+``POPULAR_HALF_LIFE`` секунд. Первые ``POPULAR_TOP_SIZE`` постов
+держатся в кэше и пересчитываются одним запросом по индексу.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PostScore
+from .moderation import iter_pk_chunks
+
+POPULAR_KEY = 'posts:popular'
+
+
+def refresh_top():
+    top = list(
+        PostScore.objects.filter(post__author__is_active=True)
+        .order_by('-score', '-post_id')
+        .values_list('post_id', 'score')[:settings.POPULAR_TOP_SIZE]
+    )
+    cache.set(POPULAR_KEY, top, settings.POPULAR_CACHE_TIMEOUT)
+    return top
+
+
+def get_top():
+    """Список ``(post_id, score)`` по убыванию рейтинга."""
+    top = cache.get(POPULAR_KEY)
+    if top is None:
+        top = refresh_top()
+    return top
+
+
+def record_comment(post_id):
+    """Учитываем новый комментарий к посту."""
+    scores = PostScore.objects.filter(post_id=post_id)
+    if not scores.update(score=F('score') + 1):
+        try:
+            with transaction.atomic():
+                PostScore.objects.create(post_id=post_id, score=1,
+                                         decayed_at=timezone.now())
+        except IntegrityError:
+            scores.update(score=F('score') + 1)
+    score = scores.values_list('score', flat=True).first()
+    top = cache.get(POPULAR_KEY)
+    # Список меняется, только если пост в него входит или попадает.
+    if (top is None
+            or len(top) < settings.POPULAR_TOP_SIZE
+            or score > top[-1][1]
+            or post_id in dict(top)):
+        refresh_top()
+
+
+def _decay_factor(elapsed):
+    factor = 0.5 ** (elapsed.total_seconds() / settings.POPULAR_HALF_LIFE)
+    # Округляем до трёх значащих цифр, чтобы обновить пачку несколькими
+    # запросами, а не по запросу на строку.
+    return float(f'{factor:.3g}')
+
+
+def decay_scores(chunk_size=None, now=None):
+    """Уменьшаем рейтинги пачками и удаляем совсем остывшие.
+
+    Возвращаем число обработанных строк.
+    """
+    now = now or timezone.now()
+    done = 0
+    for pks in iter_pk_chunks(PostScore.objects.all(), chunk_size):
+        by_factor = defaultdict(list)
+        for pk, decayed_at in PostScore.objects.filter(
+            pk__in=pks
+        ).values_list('pk', 'decayed_at'):
+            by_factor[_decay_factor(now - decayed_at)].append(pk)
+        with transaction.atomic():
+            for factor, factor_pks in by_factor.items():
+                PostScore.objects.filter(pk__in=factor_pks).update(
+                    score=F('score') * factor, decayed_at=now
+                )
+        done += len(pks)
+    PostScore.objects.filter(score__lt=settings.POPULAR_MIN_SCORE).delete()
+    refresh_top()
+    return done
@@ -0,0 +1,227 @@
+"""Реакции на посты и их счётчики.
+
+Число реакций поста одного вида — это ``ReactionCount.count`` плюс
+сумма частей ``ReactionCounterShard``. Новая реакция прибавляется
+к случайной части, снятая вычитается из существующей строки, поэтому
+запись не упирается в одну горячую строку популярного поста. Команда
+``aggregate_reactions`` периодически сводит части в ``ReactionCount``,
+чтобы строк оставалось мало.
+
+Счётчик меняет только ``toggle`` по числу действительно удалённых или
+вставленных строк реакций, поэтому из двух одновременных запросов,
+снимающих одну реакцию, вычтет только один. Реакции удаляемого
+пользователя вычитаются и удаляются пачками до удаления его строки
+(``remove_reactions``), остаток — перед каскадом
+(``remove_user_reactions``).
+
+С общим кэшем (``SHARED_CACHE``) числа для показа лежат в нём по ключу
+на пост и вид и меняются атомарным ``incr``/``decr`` после фиксации
+транзакции. Карточки страницы получают их одним ``get_many``; промахи
+дочитываются двумя выборками строк счётчиков по индексу, без
+агрегирующих запросов. Без общего кэша эти две выборки делаются всегда:
+в кэше процесса числа расходились бы между воркерами.
+"""
+import random
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Reaction, ReactionCount, ReactionCounterShard
+from .moderation import iter_pk_chunks, raw_delete
+
+COUNT_KEY = 'posts:reactions:{}:{}'
+
+
+def _cache_change(post_id, kind, delta):
+    if not settings.SHARED_CACHE:
+        return
+    key = COUNT_KEY.format(post_id, kind)
+
+    def change():
+        try:
+            if delta > 0:
+                cache.incr(key, delta)
+            else:
+                cache.decr(key, -delta)
+        except ValueError:
+            # Значения нет в кэше: его прочитают из базы при показе.
+            pass
+
+    transaction.on_commit(change)
+
+
+def _add_total(post_id, kind, delta):
+    totals = ReactionCount.objects.filter(post_id=post_id, kind=kind)
+    if totals.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            ReactionCount.objects.create(post_id=post_id, kind=kind,
+                                         count=delta)
+    except IntegrityError:
+        totals.update(count=F('count') + delta)
+
+
+def reaction_added(post_id, kind):
+    shard = random.randrange(settings.REACTION_COUNTER_SHARDS)
+    shards = ReactionCounterShard.objects.filter(post_id=post_id, kind=kind,
+                                                 shard=shard)
+    if not shards.update(count=F('count') + 1):
+        try:
+            with transaction.atomic():
+                ReactionCounterShard.objects.create(
+                    post_id=post_id, kind=kind, shard=shard, count=1
+                )
+        except IntegrityError:
+            shards.update(count=F('count') + 1)
+    _cache_change(post_id, kind, 1)
+
+
+def reaction_removed(post_id, kind, count=1):
+    """Вычитаем ``count`` реакций из уже существующей строки счётчика.
+
+    Снятые реакции были прибавлены раньше, поэтому новых строк
+    не создаём.
+    """
+    shards = ReactionCounterShard.objects.filter(post_id=post_id, kind=kind)
+    shard = random.randrange(settings.REACTION_COUNTER_SHARDS)
+    if not shards.filter(shard=shard).update(count=F('count') - count):
+        pk = shards.values_list('pk', flat=True).first()
+        if pk is not None:
+            ReactionCounterShard.objects.filter(pk=pk).update(
+                count=F('count') - count
+            )
+        else:
+            ReactionCount.objects.filter(post_id=post_id, kind=kind).update(
+                count=F('count') - count
+            )
+    _cache_change(post_id, kind, -count)
+
+
+def toggle(user, post_id, kind):
+    """Ставим реакцию или снимаем поставленную. True — если поставили."""
+    with transaction.atomic():
+        deleted, _ = Reaction.objects.filter(
+            user=user, post_id=post_id, kind=kind
+        ).delete()
+        if deleted:
+            reaction_removed(post_id, kind)
+            return False
+        try:
+            with transaction.atomic():
+                Reaction.objects.create(user=user, post_id=post_id,
+                                        kind=kind)
+        except IntegrityError:
+            # Такую же реакцию только что поставил параллельный запрос.
+            return True
+        reaction_added(post_id, kind)
+    return True
+
+
+def _remove_counted(reactions):
+    # Блокировка не даёт параллельному ``toggle`` вычесть их ещё раз.
+    removed = Counter(
+        reactions.select_for_update().values_list('post_id', 'kind')
+    )
+    for (post_id, kind), count in removed.items():
+        reaction_removed(post_id, kind, count)
+    return removed
+
+
+def remove_reactions(pks):
+    """Удаляем реакции ``pks``, вычитая их по разу на пост и вид."""
+    with transaction.atomic():
+        _remove_counted(Reaction.objects.filter(pk__in=pks))
+        raw_delete(Reaction, pks)
+
+
+def remove_user_reactions(user_id):
+    """Вычитаем реакции пользователя перед его удалением.
+
+    Сами строки удалит каскад в той же транзакции.
+    """
+    _remove_counted(Reaction.objects.filter(user_id=user_id))
+
+
+def _load_counts(post_ids):
+    loaded = Counter()
+    for model in (ReactionCount, ReactionCounterShard):
+        for post_id, kind, count in model.objects.filter(
+            post_id__in=post_ids
+        ).values_list('post_id', 'kind', 'count'):
+            loaded[post_id, kind] += count
+    return loaded
+
+
+def get_counts(post_ids):
+    """Числа реакций ``{(post_id, kind): count}`` для постов."""
+    post_ids = list(post_ids)
+    if not settings.SHARED_CACHE:
+        loaded = _load_counts(post_ids)
+        return {(post_id, kind): loaded[post_id, kind]
+                for post_id in post_ids for kind, label in Reaction.KINDS}
+    keys = {
+        COUNT_KEY.format(post_id, kind): (post_id, kind)
+        for post_id in post_ids for kind, label in Reaction.KINDS
+    }
+    cached = cache.get_many(keys)
+    counts = {keys[key]: value for key, value in cached.items()}
+    missing = {post_id for key, (post_id, kind) in keys.items()
+               if key not in cached}
+    if not missing:
+        return counts
+    loaded = _load_counts(missing)
+    values = {}
+    for key, (post_id, kind) in keys.items():
+        if post_id in missing:
+            counts[post_id, kind] = loaded[post_id, kind]
+            values[key] = loaded[post_id, kind]
+    cache.set_many(values, settings.REACTION_CACHE_TIMEOUT)
+    return counts
+
+
+def attach(posts):
+    """Добавляем постам ``reaction_counts``: ``(вид, название, число)``."""
+    posts = list(posts)
+    counts = get_counts([post.pk for post in posts])
+    for post in posts:
+        post.reaction_counts = [
+            (kind, label, counts[post.pk, kind])
+            for kind, label in Reaction.KINDS
+        ]
+    return posts
+
+
+def aggregate(chunk_size=None):
+    """Сводим части счётчиков в ``ReactionCount``.
+
+    Из каждой части вычитается ровно прочитанное значение, поэтому
+    реакции, пришедшие во время сведения, не теряются. Возвращаем
+    число сведённых частей.
+    """
+    done = 0
+    for pks in iter_pk_chunks(
+        ReactionCounterShard.objects.exclude(count=0), chunk_size
+    ):
+        by_count = defaultdict(list)
+        totals = Counter()
+        with transaction.atomic():
+            for pk, post_id, kind, count in (
+                ReactionCounterShard.objects.filter(pk__in=pks)
+                .values_list('pk', 'post_id', 'kind', 'count')
+            ):
+                by_count[count].append(pk)
+                totals[post_id, kind] += count
+            for count, count_pks in by_count.items():
+                ReactionCounterShard.objects.filter(pk__in=count_pks).update(
+                    count=F('count') - count
+                )
+            for (post_id, kind), delta in totals.items():
+                if delta:
+                    _add_total(post_id, kind, delta)
+        done += len(pks)
+    ReactionCounterShard.objects.filter(count=0).delete()
+    return done
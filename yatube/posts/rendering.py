@@ -0,0 +1,17 @@
+"""HTML текстов постов и комментариев, который хранится в базе.
+
+Текст размечается один раз при сохранении, а шаблоны выводят готовый
+HTML, не прогоняя каждый раз ``linebreaks`` по всему тексту.
+"""
+from django.conf import settings
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+
+def render_text(text):
+    return linebreaks(text, autoescape=True)
+
+
+def render_excerpt(text):
+    """Начало текста для карточек в лентах."""
+    return render_text(Truncator(text).chars(settings.POST_EXCERPT_LENGTH))
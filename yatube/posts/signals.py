@@ -0,0 +1,111 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import archive, feeds, group_stats, reactions
+from .caching import (invalidate_author, invalidate_group,
+                      invalidate_group_choices, invalidate_posts)
+from .models import Group, Post, User
+
+# Поля пользователя, которые не попадают в кэш объектов постов.
+USER_UNCACHED_FIELDS = {'last_login', 'password'}
+
+
+def _stored_value(instance, field_name):
+    if instance.pk is None:
+        return None
+    return type(instance).objects.filter(pk=instance.pk).values_list(
+        field_name, flat=True
+    ).first()
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, **kwargs):
+    # Кэш группы лежит по слагу: после переименования сбросим и старый.
+    instance._stored_slug = _stored_value(instance, 'slug')
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления у постов уже не будет группы, авторов берём заранее.
+    instance._feed_scopes = feeds.group_scopes(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    invalidate_group_choices()
+    invalidate_group(instance, getattr(instance, '_stored_slug', None))
+    # Название группы выводится категорией и в общей ленте, и у авторов.
+    feeds.touch(getattr(instance, '_feed_scopes', None)
+                or feeds.group_scopes(instance.pk))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    archive.delete_scope(archive.group_scope(instance.pk))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    invalidate_posts([instance.pk])
+    cache.delete(make_template_fragment_key('post_body', [instance.pk]))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    old_group_id = getattr(instance, '_loaded_group_id', None)
+    archive.post_saved(instance, created, old_group_id)
+    group_stats.post_saved(instance, created, old_group_id)
+    feeds.touch(feeds.post_scopes(instance.author_id, old_group_id,
+                                  instance.group_id))
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    archive.post_deleted(instance)
+    group_stats.post_deleted(instance)
+    feeds.touch(feeds.post_scopes(instance.author_id, instance.group_id))
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= USER_UNCACHED_FIELDS:
+        return
+    instance._stored_username = _stored_value(instance, 'username')
+    instance._stored_is_active = _stored_value(instance, 'is_active')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= USER_UNCACHED_FIELDS:
+        return
+    invalidate_author(instance, getattr(instance, '_stored_username', None))
+    # Имя автора выводится в записях, а блокировка убирает их из лент.
+    feeds.touch(feeds.post_scopes(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def user_activity_changed(sender, instance, created, **kwargs):
+    # Счётчики архива и групп учитывают только посты активных авторов.
+    was_active = getattr(instance, '_stored_is_active', None)
+    instance._stored_is_active = None
+    if created or was_active is None or was_active == instance.is_active:
+        return
+    archive.author_visibility_changed(instance.pk, instance.is_active)
+    group_stats.author_visibility_changed(instance.pk, instance.is_active)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    reactions.remove_user_reactions(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    archive.delete_scope(archive.author_scope(instance.pk))
@@ -0,0 +1,188 @@
+"""Статические карты сайта для поисковых роботов.
+
+Посты, профили авторов и группы делятся на куски по диапазонам
+первичного ключа (``SITEMAP_SHARD_SIZE`` адресов, не больше 50 000),
+каждый кусок пишется в свой файл в ``SITEMAP_ROOT``, а sitemap.xml
+перечисляет их все. Строки читаются через ``iterator()`` и сразу
+пишутся в файл, поэтому память не растёт с числом постов.
+
+Для каждого куска в state.json хранится подпись: число строк, сумма
+первичных ключей и последняя дата публикации. Подпись считается одним
+агрегирующим запросом, и кусок с прежней подписью не перезаписывается.
+Смена имени пользователя или слага группы подпись не меняет — после
+таких правок нужен полный пересчёт (``build_sitemaps --force``).
+"""
+import json
+import os
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Group, Post, User
+
+INDEX_NAME = 'sitemap.xml'
+STATE_NAME = 'state.json'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def _signature(queryset, pk_field, lastmod_field):
+    return queryset.aggregate(
+        count=Count(pk_field),
+        pk_sum=Sum(pk_field),
+        lastmod=Max(lastmod_field),
+    )
+
+
+def _post_rows(lo, hi, chunk_size):
+    rows = (
+        Post.objects.visible().filter(pk__range=(lo, hi)).order_by('pk')
+        .values_list('pk', 'pub_date').iterator(chunk_size=chunk_size)
+    )
+    for pk, pub_date in rows:
+        yield reverse('posts:post_detail', args=(pk,)), pub_date
+
+
+def _post_signature(lo, hi):
+    return _signature(Post.objects.visible().filter(pk__range=(lo, hi)),
+                      'pk', 'pub_date')
+
+
+def _profile_rows(lo, hi, chunk_size):
+    rows = (
+        User.objects.filter(is_active=True, pk__range=(lo, hi))
+        .annotate(lastmod=Max('posts__pub_date'))
+        .filter(lastmod__isnull=False).order_by('pk')
+        .values_list('username', 'lastmod').iterator(chunk_size=chunk_size)
+    )
+    for username, lastmod in rows:
+        yield reverse('posts:profile', args=(username,)), lastmod
+
+
+def _profile_signature(lo, hi):
+    # Профиль меняется вместе с постами автора, подпись считаем по ним.
+    return _signature(
+        Post.objects.visible().filter(author__pk__range=(lo, hi)),
+        'pk', 'pub_date',
+    )
+
+
+def _group_rows(lo, hi, chunk_size):
+    rows = (
+        Group.objects.filter(is_deleted=False, pk__range=(lo, hi))
+        .order_by('pk').values_list('slug', 'stats__last_pub_date')
+        .iterator(chunk_size=chunk_size)
+    )
+    for slug, lastmod in rows:
+        yield reverse('posts:group_list', args=(slug,)), lastmod
+
+
+def _group_signature(lo, hi):
+    return _signature(
+        Group.objects.filter(is_deleted=False, pk__range=(lo, hi)),
+        'pk', 'stats__last_pub_date',
+    )
+
+
+SECTIONS = (
+    ('posts', Post, _post_rows, _post_signature),
+    ('profiles', User, _profile_rows, _profile_signature),
+    ('groups', Group, _group_rows, _group_signature),
+)
+
+
+def _path(name):
+    return os.path.join(settings.SITEMAP_ROOT, name)
+
+
+def _url(path):
+    return settings.SITEMAP_BASE_URL + path
+
+
+def _lastmod(value):
+    if value is None:
+        return ''
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return f'<lastmod>{value.isoformat(timespec="seconds")}</lastmod>'
+
+
+def _write(name, opening, lines, closing):
+    """Пишем файл построчно во временный и подменяем им старый."""
+    path = _path(name)
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as stream:
+        stream.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        stream.write(f'<{opening} xmlns="{XMLNS}">\n')
+        for line in lines:
+            stream.write(line)
+        stream.write(f'</{closing}>\n')
+    os.replace(temporary, path)
+
+
+def _write_shard(name, rows):
+    _write(name, 'urlset', (
+        f'<url><loc>{escape(_url(location))}</loc>{_lastmod(lastmod)}'
+        '</url>\n'
+        for location, lastmod in rows
+    ), 'urlset')
+
+
+def _write_index(shards):
+    _write(INDEX_NAME, 'sitemapindex', (
+        f'<sitemap><loc>{escape(_url(settings.SITEMAP_URL + name))}</loc>'
+        f'{_lastmod(lastmod)}</sitemap>\n'
+        for name, lastmod in shards
+    ), 'sitemapindex')
+
+
+def _load_state():
+    try:
+        with open(_path(STATE_NAME), encoding='utf-8') as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return {}
+
+
+def _shard_name(section, shard):
+    return f'sitemap-{section}-{shard}.xml'
+
+
+def build(force=False, chunk_size=2000):
+    """Перезаписываем изменившиеся куски и индекс.
+
+    Возвращаем имена записанных и удалённых файлов кусков.
+    """
+    os.makedirs(settings.SITEMAP_ROOT, exist_ok=True)
+    size = settings.SITEMAP_SHARD_SIZE
+    state = _load_state()
+    new_state = {}
+    shards = []
+    written = []
+    for section, model, rows, signature in SECTIONS:
+        max_pk = model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+        for shard in range(max_pk // size + 1):
+            lo, hi = shard * size + 1, (shard + 1) * size
+            current = signature(lo, hi)
+            if not current['count']:
+                continue
+            name = _shard_name(section, shard)
+            lastmod = current['lastmod']
+            new_state[name] = [current['count'], current['pk_sum'],
+                               lastmod.isoformat() if lastmod else None]
+            shards.append((name, lastmod))
+            if (force or state.get(name) != new_state[name]
+                    or not os.path.exists(_path(name))):
+                _write_shard(name, rows(lo, hi, chunk_size))
+                written.append(name)
+    removed = [name for name in state if name not in new_state]
+    for name in removed:
+        if os.path.exists(_path(name)):
+            os.remove(_path(name))
+    if written or removed or not os.path.exists(_path(INDEX_NAME)):
+        _write_index(shards)
+    with open(_path(STATE_NAME), 'w', encoding='utf-8') as stream:
+        json.dump(new_state, stream)
+    return written, removed
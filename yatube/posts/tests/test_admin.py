@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, Group, Comment
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='pass'
+        )
+        cls.group = Group.objects.create(title='test1', slug='test-slug')
+        Group.objects.create(title='test2', slug='test-slug2')
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(AdminChangelistTests.admin)
+
+    def tearDown(self):
+        cache.clear()
+
+    def create_posts(self, count):
+        for _ in range(count):
+            post = Post.objects.create(
+                text='Заголовок',
+                author=AdminChangelistTests.admin,
+                group=AdminChangelistTests.group,
+            )
+            Comment.objects.create(
+                post=post, author=AdminChangelistTests.admin, text='Текст'
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        self.admin_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.admin_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_depend_on_rows(self):
+        """Число запросов списка в админке не растёт с числом строк"""
+        for url in (reverse('admin:posts_post_changelist'),
+                    reverse('admin:posts_comment_changelist')):
+            with self.subTest(url=url):
+                Post.objects.all().delete()
+                self.create_posts(2)
+                few = self.count_queries(url)
+                self.create_posts(8)
+                many = self.count_queries(url)
+                self.assertEqual(few, many)
+
+    def test_changelist_count_is_cached(self):
+        """Количество строк в админке берётся из кэша"""
+        self.create_posts(3)
+        url = reverse('admin:posts_post_changelist')
+        self.admin_client.get(url)
+        Post.objects.filter(pk=Post.objects.first().pk).delete()
+        response = self.admin_client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 3)
@@ -0,0 +1,178 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import archive
+from posts.models import DailyPostCount, Group, MonthlyPostCount, Post
+from posts.moderation import delete_posts, move_posts
+
+User = get_user_model()
+
+
+def create_post(date, **kwargs):
+    published = timezone.make_aware(datetime.datetime(*date, 12))
+    with mock.patch('django.utils.timezone.now', return_value=published):
+        return Post.objects.create(text='Заголовок', **kwargs)
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.group = Group.objects.create(title='test1', slug='test-slug')
+        cls.other_group = Group.objects.create(title='test2', slug='other')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.posts = [
+            create_post((2021, 12, 31), author=ArchiveTests.user,
+                        group=ArchiveTests.group),
+            create_post((2022, 3, 1), author=ArchiveTests.user,
+                        group=ArchiveTests.group),
+            create_post((2022, 3, 15), author=ArchiveTests.user),
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    def counts(self, scope):
+        return {
+            month.strftime('%Y-%m'): count
+            for month, count in MonthlyPostCount.objects.filter(
+                scope=scope, count__gt=0
+            ).values_list('month', 'count')
+        }
+
+    def test_counts_follow_saves_and_deletes(self):
+        """Счётчики меняются при создании, переносе и удалении поста"""
+        group_scope = archive.group_scope(ArchiveTests.group.pk)
+        self.assertEqual(self.counts(archive.ALL_SCOPE),
+                         {'2021-12': 1, '2022-03': 2})
+        self.assertEqual(self.counts(group_scope),
+                         {'2021-12': 1, '2022-03': 1})
+        post = Post.objects.get(pk=self.posts[2].pk)
+        post.group = ArchiveTests.group
+        post.save()
+        self.assertEqual(self.counts(group_scope),
+                         {'2021-12': 1, '2022-03': 2})
+        post.delete()
+        self.assertEqual(self.counts(group_scope),
+                         {'2021-12': 1, '2022-03': 1})
+        self.assertEqual(
+            self.counts(archive.author_scope(ArchiveTests.user.pk)),
+            {'2021-12': 1, '2022-03': 1},
+        )
+
+    def test_moderation_updates_counts(self):
+        """Массовые операции модерации обновляют счётчики"""
+        move_posts(Post.objects.filter(group=ArchiveTests.group),
+                   ArchiveTests.other_group.pk)
+        self.assertEqual(
+            self.counts(archive.group_scope(ArchiveTests.group.pk)), {}
+        )
+        self.assertEqual(
+            self.counts(archive.group_scope(ArchiveTests.other_group.pk)),
+            {'2021-12': 1, '2022-03': 1},
+        )
+        delete_posts(Post.objects.filter(pk=self.posts[1].pk))
+        self.assertEqual(self.counts(archive.ALL_SCOPE),
+                         {'2021-12': 1, '2022-03': 1})
+
+    def test_rebuild_matches_incremental_counts(self):
+        """Пересчёт с нуля даёт те же счётчики"""
+        before = list(MonthlyPostCount.objects.values_list(
+            'scope', 'month', 'count'
+        ))
+        days = list(DailyPostCount.objects.values_list(
+            'scope', 'day', 'count'
+        ))
+        MonthlyPostCount.objects.all().delete()
+        DailyPostCount.objects.all().delete()
+        archive.rebuild()
+        self.assertCountEqual(
+            MonthlyPostCount.objects.values_list('scope', 'month', 'count'),
+            before,
+        )
+        self.assertCountEqual(
+            DailyPostCount.objects.values_list('scope', 'day', 'count'),
+            days,
+        )
+
+    def test_missing_counts_do_not_go_negative(self):
+        """Удаление поста без строки счётчика не уводит его ниже нуля"""
+        MonthlyPostCount.objects.update(count=0)
+        DailyPostCount.objects.all().delete()
+        self.posts[1].delete()
+        delete_posts(Post.objects.filter(pk=self.posts[2].pk))
+        self.assertFalse(
+            MonthlyPostCount.objects.filter(count__gt=0, month__year=2022)
+            .exists()
+        )
+        self.assertFalse(DailyPostCount.objects.exists())
+
+    def test_hidden_author_is_not_counted(self):
+        """Посты заблокированного автора не попадают в счётчики"""
+        blocked = User.objects.create_user(username='blocked')
+        create_post((2022, 3, 15), author=blocked)
+        self.assertEqual(self.counts(archive.ALL_SCOPE),
+                         {'2021-12': 1, '2022-03': 3})
+        blocked.is_active = False
+        blocked.save(update_fields=('is_active',))
+        self.assertEqual(self.counts(archive.ALL_SCOPE),
+                         {'2021-12': 1, '2022-03': 2})
+        create_post((2022, 4, 1), author=blocked)
+        self.assertEqual(self.counts(archive.ALL_SCOPE),
+                         {'2021-12': 1, '2022-03': 2})
+        blocked.is_active = True
+        blocked.save()
+        self.assertEqual(self.counts(archive.ALL_SCOPE),
+                         {'2021-12': 1, '2022-03': 3, '2022-04': 1})
+
+    def test_archive_navigation(self):
+        """Архив показывает годы, месяцы, дни и посты за период"""
+        response = self.guest_client.get(reverse('posts:archive'))
+        self.assertEqual(response.context['years'][0][:2], (2022, 2))
+        response = self.guest_client.get(reverse(
+            'posts:group_archive_month',
+            kwargs={'slug': 'test-slug', 'year': 2022, 'month': 3},
+        ))
+        self.assertEqual(
+            [value.day for value, url in response.context['days']], [1]
+        )
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.posts[1]])
+        response = self.guest_client.get(reverse(
+            'posts:profile_archive_day',
+            kwargs={'username': 'StasBasov', 'year': 2022, 'month': 3,
+                    'day': 15},
+        ))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.posts[2]])
+
+    def test_archive_index_does_not_query_posts(self):
+        """Навигация по годам не обращается к таблице постов"""
+        with self.assertNumQueries(1):
+            self.guest_client.get(reverse('posts:archive'))
+
+    def test_day_links_use_daily_counts(self):
+        """Ссылки на дни строятся по счётчикам, а не по таблице постов"""
+        DailyPostCount.objects.filter(day__day=15).delete()
+        response = self.guest_client.get(reverse(
+            'posts:archive_month', kwargs={'year': 2022, 'month': 3},
+        ))
+        self.assertEqual(
+            [value.day for value, url in response.context['days']], [1]
+        )
+
+    def test_invalid_date_returns_404(self):
+        """Несуществующая дата даёт 404"""
+        response = self.guest_client.get(reverse(
+            'posts:archive_day', kwargs={'year': 2022, 'month': 2, 'day': 30}
+        ))
+        self.assertEqual(response.status_code, 404)
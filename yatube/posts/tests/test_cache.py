@@ -0,0 +1,197 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import Http404, HttpResponse
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.urls import reverse
+
+from core.middleware import AnonymousPageCacheMiddleware
+from posts.caching import (get_author_or_404, get_group_or_404,
+                           get_object_cache_stats, get_post_or_404)
+from posts.models import Post, Group
+from posts.moderation import delete_posts
+
+User = get_user_model()
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.group = Group.objects.create(title='test1', slug='test-slug')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(PageCacheTests.user)
+        self.post = Post.objects.create(
+            text='Заголовок', author=PageCacheTests.user,
+            group=PageCacheTests.group,
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_guest_gets_cached_page(self):
+        """Гость получает страницу из полностраничного кэша"""
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        response_1 = self.guest_client.get(url)
+        self.assertIn('public', response_1['Cache-Control'])
+        Post.objects.create(text='Новый пост', author=PageCacheTests.user,
+                            group=PageCacheTests.group)
+        response_2 = self.guest_client.get(url)
+        self.assertEqual(response_1.content, response_2.content)
+        self.assertIsNone(response_2.context)
+        cache.clear()
+        response_3 = self.guest_client.get(url)
+        self.assertContains(response_3, 'Новый пост')
+
+    def test_page_cache_is_per_host(self):
+        """Страница из кэша не переходит на другой хост"""
+        url = reverse('posts:index')
+        self.guest_client.get(url, HTTP_HOST='localhost')
+        response = self.guest_client.get(url, HTTP_HOST='127.0.0.1')
+        self.assertIsNotNone(response.context)
+        response = self.guest_client.get(url, HTTP_HOST='127.0.0.1')
+        self.assertIsNone(response.context)
+
+    def test_authorized_user_bypasses_page_cache(self):
+        """Авторизованный пользователь не получает страницу гостя"""
+        url = reverse('posts:profile', kwargs={'username': 'StasBasov'})
+        self.guest_client.get(url)
+        response = self.authorized_client.get(url)
+        self.assertIsNotNone(response.context)
+        self.assertNotIn('public', response.get('Cache-Control', ''))
+
+    def test_post_body_fragment_invalidated_on_edit(self):
+        """Фрагмент поста сбрасывается при его изменении"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.authorized_client.get(url)
+        self.post.text = 'Исправленный текст'
+        self.post.save()
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Исправленный текст')
+
+    def test_session_cookie_deletion_is_not_cached(self):
+        """Ответ, удаляющий устаревшую сессию, не попадает в кэш гостей"""
+        url = reverse('posts:index')
+        self.guest_client.cookies['sessionid'] = 'expired'
+        response = self.guest_client.get(url)
+        self.assertIn('sessionid', response.cookies)
+        response = self.guest_client.get(url)
+        self.assertIsNotNone(response.context)
+
+    def test_response_with_cookies_is_not_cached(self):
+        """Ответ, устанавливающий cookie, не попадает в кэш гостей"""
+        url = reverse('posts:index')
+        response = self.guest_client.get(url)
+        self.assertIsNotNone(response.context)
+        self.guest_client.cookies['sessionid'] = 'expired'
+        response = self.guest_client.get(url)
+        self.assertIsNone(response.context)
+
+        def set_cookie(response):
+            response.set_cookie('seen', '1')
+            return response
+
+        middleware = AnonymousPageCacheMiddleware(set_cookie)
+        request = RequestFactory().get('/cookie/')
+        request._anonymous_page_cache_key = 'anonymous-page:cookie'
+        middleware.process_response(request, set_cookie(HttpResponse()))
+        self.assertIsNone(cache.get('anonymous-page:cookie'))
+
+
+@override_settings(SHARED_CACHE=True)
+class ObjectCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.group = Group.objects.create(title='test1', slug='test-slug')
+
+    def setUp(self):
+        self.post = Post.objects.create(
+            text='Заголовок', author=ObjectCacheTests.user,
+            group=ObjectCacheTests.group,
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_lookups_are_cached(self):
+        """Группа, автор и пост читаются из базы один раз"""
+        lookups = (
+            (get_group_or_404, 'test-slug'),
+            (get_author_or_404, 'StasBasov'),
+            (get_post_or_404, self.post.pk),
+        )
+        for lookup, value in lookups:
+            with self.subTest(lookup=lookup.__name__):
+                lookup(value)
+                with self.assertNumQueries(0):
+                    lookup(value)
+        stats = get_object_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (3, 3))
+        out = StringIO()
+        call_command('object_cache_stats', reset=True, stdout=out)
+        self.assertIn('50.0%', out.getvalue())
+        self.assertEqual(get_object_cache_stats()['hits'], 0)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_local_cache_is_not_used(self):
+        """Без общего кэша объекты каждый раз читаются из базы"""
+        get_group_or_404('test-slug')
+        with self.assertNumQueries(1):
+            get_group_or_404('test-slug')
+
+    def test_missing_object_raises_404(self):
+        """Отсутствующий объект даёт 404 и не кэшируется"""
+        with self.assertRaises(Http404):
+            get_group_or_404('missing')
+        Group.objects.create(title='test2', slug='missing')
+        self.assertEqual(get_group_or_404('missing').title, 'test2')
+
+    def test_changes_invalidate_cache(self):
+        """Изменение группы или автора сбрасывает их и посты в кэше"""
+        get_post_or_404(self.post.pk)
+        get_group_or_404('test-slug')
+        group = Group.objects.get(pk=ObjectCacheTests.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        self.assertEqual(get_group_or_404('test-slug').title,
+                         'Новое название')
+        self.assertEqual(get_post_or_404(self.post.pk).group.title,
+                         'Новое название')
+        author = User.objects.get(pk=ObjectCacheTests.user.pk)
+        author.is_active = False
+        author.save(update_fields=('is_active',))
+        with self.assertRaises(Http404):
+            get_author_or_404('StasBasov')
+        with self.assertRaises(Http404):
+            get_post_or_404(self.post.pk)
+
+    def test_rename_invalidates_old_key(self):
+        """Старый слаг и старое имя автора перестают открываться"""
+        get_group_or_404('test-slug')
+        get_author_or_404('StasBasov')
+        group = Group.objects.get(pk=ObjectCacheTests.group.pk)
+        group.slug = 'new-slug'
+        group.save()
+        author = User.objects.get(pk=ObjectCacheTests.user.pk)
+        author.username = 'NewName'
+        author.save()
+        with self.assertRaises(Http404):
+            get_group_or_404('test-slug')
+        with self.assertRaises(Http404):
+            get_author_or_404('StasBasov')
+        self.assertEqual(get_group_or_404('new-slug').pk, group.pk)
+
+    def test_moderation_invalidates_posts(self):
+        """Массовое удаление постов сбрасывает их в кэше"""
+        get_post_or_404(self.post.pk)
+        delete_posts(Post.objects.filter(pk=self.post.pk))
+        with self.assertRaises(Http404):
+            get_post_or_404(self.post.pk)
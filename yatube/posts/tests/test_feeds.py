@@ -0,0 +1,147 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.moderation import delete_posts, move_posts
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov',
+                                            first_name='Стас')
+        cls.group = Group.objects.create(title='Первая', slug='first',
+                                         description='Описание')
+        cls.other = Group.objects.create(title='Вторая', slug='second',
+                                         description='Описание')
+
+    def setUp(self):
+        self.client = Client()
+        self.post = Post.objects.create(text='Пост в группе & <теги>',
+                                        author=FeedTests.user,
+                                        group=FeedTests.group)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_feeds_list_posts(self):
+        """RSS и Atom ленты, группы и автора содержат посты"""
+        link = reverse('posts:post_detail', args=(self.post.pk,))
+        for name, args in (
+            ('posts:feed', ()),
+            ('posts:group_feed', (FeedTests.group.slug,)),
+            ('posts:profile_feed', (FeedTests.user.username,)),
+        ):
+            for fmt, content_type in (('rss', 'application/rss+xml'),
+                                      ('atom', 'application/atom+xml')):
+                with self.subTest(name=name, fmt=fmt):
+                    response = self.client.get(reverse(f'{name}_{fmt}',
+                                                       args=args))
+                    self.assertTrue(
+                        response['Content-Type'].startswith(content_type)
+                    )
+                    self.assertContains(response, link)
+                    self.assertContains(response, 'Пост в группе &amp;amp;')
+                    self.assertTrue(response.has_header('ETag'))
+                    self.assertTrue(response.has_header('Last-Modified'))
+        response = self.client.get(
+            reverse('posts:group_feed_rss', args=(FeedTests.other.slug,))
+        )
+        self.assertNotContains(response, link)
+        response = self.client.get(
+            reverse('posts:group_feed_rss', args=('missing',))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_cached_feed_keeps_host(self):
+        """Лента из кэша содержит ссылки на хост запроса"""
+        url = reverse('posts:feed_rss')
+        self.client.get(url, HTTP_HOST='localhost')
+        response = self.client.get(url, HTTP_HOST='127.0.0.1')
+        self.assertContains(response, 'http://127.0.0.1/')
+        self.assertNotContains(response, 'http://localhost/')
+
+    @override_settings(SHARED_CACHE=True)
+    def test_conditional_get_without_queries(self):
+        """Повторный опрос получает 304, а XML берётся из кэша"""
+        url = reverse('posts:group_feed_atom', args=(FeedTests.group.slug,))
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+            not_modified = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+            by_date = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            )
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(by_date.status_code, 304)
+
+    def test_changes_update_only_affected_feeds(self):
+        """Новый пост меняет ETag только своих лент"""
+        urls = {
+            name: reverse(f'posts:{name}_rss', args=args)
+            for name, args in (
+                ('feed', ()),
+                ('group_feed', (FeedTests.group.slug,)),
+                ('profile_feed', (FeedTests.user.username,)),
+            )
+        }
+        other_url = reverse('posts:group_feed_rss',
+                            args=(FeedTests.other.slug,))
+        etags = {name: self.client.get(url)['ETag']
+                 for name, url in urls.items()}
+        other_etag = self.client.get(other_url)['ETag']
+        Post.objects.create(text='Новый пост', author=FeedTests.user,
+                            group=FeedTests.group)
+        for name, url in urls.items():
+            with self.subTest(name=name):
+                response = self.client.get(url,
+                                           HTTP_IF_NONE_MATCH=etags[name])
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Новый пост')
+        response = self.client.get(other_url, HTTP_IF_NONE_MATCH=other_etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_moderation_updates_feeds(self):
+        """Массовые перенос и удаление постов обновляют ленты"""
+        url = reverse('posts:group_feed_rss', args=(FeedTests.other.slug,))
+        etag = self.client.get(url)['ETag']
+        move_posts(Post.objects.filter(pk=self.post.pk), FeedTests.other.pk)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Пост в группе')
+        etag = response['ETag']
+        delete_posts(Post.objects.filter(pk=self.post.pk))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotContains(response, 'Пост в группе')
+
+    def test_group_rename_updates_feeds(self):
+        """Новое название группы попадает в общую ленту и ленту автора"""
+        urls = [reverse('posts:feed_rss'),
+                reverse('posts:profile_feed_rss',
+                        args=(FeedTests.user.username,))]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        group = Group.objects.get(pk=FeedTests.group.pk)
+        group.title = 'Переименованная'
+        group.save()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertContains(response, 'Переименованная')
+
+    def test_local_stamps_expire(self):
+        """Без общего кэша метки лент живут не дольше FEED_MAX_AGE"""
+        cache.clear()
+        with mock.patch.object(cache, 'add', wraps=cache.add) as add:
+            self.client.get(reverse('posts:feed_rss'))
+        self.assertEqual(add.call_args[0][2], settings.FEED_MAX_AGE)
@@ -0,0 +1,140 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import group_stats
+from posts.models import Group, GroupStats, Post
+from posts.moderation import delete_posts, move_posts
+
+User = get_user_model()
+
+
+def create_post(day, **kwargs):
+    published = timezone.make_aware(datetime.datetime(2022, 3, day))
+    with mock.patch('django.utils.timezone.now', return_value=published):
+        return Post.objects.create(text=f'Пост {day}', **kwargs)
+
+
+class GroupStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='pass'
+        )
+
+    def setUp(self):
+        self.quiet = Group.objects.create(title='Тихая', slug='quiet')
+        self.busy = Group.objects.create(title='Активная', slug='busy')
+        self.old = create_post(1, author=GroupStatsTests.user,
+                               group=self.quiet)
+        self.posts = [
+            create_post(day, author=GroupStatsTests.user, group=self.busy)
+            for day in (2, 3)
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    def stats(self, group):
+        stats = GroupStats.objects.get(group=group)
+        return stats.post_count, stats.last_post_id
+
+    def test_stats_follow_saves_and_deletes(self):
+        """Статистика меняется при создании, переносе и удалении поста"""
+        self.assertEqual(self.stats(self.busy), (2, self.posts[1].pk))
+        post = Post.objects.get(pk=self.posts[1].pk)
+        post.group = self.quiet
+        post.save()
+        self.assertEqual(self.stats(self.busy), (1, self.posts[0].pk))
+        self.assertEqual(self.stats(self.quiet), (2, self.posts[1].pk))
+        post.delete()
+        self.assertEqual(self.stats(self.quiet), (1, self.old.pk))
+
+    def test_admin_list_editable_updates_stats(self):
+        """Смена группы в списке постов админки обновляет статистику"""
+        client = Client()
+        client.force_login(GroupStatsTests.user)
+        posts = Post.objects.order_by('-pk')
+        data = {
+            'form-TOTAL_FORMS': len(posts),
+            'form-INITIAL_FORMS': len(posts),
+            '_save': 'Сохранить',
+        }
+        for i, post in enumerate(posts):
+            data[f'form-{i}-id'] = post.pk
+            data[f'form-{i}-group'] = self.busy.pk
+        client.post(reverse('admin:posts_post_changelist'), data)
+        self.assertEqual(self.stats(self.busy), (3, self.posts[1].pk))
+        self.assertEqual(self.stats(self.quiet), (0, None))
+
+    def test_moderation_updates_stats(self):
+        """Массовые операции модерации обновляют статистику"""
+        move_posts(Post.objects.filter(pk=self.posts[1].pk), self.quiet.pk)
+        self.assertEqual(self.stats(self.busy), (1, self.posts[0].pk))
+        self.assertEqual(self.stats(self.quiet), (2, self.posts[1].pk))
+        delete_posts(Post.objects.filter(group=self.quiet))
+        self.assertEqual(self.stats(self.quiet), (0, None))
+
+    def test_missing_stats_do_not_go_negative(self):
+        """Удаление поста без строки статистики не уводит счётчик ниже нуля"""
+        GroupStats.objects.update(post_count=0)
+        self.posts[1].delete()
+        delete_posts(Post.objects.filter(pk=self.posts[0].pk))
+        self.assertEqual(self.stats(self.busy), (0, None))
+
+    def test_hidden_author_is_not_counted(self):
+        """Блокировка автора убирает его посты из статистики групп"""
+        blocked = User.objects.create_user(username='blocked')
+        post = create_post(4, author=blocked, group=self.busy)
+        self.assertEqual(self.stats(self.busy), (3, post.pk))
+        blocked.is_active = False
+        blocked.save(update_fields=('is_active',))
+        self.assertEqual(self.stats(self.busy), (2, self.posts[1].pk))
+        create_post(5, author=blocked, group=self.busy)
+        self.assertEqual(self.stats(self.busy), (2, self.posts[1].pk))
+        blocked.is_active = True
+        blocked.save()
+        self.assertEqual(self.stats(self.busy)[0], 4)
+
+    def test_rebuild_matches_incremental_stats(self):
+        """Пересчёт с нуля даёт ту же статистику"""
+        before = list(GroupStats.objects.values_list(
+            'group_id', 'post_count', 'last_post_id', 'last_pub_date'
+        ))
+        GroupStats.objects.all().delete()
+        self.assertEqual(group_stats.rebuild(), 2)
+        self.assertCountEqual(
+            GroupStats.objects.values_list(
+                'group_id', 'post_count', 'last_post_id', 'last_pub_date'
+            ),
+            before,
+        )
+
+    def test_group_index(self):
+        """Каталог групп сортируется без агрегатов по постам"""
+        Group.objects.create(title='Пустая', slug='empty')
+        url = reverse('posts:group_index')
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(url)
+        self.assertEqual(
+            [group.slug for group in response.context['page_obj']],
+            ['busy', 'quiet', 'empty'],
+        )
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'FROM "posts_post"' in query['sql']
+        ])
+        self.assertContains(response, '<p>Пост 3</p>')
+        response = Client().get(url, {'sort': 'title'})
+        self.assertEqual(
+            [group.slug for group in response.context['page_obj']],
+            ['busy', 'empty', 'quiet'],
+        )
@@ -1,6 +1,11 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 
 from ..models import Group, Post, Comment
 
@@ -94,3 +99,58 @@ class CommentModelTest(TestCase):
         comment = CommentModelTest.post
         expected_object_name = comment.text[:settings.COUNT_PREVIEW_SYMBOL]
         self.assertEqual(expected_object_name, str(comment))
+
+
+@override_settings(POST_EXCERPT_LENGTH=20)
+class RenderedTextTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_html_is_rendered_on_save(self):
+        """HTML текста и начала поста сохраняются вместе с постом"""
+        post = Post.objects.create(author=RenderedTextTest.user,
+                                   text='<b>Первый</b>\n\nВторой абзац поста')
+        self.assertEqual(
+            post.text_html,
+            '<p>&lt;b&gt;Первый&lt;/b&gt;</p>\n\n<p>Второй абзац поста</p>'
+        )
+        self.assertEqual(post.excerpt_html,
+                         '<p>&lt;b&gt;Первый&lt;/b&gt;</p>\n\n<p>Втор…</p>')
+        post.text = 'Новый текст'
+        post.save(update_fields=('text',))
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Новый текст</p>')
+        comment = Comment.objects.create(post=post, author=post.author,
+                                         text='Строка\nещё строка')
+        self.assertEqual(comment.text_html, '<p>Строка<br>ещё строка</p>')
+
+    def test_backfill_command(self):
+        """Команда заполняет пустой HTML у старых записей"""
+        post = Post.objects.create(author=RenderedTextTest.user,
+                                   text='Текст')
+        Comment.objects.create(post=post, author=post.author, text='Ответ')
+        Post.objects.update(text_html='', excerpt_html='')
+        Comment.objects.update(text_html='')
+        out = StringIO()
+        call_command('render_text', chunk_size=1, stdout=out)
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Текст</p>')
+        self.assertEqual(post.excerpt_html, '<p>Текст</p>')
+        self.assertEqual(Comment.objects.get().text_html, '<p>Ответ</p>')
+        self.assertIn('обновлено 1', out.getvalue())
+
+    def test_backfill_migration(self):
+        """Миграция заполняет HTML записей, созданных до его появления"""
+        post = Post.objects.create(author=RenderedTextTest.user,
+                                   text='Текст')
+        Comment.objects.create(post=post, author=post.author, text='Ответ')
+        Post.objects.update(text_html='', excerpt_html='')
+        Comment.objects.update(text_html='')
+        migration = import_module('posts.migrations.0021_fill_rendered_text')
+        migration.fill_rendered_text(apps, None)
+        post.refresh_from_db()
+        self.assertEqual((post.text_html, post.excerpt_html),
+                         ('<p>Текст</p>', '<p>Текст</p>'))
+        self.assertEqual(Comment.objects.get().text_html, '<p>Ответ</p>')
@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (TestCase, TransactionTestCase, Client,
+                         override_settings)
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import moderation, reactions
+from posts.models import (Post, Group, Comment, Reaction,
+                          ReactionCounterShard)
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MODERATION_CHUNK_SIZE=2)
+class ModerationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='pass'
+        )
+        cls.spammer = User.objects.create_user(username='spammer')
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.group = Group.objects.create(title='test1', slug='test-slug')
+        cls.group2 = Group.objects.create(title='test2', slug='test-slug2')
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(ModerationTests.admin)
+        self.post = Post.objects.create(text='Текст', author=self.user,
+                                        group=self.group)
+        for i in range(5):
+            spam = Post.objects.create(text='Спам', author=self.spammer,
+                                       group=self.group)
+            Comment.objects.create(post=spam, author=self.user, text='Ответ')
+            Comment.objects.create(post=self.post, author=self.spammer,
+                                   text='Спам')
+
+    def run_action(self, url, action, pks, **extra):
+        data = {'action': action, '_selected_action': pks, 'index': 0}
+        data.update(extra)
+        return self.admin_client.post(url, data)
+
+    def test_delete_user_content_action(self):
+        """Удаляются все посты и комментарии выбранных пользователей"""
+        url = reverse('admin:auth_user_changelist')
+        self.run_action(url, 'delete_user_posts', [self.spammer.pk])
+        self.run_action(url, 'delete_user_comments', [self.spammer.pk])
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertFalse(
+            Comment.objects.filter(author=self.spammer).exists()
+        )
+        self.assertFalse(Comment.objects.exclude(post=self.post).exists())
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_move_posts_action(self):
+        """Посты переносятся в выбранную группу"""
+        pks = list(Post.objects.filter(author=self.spammer)
+                   .values_list('pk', flat=True))
+        self.run_action(reverse('admin:posts_post_changelist'),
+                        'move_to_group', pks, target_group=self.group2.pk)
+        self.assertEqual(Post.objects.filter(group=self.group2).count(), 5)
+        self.assertEqual(Post.objects.filter(group=self.group).count(), 1)
+
+    def test_purge_by_date_action(self):
+        """Удаляются только посты из указанного периода"""
+        old = timezone.now() - timedelta(days=30)
+        Post.objects.filter(author=self.spammer).update(pub_date=old)
+        today = timezone.now().date()
+        self.run_action(
+            reverse('admin:posts_post_changelist'),
+            'purge_by_date',
+            list(Post.objects.values_list('pk', flat=True)),
+            date_from=(today - timedelta(days=40)).isoformat(),
+            date_to=(today - timedelta(days=20)).isoformat(),
+        )
+        self.assertEqual(list(Post.objects.all()), [self.post])
+
+    def test_delete_posts_with_reactions(self):
+        """Посты удаляются вместе с реакциями и счётчиками реакций"""
+        spam = Post.objects.filter(author=self.spammer).first()
+        reactions.toggle(self.user, spam.pk, Reaction.LIKE)
+        self.run_action(reverse('admin:auth_user_changelist'),
+                        'delete_user_posts', [self.spammer.pk])
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertFalse(Reaction.objects.exists())
+        self.assertFalse(ReactionCounterShard.objects.exists())
+
+    @override_settings(MODERATION_IN_BACKGROUND=True,
+                       TASKS_ALWAYS_EAGER=True)
+    def test_background_dispatch(self):
+        """Операция может выполняться через фоновые задачи"""
+        self.run_action(reverse('admin:posts_comment_changelist'),
+                        'delete_comments',
+                        list(Comment.objects.values_list('pk', flat=True)))
+        self.assertFalse(Comment.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ModerationImageTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_images_are_deleted(self):
+        """Вместе с постами удаляются файлы картинок"""
+        user = User.objects.create_user(username='spammer')
+        post = Post.objects.create(
+            text='Спам',
+            author=user,
+            image=SimpleUploadedFile('spam.gif', SMALL_GIF, 'image/gif'),
+        )
+        path = post.image.path
+        self.assertTrue(os.path.exists(path))
+        moderation.delete_posts(Post.objects.filter(author=user))
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, Group, Comment, Follow, PendingPurge
+from posts.purge import (purge_pending, schedule_group_deletion,
+                         schedule_user_deletion)
+
+User = get_user_model()
+
+
+class SoftDeleteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='pass'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.admin_client = Client()
+        self.admin_client.force_login(SoftDeleteTests.admin)
+        self.author = User.objects.create_user(username='StasBasov')
+        self.group = Group.objects.create(title='test1', slug='test-slug')
+        self.post = Post.objects.create(text='Заголовок', author=self.author,
+                                        group=self.group)
+        other_post = Post.objects.create(text='Другой', author=self.reader)
+        Comment.objects.create(post=other_post, author=self.author,
+                               text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_deleted_user_is_hidden_immediately(self):
+        """Удалённый пользователь сразу скрыт с сайта"""
+        schedule_user_deletion(self.author)
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'StasBasov'})
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotIn(self.post, response.context['page_obj'])
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_purge_removes_user_and_dependent_rows(self):
+        """Фоновая очистка удаляет пользователя и все его данные"""
+        schedule_user_deletion(self.author)
+        self.assertEqual(purge_pending(chunk_size=1), 1)
+        self.assertFalse(User.objects.filter(username='StasBasov').exists())
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(PendingPurge.objects.exists())
+
+    def test_purge_group_keeps_posts(self):
+        """Удаление группы оставляет посты без группы"""
+        schedule_group_deletion(self.group)
+        response = self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        )
+        self.assertEqual(response.status_code, 404)
+        purge_pending()
+        self.assertFalse(Group.objects.exists())
+        self.post.refresh_from_db()
+        self.assertIsNone(self.post.group)
+
+    def test_admin_delete_is_soft(self):
+        """Удаление пользователя в админке только помечает его"""
+        self.admin_client.post(
+            reverse('admin:auth_user_delete', args=(self.author.pk,)),
+            {'post': 'yes'},
+        )
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        self.assertTrue(PendingPurge.objects.filter(user=self.author).exists())
+
+    def test_admin_tells_deleted_from_blocked(self):
+        """Админка отличает удалённого пользователя от заблокированного"""
+        schedule_user_deletion(self.author)
+        self.reader.is_active = False
+        self.reader.save()
+        response = self.admin_client.get(
+            reverse('admin:auth_user_changelist')
+        )
+        self.assertContains(response, 'Ожидает удаления')
+        user_admin = response.context['cl'].model_admin
+        self.assertEqual(
+            {user.username: user_admin.pending_deletion(user)
+             for user in response.context['cl'].result_list},
+            {'admin': False, 'reader': False, 'StasBasov': True},
+        )
+        response = self.admin_client.get(
+            reverse('admin:auth_user_change', args=(self.author.pk,))
+        )
+        form = response.context['adminform'].form
+        self.assertNotIn('is_active', form.fields)
@@ -0,0 +1,81 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import ranking
+from posts.models import Post, PostScore
+
+User = get_user_model()
+
+
+@override_settings(POPULAR_TOP_SIZE=2, POPULAR_HALF_LIFE=60 * 60,
+                   COUNT_POSTS_ON_PAGE=1)
+class RankingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+
+    def setUp(self):
+        self.client.force_login(RankingTests.user)
+        self.posts = [
+            Post.objects.create(text=f'Пост {i}', author=RankingTests.user)
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    def comment(self, post, times=1):
+        for _ in range(times):
+            self.client.post(
+                reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+                {'text': 'Комментарий'},
+            )
+
+    def test_comment_increments_score_and_top(self):
+        """Комментарий повышает рейтинг поста и обновляет топ"""
+        self.comment(self.posts[0])
+        self.comment(self.posts[1], times=2)
+        self.assertEqual(PostScore.objects.get(post=self.posts[1]).score, 2)
+        self.assertEqual(
+            ranking.get_top(),
+            [(self.posts[1].pk, 2.0), (self.posts[0].pk, 1.0)],
+        )
+        self.comment(self.posts[2], times=3)
+        self.assertEqual(
+            [post_id for post_id, score in ranking.get_top()],
+            [self.posts[2].pk, self.posts[1].pk],
+        )
+
+    def test_decay_halves_scores_and_drops_cold_posts(self):
+        """Затухание уменьшает рейтинги и удаляет остывшие"""
+        self.comment(self.posts[0], times=4)
+        self.comment(self.posts[1])
+        later = timezone.now() + datetime.timedelta(hours=5)
+        self.assertEqual(ranking.decay_scores(chunk_size=1, now=later), 2)
+        self.assertEqual(list(PostScore.objects.values_list('post_id',
+                                                            flat=True)),
+                         [self.posts[0].pk])
+        self.assertAlmostEqual(PostScore.objects.get().score, 0.125, places=3)
+        out = StringIO()
+        call_command('decay_scores', stdout=out)
+        self.assertIn('Обработано рейтингов: 1', out.getvalue())
+
+    def test_popular_page(self):
+        """Лента популярного упорядочена по рейтингу и разбита на страницы"""
+        self.comment(self.posts[0])
+        self.comment(self.posts[2], times=2)
+        client = Client()
+        response = client.get(reverse('posts:popular'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.posts[2]])
+        response = client.get(reverse('posts:popular'), {'page': 2})
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.posts[0]])
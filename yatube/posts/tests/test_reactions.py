@@ -0,0 +1,154 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import (TestCase, TransactionTestCase, Client,
+                         override_settings)
+from django.urls import reverse
+
+from posts import reactions
+from posts.models import (Post, Reaction, ReactionCount,
+                          ReactionCounterShard)
+from posts.purge import purge_user
+
+User = get_user_model()
+
+
+@override_settings(REACTION_COUNTER_SHARDS=4)
+class ReactionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='StasBasov')
+
+    def setUp(self):
+        self.post = Post.objects.create(text='Пост', author=self.author)
+        self.readers = [User.objects.create_user(username=f'reader{i}')
+                        for i in range(5)]
+        for i, reader in enumerate(self.readers):
+            # Реакции расходятся по разным частям счётчика.
+            with mock.patch('posts.reactions.random.randrange',
+                            return_value=i % 4):
+                reactions.toggle(reader, self.post.pk, Reaction.LIKE)
+
+    def tearDown(self):
+        cache.clear()
+
+    def count(self, kind=Reaction.LIKE):
+        return reactions.get_counts([self.post.pk])[self.post.pk, kind]
+
+    def test_counts_are_sharded(self):
+        """Реакции раскладываются по частям счётчика"""
+        self.assertEqual(
+            ReactionCounterShard.objects.filter(post=self.post).count(), 4
+        )
+        self.assertEqual(self.count(), 5)
+        self.assertEqual(self.count(Reaction.SAD), 0)
+        self.assertFalse(
+            reactions.toggle(self.readers[0], self.post.pk, Reaction.LIKE)
+        )
+        self.assertEqual(self.count(), 4)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Reaction.objects.create(user=self.readers[1], post=self.post,
+                                    kind=Reaction.LIKE)
+
+    def test_react_view_toggles(self):
+        """Повторная реакция снимает поставленную"""
+        client = Client()
+        client.force_login(self.author)
+        url = reverse('posts:react', args=(self.post.pk, Reaction.FIRE))
+        client.post(url)
+        self.assertEqual(self.count(Reaction.FIRE), 1)
+        response = client.get(reverse('posts:post_detail',
+                                      args=(self.post.pk,)))
+        self.assertEqual(response.context['reacted'], {Reaction.FIRE})
+        client.post(url)
+        self.assertEqual(self.count(Reaction.FIRE), 0)
+        self.assertFalse(Reaction.objects.filter(user=self.author).exists())
+        response = client.post(reverse('posts:react',
+                                       args=(self.post.pk, 'unknown')))
+        self.assertEqual(response.status_code, 404)
+
+    def test_aggregate_folds_shards(self):
+        """Сведение переносит части в итог, не меняя чисел"""
+        out = StringIO()
+        call_command('aggregate_reactions', stdout=out)
+        self.assertIn('Сведено частей счётчиков: 4', out.getvalue())
+        self.assertFalse(ReactionCounterShard.objects.exists())
+        self.assertEqual(ReactionCount.objects.get(post=self.post).count, 5)
+        cache.clear()
+        self.assertEqual(self.count(), 5)
+        for user in (self.readers[0], self.author, self.readers[1]):
+            reactions.toggle(user, self.post.pk, Reaction.LIKE)
+        reactions.aggregate()
+        cache.clear()
+        self.assertEqual(self.count(), 4)
+
+    def test_deleting_user_and_post(self):
+        """Удаление пользователя вычитает его реакции, поста — удаляет"""
+        self.readers[0].delete()
+        cache.clear()
+        self.assertEqual(self.count(), 4)
+        self.post.delete()
+        self.assertFalse(ReactionCounterShard.objects.exists())
+
+    def test_purge_removes_reactions_in_batches(self):
+        """Очистка пользователя вычитает реакции по разу на пост и вид"""
+        other = Post.objects.create(text='Другой', author=self.author)
+        for kind in (Reaction.LIKE, Reaction.FIRE):
+            reactions.toggle(self.readers[0], other.pk, kind)
+        with mock.patch('posts.reactions.reaction_removed',
+                        wraps=reactions.reaction_removed) as removed:
+            purge_user(self.readers[0].pk, chunk_size=2)
+        self.assertEqual(removed.call_count, 3)
+        self.assertFalse(Reaction.objects.filter(post=other).exists())
+        cache.clear()
+        self.assertEqual(self.count(), 4)
+        self.assertEqual(
+            reactions.get_counts([other.pk])[other.pk, Reaction.FIRE], 0
+        )
+
+    def test_feed_cards_show_counts(self):
+        """Карточки ленты показывают числа реакций"""
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'Нравится: 5')
+
+
+@override_settings(SHARED_CACHE=True)
+class ReactionCacheTests(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='StasBasov')
+        self.post = Post.objects.create(text='Пост', author=self.author)
+
+    def tearDown(self):
+        cache.clear()
+
+    def count(self):
+        return reactions.get_counts([self.post.pk])[self.post.pk,
+                                                    Reaction.LIKE]
+
+    def test_counts_are_cached(self):
+        """Числа читаются из кэша и меняются после фиксации транзакции"""
+        reactions.toggle(self.author, self.post.pk, Reaction.LIKE)
+        self.assertEqual(self.count(), 1)
+        with transaction.atomic():
+            reactions.toggle(self.author, self.post.pk, Reaction.LIKE)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.count(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count(), 0)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_process_cache_is_not_used(self):
+        """Без общего кэша числа каждый раз читаются из базы"""
+        reactions.toggle(self.author, self.post.pk, Reaction.LIKE)
+        self.count()
+        with self.assertNumQueries(2):
+            self.assertEqual(self.count(), 1)
+        self.assertFalse(cache.get_many([
+            reactions.COUNT_KEY.format(self.post.pk, kind)
+            for kind, label in Reaction.KINDS
+        ]))
@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import sitemaps
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+def shard(pk):
+    return (pk - 1) // 2
+
+
+@override_settings(SITEMAP_SHARD_SIZE=2,
+                   SITEMAP_BASE_URL='https://yatube.example')
+class SitemapTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        override = override_settings(SITEMAP_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.posts = [
+            Post.objects.create(text=f'Пост {i}', author=SitemapTests.user,
+                                group=SitemapTests.group)
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        cache.clear()
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), encoding='utf-8') as stream:
+            return stream.read()
+
+    def test_build_writes_shards_and_index(self):
+        """Посты, профили и группы делятся на куски по первичному ключу"""
+        first = shard(self.posts[0].pk)
+        written, removed = sitemaps.build()
+        self.assertEqual(removed, [])
+        self.assertIn(f'sitemap-posts-{first}.xml', written)
+        index = self.read('sitemap.xml')
+        for name in written:
+            self.assertIn(
+                f'<loc>https://yatube.example/sitemaps/{name}</loc>', index
+            )
+        posts = ''.join(
+            self.read(name) for name in written if '-posts-' in name
+        )
+        for post in self.posts:
+            self.assertIn(
+                f'<loc>https://yatube.example/posts/{post.pk}/</loc>'
+                f'<lastmod>{post.pub_date.isoformat(timespec="seconds")}',
+                posts,
+            )
+        self.assertIn('/profile/StasBasov/',
+                      self.read(f'sitemap-profiles-'
+                                f'{shard(SitemapTests.user.pk)}.xml'))
+        self.assertIn('/group/group/',
+                      self.read(f'sitemap-groups-'
+                                f'{shard(SitemapTests.group.pk)}.xml'))
+
+    def test_rebuild_only_changed_shards(self):
+        """Повторная сборка перезаписывает только изменившиеся куски"""
+        sitemaps.build()
+        self.assertEqual(sitemaps.build(), ([], []))
+        post = Post.objects.create(text='Новый', author=SitemapTests.user)
+        written, removed = sitemaps.build()
+        self.assertCountEqual(written, [
+            f'sitemap-posts-{shard(post.pk)}.xml',
+            f'sitemap-profiles-{shard(SitemapTests.user.pk)}.xml',
+        ])
+        self.assertEqual(removed, [])
+        self.assertIn(f'/posts/{post.pk}/',
+                      self.read(f'sitemap-posts-{shard(post.pk)}.xml'))
+
+        first = shard(self.posts[0].pk)
+        name = f'sitemap-posts-{first}.xml'
+        Post.objects.filter(pk__range=(first * 2 + 1, first * 2 + 2)).delete()
+        written, removed = sitemaps.build()
+        self.assertEqual(removed, [name])
+        self.assertFalse(os.path.exists(os.path.join(self.root, name)))
+        self.assertNotIn(name, self.read('sitemap.xml'))
+
+    def test_command_force(self):
+        """Команда с --force перезаписывает все куски"""
+        sitemaps.build()
+        out = StringIO()
+        call_command('build_sitemaps', '--force', stdout=out)
+        self.assertIn(f'Записано кусков: {len(sitemaps.build(True)[0])}',
+                      out.getvalue())
@@ -0,0 +1,161 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts import moderation, threads
+from posts.models import Comment, Post
+from posts.moderation import delete_comments
+from posts.transfer import export_content, import_content
+
+User = get_user_model()
+
+
+@override_settings(COMMENT_THREADS_ON_PAGE=2, COMMENT_REPLIES_PREVIEW=2,
+                   COMMENTS_ON_PAGE=3, COMMENT_MAX_DEPTH=3)
+class ThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(ThreadTests.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def comment(self, text, parent=None):
+        self.client.post(
+            reverse('posts:add_comment', args=(ThreadTests.post.pk,)),
+            {'text': text, 'parent': parent.pk if parent else ''},
+        )
+        return Comment.objects.get(text=text)
+
+    def test_reply_paths_and_depth_limit(self):
+        """Ответ продолжает путь родителя, глубина ограничена"""
+        root = self.comment('Корень')
+        reply = self.comment('Ответ', root)
+        deep = self.comment('Глубже', reply)
+        deeper = self.comment('Ещё глубже', deep)
+        self.assertEqual(len(root.path), 8)
+        self.assertTrue(reply.path.startswith(root.path))
+        self.assertEqual([c.depth for c in (root, reply, deep, deeper)],
+                         [0, 1, 2, 2])
+        self.assertEqual(deeper.parent, reply)
+        other = Post.objects.create(text='Другой', author=ThreadTests.user)
+        response = self.client.post(
+            reverse('posts:add_comment', args=(other.pk,)),
+            {'text': 'Чужой', 'parent': root.pk},
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_threads_page_in_bounded_queries(self):
+        """Страница веток — один запрос на корни и по одному на ветку"""
+        roots = [self.comment(f'Корень {i}') for i in range(3)]
+        reply = self.comment('Ответ 1', roots[0])
+        self.comment('Ответ 2', reply)
+        self.comment('Ответ 3', roots[0])
+        self.comment('Ответ 4', roots[1])
+        with self.assertNumQueries(3):
+            page_obj, comments = threads.get_threads(ThreadTests.post, 1)
+            self.assertEqual(page_obj.paginator.count, 3)
+            self.assertEqual(
+                [comment.text for comment in comments],
+                ['Корень 0', 'Ответ 1', 'Ответ 2', 'Корень 1', 'Ответ 4'],
+            )
+        self.assertTrue(comments[0].more_replies)
+        self.assertFalse(comments[3].more_replies)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(ThreadTests.post.pk,)),
+            {'page': 2},
+        )
+        self.assertEqual([comment.text for comment in
+                          response.context['comments']], ['Корень 2'])
+
+    def test_thread_page(self):
+        """Страница ветки показывает всё поддерево постранично"""
+        root = self.comment('Корень')
+        self.comment('Другая ветка')
+        replies = [self.comment(f'Ответ {i}', root) for i in range(3)]
+        self.comment('Ответ на ответ', replies[0])
+        url = reverse('posts:comment_thread',
+                      args=(ThreadTests.post.pk, root.pk))
+        response = self.client.get(url)
+        self.assertEqual(
+            [comment.text for comment in response.context['page_obj']],
+            ['Корень', 'Ответ 0', 'Ответ на ответ'],
+        )
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(
+            [comment.text for comment in response.context['page_obj']],
+            ['Ответ 1', 'Ответ 2'],
+        )
+
+    def test_hidden_author_keeps_thread(self):
+        """Комментарий скрытого автора заменяется заглушкой с ответами"""
+        root = self.comment('Корень')
+        blocked = User.objects.create_user(username='blocked')
+        hidden = Comment.objects.create(post=ThreadTests.post,
+                                        author=blocked, text='Скрытый',
+                                        parent=root)
+        self.comment('Ответ на скрытый', hidden)
+        blocked.is_active = False
+        blocked.save()
+        response = self.client.get(
+            reverse('posts:post_detail', args=(ThreadTests.post.pk,))
+        )
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Корень', 'Скрытый', 'Ответ на скрытый'],
+        )
+        self.assertContains(response, 'Комментарий скрыт')
+        self.assertNotContains(response, 'Скрытый</p>')
+        self.assertContains(response, 'Ответ на скрытый')
+
+    def test_delete_removes_replies(self):
+        """Удаление комментария модерацией удаляет и ответы на него"""
+        root = self.comment('Корень')
+        reply = self.comment('Ответ', root)
+        self.comment('Глубже', reply)
+        self.comment('Другая ветка')
+        delete_comments(Comment.objects.filter(pk=root.pk))
+        self.assertEqual(list(Comment.objects.values_list('text', flat=True)),
+                         ['Другая ветка'])
+
+    def test_delete_splits_large_threads(self):
+        """Ветка удаляется частями не больше размера пачки"""
+        root = self.comment('Корень')
+        reply = self.comment('Ответ', root)
+        self.comment('Глубже', reply)
+        self.comment('Ещё ответ', root)
+        with mock.patch('posts.moderation.raw_delete',
+                        wraps=moderation.raw_delete) as raw_delete:
+            delete_comments(Comment.objects.filter(pk__in=[root.pk,
+                                                           reply.pk]), 2)
+        self.assertEqual([len(call[0][1]) for call in
+                          raw_delete.call_args_list], [2, 2])
+        self.assertFalse(Comment.objects.exists())
+
+    def test_transfer_keeps_tree(self):
+        """Выгрузка и загрузка сохраняют дерево комментариев"""
+        root = self.comment('Корень')
+        reply = self.comment('Ответ', root)
+        before = list(Comment.objects.values_list('pk', 'parent_id', 'path',
+                                                  'depth'))
+        stream = StringIO()
+        export_content(stream, 10)
+        Comment.objects.all().delete()
+        import_content(stream.getvalue().splitlines(), 1)
+        self.assertEqual(
+            list(Comment.objects.values_list('pk', 'parent_id', 'path',
+                                             'depth')),
+            before,
+        )
+        self.assertEqual(Comment.objects.get(pk=reply.pk).parent_id,
+                         root.pk)
@@ -0,0 +1,120 @@
+import datetime
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import (Comment, Follow, Group, GroupStats,
+                          MonthlyPostCount, Post)
+
+User = get_user_model()
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.published = timezone.make_aware(datetime.datetime(2021, 5, 1))
+        author = User.objects.create_user(username='StasBasov',
+                                          password='pass')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(title='test1', slug='test-slug')
+        with mock.patch('django.utils.timezone.now',
+                        return_value=self.published):
+            self.posts = [
+                Post.objects.create(text=f'Пост {i}', author=author,
+                                    group=group, image='posts/small.gif')
+                for i in range(5)
+            ]
+            Comment.objects.create(post=self.posts[0], author=reader,
+                                   text='Комментарий')
+        Follow.objects.create(user=reader, author=author)
+        self.path = os.path.join(TEMP_DIR, 'content.jsonl')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_export_import_round_trip(self):
+        """Выгрузка загружается в пустую базу без потерь"""
+        call_command('export_content', self.path, chunk_size=2,
+                     with_credentials=True, stderr=StringIO())
+        with open(self.path, encoding='utf-8') as stream:
+            self.assertEqual(len(stream.readlines()), 10)
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        out = StringIO()
+        call_command('import_content', self.path, batch_size=2, stdout=out)
+        self.assertIn('post: 5', out.getvalue())
+        post = Post.objects.get(pk=self.posts[0].pk)
+        self.assertEqual(post.pub_date, self.published)
+        self.assertEqual(post.author.username, 'StasBasov')
+        self.assertEqual(post.group.slug, 'test-slug')
+        self.assertEqual(post.image.name, 'posts/small.gif')
+        self.assertEqual(post.text_html, '<p>Пост 0</p>')
+        self.assertTrue(post.author.check_password('pass'))
+        comment = Comment.objects.get()
+        self.assertEqual((comment.post_id, comment.created),
+                         (post.pk, self.published))
+        self.assertTrue(Follow.objects.filter(
+            user__username='reader', author__username='StasBasov'
+        ).exists())
+        self.assertEqual(GroupStats.objects.get().post_count, 5)
+        self.assertEqual(
+            MonthlyPostCount.objects.get(scope='all').count, 5
+        )
+
+    def test_credentials_are_exported_on_request(self):
+        """Почта и хэши паролей выгружаются только по флагу"""
+        call_command('export_content', self.path, stderr=StringIO())
+        with open(self.path, encoding='utf-8') as stream:
+            content = stream.read()
+        self.assertNotIn('"password"', content)
+        self.assertNotIn('"email"', content)
+        User.objects.all().delete()
+        call_command('import_content', self.path, stdout=StringIO())
+        self.assertFalse(
+            User.objects.get(username='StasBasov').has_usable_password()
+        )
+
+    @mock.patch('posts.transfer.DATE_UPDATE_CHUNK_SIZE', 2)
+    def test_dates_are_updated_in_chunks(self):
+        """Даты из выгрузки записываются пачками"""
+        call_command('export_content', self.path, stderr=StringIO())
+        User.objects.all().delete()
+        call_command('import_content', self.path, stdout=StringIO())
+        self.assertEqual(
+            set(Post.objects.values_list('pub_date', flat=True)),
+            {self.published},
+        )
+
+    def test_import_is_idempotent(self):
+        """Повторная загрузка не создаёт дубликатов"""
+        call_command('export_content', self.path, stderr=StringIO())
+        call_command('import_content', self.path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_import_stops_on_id_conflict(self):
+        """Занятый другим постом id не даёт загрузить чужие комментарии"""
+        call_command('export_content', self.path, stderr=StringIO())
+        Comment.objects.all().delete()
+        Post.objects.filter(pk=self.posts[0].pk).update(
+            pub_date=timezone.now()
+        )
+        with self.assertRaisesMessage(CommandError, str(self.posts[0].pk)):
+            call_command('import_content', self.path, stdout=StringIO())
+        self.assertFalse(Comment.objects.exists())
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
@@ -6,9 +6,12 @@ from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
+from posts import reactions
 from posts.forms import PostForm
 from posts.models import Post, Group, Follow, Comment
 
@@ -315,3 +318,106 @@ class FollowViewsTest(TestCase):
         self.assertFalse(self.new_post in response_non_follower.context[
             'page_obj']
         )
+
+
+class FeedQueryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov',
+                                            first_name='Стас',
+                                            last_name='Басов')
+        cls.group = Group.objects.create(title='test1', slug='test-slug')
+        Post.objects.create(text='Заголовок', author=cls.user,
+                            group=cls.group)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_feed_loads_only_card_columns(self):
+        """Лента не загружает текст поста и лишние поля автора"""
+        post = Post.objects.for_feed().get()
+        self.assertIn('text', post.get_deferred_fields())
+        self.assertIn('password', post.author.get_deferred_fields())
+        with self.assertNumQueries(0):
+            self.assertEqual(post.author.get_full_name(), 'Стас Басов')
+            self.assertEqual(str(post.author), 'StasBasov')
+            self.assertEqual(post.group.slug, 'test-slug')
+            self.assertEqual(post.excerpt_html, '<p>Заголовок</p>')
+            post.image
+            post.pub_date
+
+    def test_feed_pages_do_not_load_deferred_fields(self):
+        """Страницы лент не догружают отложенные колонки постов"""
+        client = Client()
+        client.force_login(FeedQueryTests.user)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:follow_index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'StasBasov'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(url)
+                self.assertFalse([
+                    query for query in queries.captured_queries
+                    if 'WHERE "posts_post"."id" =' in query['sql']
+                ])
+
+
+@override_settings(
+    SHARED_CACHE=True,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    AUTHENTICATION_BACKENDS=['core.auth.CachedModelBackend'],
+)
+class PageQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='StasBasov')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='test1', slug='test-slug')
+        for _ in range(COUNT_POSTS_FOR_PAGGINATOR):
+            Post.objects.create(text='Заголовок', author=cls.author,
+                                group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(PageQueriesTests.reader)
+        # Пользователь сессии и числа реакций карточек попадают в кэш.
+        self.client.get(reverse('about:author'))
+        reactions.get_counts(Post.objects.values_list('pk', flat=True))
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_profile_in_two_queries(self):
+        """Автор, число постов, подписка и страница — два запроса"""
+        url = reverse('posts:profile', kwargs={'username': 'StasBasov'})
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'page': 2})
+        self.assertTrue(response.context['following'])
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         COUNT_POSTS_FOR_PAGGINATOR)
+        self.assertContains(
+            response, f'Всего постов: {COUNT_POSTS_FOR_PAGGINATOR}'
+        )
+
+    def test_group_in_two_queries(self):
+        """Группа, число постов и страница — два запроса"""
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.num_pages,
+                         3)
+
+    def test_profile_without_posts(self):
+        """Профиль без постов показывает подписку и пустую страницу"""
+        self.client.force_login(PageQueriesTests.author)
+        url = reverse('posts:profile', kwargs={'username': 'reader'})
+        response = self.client.get(url)
+        self.assertFalse(response.context['following'])
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+        self.assertContains(response, 'Всего постов: 0')
@@ -0,0 +1,75 @@
+"""Ветки комментариев поста.
+
+Дерево хранится материализованными путями (``Comment.path``), поэтому
+страница веток — это страница корней по индексу (post, depth, path)
+и по одному запросу-диапазону по индексу (post, path) на каждую ветку.
+Число запросов не зависит от глубины и размера веток.
+"""
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+
+from core.paginator import WindowCountPaginator
+
+from .models import Comment, subtree_bounds
+
+
+def post_comments(post):
+    """Все комментарии поста вместе с авторами.
+
+    Комментарии заблокированных и удалённых авторов не отбрасываются:
+    шаблон выводит вместо них заглушку, иначе ответы на них остались бы
+    без родителя.
+    """
+    return Comment.objects.filter(post=post).select_related('author')
+
+
+def _subtree(queryset, path, include_root=False):
+    start, end = subtree_bounds(path)
+    if include_root:
+        queryset = queryset.filter(path__gte=start)
+    else:
+        queryset = queryset.filter(path__gt=start)
+    return queryset.filter(path__lt=end).order_by('path')
+
+
+def get_threads(post, page_number):
+    """Страница веток и их комментарии в порядке обхода дерева.
+
+    Из каждой ветки берём не больше ``COMMENT_REPLIES_PREVIEW`` ответов;
+    у корня с продолжением ставим ``more_replies``.
+    """
+    comments = post_comments(post)
+    paginator = WindowCountPaginator(
+        comments.filter(depth=0).order_by('path'),
+        settings.COMMENT_THREADS_ON_PAGE,
+    )
+    page_obj = paginator.get_page(page_number)
+    thread = []
+    limit = settings.COMMENT_REPLIES_PREVIEW
+    for root in page_obj:
+        replies = list(_subtree(comments, root.path)[:limit + 1])
+        root.more_replies = len(replies) > limit
+        thread.append(root)
+        thread.extend(replies[:limit])
+    return page_obj, thread
+
+
+def get_thread(post, comment_id, page_number):
+    """Комментарий и всё его поддерево, постранично."""
+    comments = post_comments(post)
+    root = get_object_or_404(comments, pk=comment_id)
+    paginator = WindowCountPaginator(
+        _subtree(comments, root.path, include_root=True),
+        settings.COMMENTS_ON_PAGE,
+    )
+    return root, paginator.get_page(page_number)
+
+
+def reply_parent(parent):
+    """Родитель для ответа с учётом ``COMMENT_MAX_DEPTH``.
+
+    Ответ на комментарий последнего уровня становится его соседом.
+    """
+    if parent is not None and parent.depth >= settings.COMMENT_MAX_DEPTH - 1:
+        return parent.parent
+    return parent
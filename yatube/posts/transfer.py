@@ -0,0 +1,324 @@
+"""Выгрузка и загрузка контента в формате JSON Lines.
+
+Каждая строка — один объект с полем ``type``: user, group, post, comment
+или follow. Выгрузка читает таблицы через ``iterator()``, загрузка копит
+строки пачками и вставляет их через ``bulk_create``, поэтому расход
+памяти не зависит от объёма данных. Авторы и группы связываются по
+username и slug, посты и комментарии сохраняют свои id. Почта и хэши
+паролей выгружаются только по явному ``credentials=True``; без них
+пользователи загружаются с непригодным паролем.
+
+Пост или комментарий, id которого уже занят в базе тем же объектом
+(тот же автор и дата), пропускается, поэтому загрузку можно повторить.
+Если id занят другим объектом, загрузка останавливается с
+``ImportConflict``: иначе комментарии и ответы из выгрузки попали бы
+к чужим постам и комментариям.
+"""
+import datetime
+import json
+import time
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Case, Value, When
+from django.utils.dateparse import parse_datetime
+
+from . import archive, feeds, group_stats
+from .models import Comment, Follow, Group, Post, User
+
+KINDS = ('user', 'group', 'post', 'comment', 'follow')
+DEPENDENCIES = {
+    'user': (),
+    'group': (),
+    'post': ('user', 'group'),
+    'comment': ('user', 'post'),
+    'follow': ('user',),
+}
+# Сколько дат из выгрузки записывать одним UPDATE: на строку уходит
+# три параметра запроса.
+DATE_UPDATE_CHUNK_SIZE = 300
+
+
+def _exports(credentials):
+    user_fields = ('username', 'first_name', 'last_name', 'is_active',
+                   'date_joined')
+    if credentials:
+        user_fields += ('email', 'password')
+    return (
+        ('user', User.objects.order_by('pk'), user_fields),
+        ('group', Group.objects.order_by('pk'), (
+            'title', 'slug', 'description', 'is_deleted',
+        )),
+        ('post', Post.objects.order_by('pk'), (
+            'id', 'text', 'pub_date', 'author__username', 'group__slug',
+            'image',
+        )),
+        ('comment', Comment.objects.order_by('pk'), (
+            'id', 'post_id', 'parent_id', 'author__username', 'text',
+            'created',
+        )),
+        ('follow', Follow.objects.order_by('pk'), (
+            'user__username', 'author__username',
+        )),
+    )
+
+
+class Progress:
+    """Число обработанных строк и скорость для отчёта."""
+
+    def __init__(self, callback, every):
+        self.callback = callback
+        self.every = every
+        self.started = time.perf_counter()
+        self.counts = dict.fromkeys(KINDS, 0)
+
+    def add(self, kind, count=1):
+        before = self.counts[kind]
+        self.counts[kind] += count
+        if (self.callback is not None
+                and before // self.every != self.counts[kind] // self.every):
+            self.report(kind)
+
+    def report(self, kind):
+        elapsed = time.perf_counter() - self.started
+        total = sum(self.counts.values())
+        self.callback(kind, self.counts[kind], total / elapsed if elapsed
+                      else 0.0)
+
+
+def export_content(stream, chunk_size, progress=None, credentials=False):
+    """Пишем весь контент в поток. Возвращаем число строк по типам.
+
+    ``credentials`` добавляет к пользователям почту и хэши паролей.
+    """
+    report = Progress(progress, chunk_size)
+    for kind, queryset, fields in _exports(credentials):
+        for row in queryset.values(*fields).iterator(chunk_size=chunk_size):
+            row['type'] = kind
+            stream.write(json.dumps(row, cls=DjangoJSONEncoder,
+                                    ensure_ascii=False))
+            stream.write('\n')
+            report.add(kind)
+    return report.counts
+
+
+class ImportConflict(Exception):
+    """Id из выгрузки уже занят в базе другим объектом."""
+
+    def __init__(self, model, pks):
+        self.model = model
+        self.pks = pks
+        super().__init__(
+            f'{model._meta.verbose_name_plural}: id {pks} уже заняты '
+            'другими объектами'
+        )
+
+
+def _identity(values):
+    # DjangoJSONEncoder сохраняет от микросекунд только миллисекунды.
+    return tuple(
+        value.replace(microsecond=value.microsecond // 1000 * 1000)
+        if isinstance(value, datetime.datetime) else value
+        for value in values
+    )
+
+
+def _new_objects(model, objects, fields):
+    """Отбрасываем объекты, уже загруженные раньше под теми же id.
+
+    Объект считается тем же, если совпадают ``fields``; другой объект
+    под тем же id — ``ImportConflict``.
+    """
+    existing = {
+        row[0]: _identity(row[1:])
+        for row in model.objects.filter(
+            pk__in=[obj.pk for obj in objects]
+        ).values_list('pk', *fields)
+    }
+    conflicts = [
+        obj.pk for obj in objects if obj.pk in existing
+        and existing[obj.pk] != _identity(
+            getattr(obj, field) for field in fields
+        )
+    ]
+    if conflicts:
+        raise ImportConflict(model, conflicts)
+    return [obj for obj in objects if obj.pk not in existing]
+
+
+def _create_keeping_dates(model, objects, field_name):
+    """Вставляем объекты и возвращаем им даты из выгрузки.
+
+    ``bulk_create`` ставит полям с ``auto_now_add`` текущее время,
+    поэтому даты записываются следующими запросами, по
+    ``DATE_UPDATE_CHUNK_SIZE`` строк.
+    """
+    dates = [(obj.pk, getattr(obj, field_name)) for obj in objects]
+    model.objects.bulk_create(objects)
+    field = model._meta.get_field(field_name)
+    for start in range(0, len(dates), DATE_UPDATE_CHUNK_SIZE):
+        chunk = dates[start:start + DATE_UPDATE_CHUNK_SIZE]
+        model.objects.filter(pk__in=[pk for pk, date in chunk]).update(**{
+            field_name: Case(
+                *[When(pk=pk, then=Value(date)) for pk, date in chunk],
+                output_field=field,
+            ),
+        })
+
+
+def _ids(model, field_name, values):
+    return dict(model.objects.filter(**{
+        f'{field_name}__in': values,
+    }).values_list(field_name, 'pk'))
+
+
+class Importer:
+    """Загрузка строк выгрузки пачками по ``batch_size``."""
+
+    def __init__(self, batch_size, progress=None):
+        self.batch_size = batch_size
+        self.buffers = {kind: [] for kind in KINDS}
+        self.progress = Progress(progress, batch_size)
+        self.skipped = 0
+        self.feed_scopes = set()
+
+    def add(self, record):
+        kind = record.pop('type')
+        self.buffers[kind].append(record)
+        if len(self.buffers[kind]) >= self.batch_size:
+            self.flush(kind)
+
+    def flush(self, kind):
+        for dependency in DEPENDENCIES[kind]:
+            self.flush(dependency)
+        rows, self.buffers[kind] = self.buffers[kind], []
+        if not rows:
+            return
+        with transaction.atomic():
+            getattr(self, f'_import_{kind}s')(rows)
+        self.progress.add(kind, len(rows))
+
+    def finish(self):
+        """Дописываем остатки и пересчитываем производные данные."""
+        for kind in KINDS:
+            self.flush(kind)
+        return self.refresh()
+
+    def refresh(self):
+        """Сдвигаем счётчики id и пересчитываем производные данные."""
+        sql = connection.ops.sequence_reset_sql(no_style(), [Post, Comment])
+        if sql:
+            with connection.cursor() as cursor:
+                for statement in sql:
+                    cursor.execute(statement)
+        archive.rebuild()
+        group_stats.rebuild()
+        feeds.touch(self.feed_scopes)
+        return self.progress.counts
+
+    def _import_users(self, rows):
+        users = []
+        for row in rows:
+            row['date_joined'] = parse_datetime(row['date_joined'])
+            user = User(**row)
+            if 'password' not in row:
+                user.set_unusable_password()
+            users.append(user)
+        User.objects.bulk_create(users, ignore_conflicts=True)
+
+    def _import_groups(self, rows):
+        Group.objects.bulk_create(
+            [Group(**row) for row in rows], ignore_conflicts=True
+        )
+
+    def _import_posts(self, rows):
+        authors = _ids(User, 'username',
+                       {row['author__username'] for row in rows})
+        groups = _ids(Group, 'slug', {row['group__slug'] for row in rows})
+        posts = []
+        for row in rows:
+            if row['author__username'] not in authors:
+                self.skipped += 1
+                continue
+            post = Post(
+                id=row['id'],
+                text=row['text'],
+                pub_date=parse_datetime(row['pub_date']),
+                author_id=authors[row['author__username']],
+                group_id=groups.get(row['group__slug']),
+                image=row['image'] or '',
+            )
+            post.render()
+            posts.append(post)
+        posts = _new_objects(Post, posts, ('author_id', 'pub_date'))
+        for post in posts:
+            self.feed_scopes.update(feeds.post_scopes(post.author_id,
+                                                      post.group_id))
+        _create_keeping_dates(Post, posts, 'pub_date')
+
+    def _import_comments(self, rows):
+        authors = _ids(User, 'username',
+                       {row['author__username'] for row in rows})
+        post_ids = set(Post.objects.filter(
+            pk__in={row['post_id'] for row in rows}
+        ).values_list('pk', flat=True))
+        # Ответ идёт в выгрузке после родителя: родитель уже в базе
+        # или раньше в этой же пачке.
+        parents = dict(Comment.objects.filter(
+            pk__in={row.get('parent_id') for row in rows}
+        ).values_list('pk', 'path'))
+        comments = []
+        for row in rows:
+            parent_id = row.get('parent_id')
+            if (row['author__username'] not in authors
+                    or row['post_id'] not in post_ids
+                    or parent_id is not None and parent_id not in parents):
+                self.skipped += 1
+                continue
+            comment = Comment(
+                id=row['id'],
+                post_id=row['post_id'],
+                parent_id=parent_id,
+                author_id=authors[row['author__username']],
+                text=row['text'],
+                created=parse_datetime(row['created']),
+            )
+            comment.render()
+            comment.set_path(parents.get(parent_id, ''))
+            parents[comment.pk] = comment.path
+            comments.append(comment)
+        comments = _new_objects(Comment, comments,
+                                ('post_id', 'author_id', 'created'))
+        _create_keeping_dates(Comment, comments, 'created')
+
+    def _import_follows(self, rows):
+        users = _ids(User, 'username', {
+            username for row in rows
+            for username in (row['user__username'], row['author__username'])
+        })
+        follows = []
+        for row in rows:
+            if (row['user__username'] not in users
+                    or row['author__username'] not in users):
+                self.skipped += 1
+                continue
+            follows.append(Follow(user_id=users[row['user__username']],
+                                  author_id=users[row['author__username']]))
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+
+
+def import_content(lines, batch_size, progress=None):
+    """Загружаем строки выгрузки. Возвращаем импортер с итогами."""
+    importer = Importer(batch_size, progress)
+    try:
+        for line in lines:
+            line = line.strip()
+            if line:
+                importer.add(json.loads(line))
+        importer.finish()
+    except ImportConflict:
+        # Уже вставленные пачки остаются, повторный запуск их пропустит.
+        importer.refresh()
+        raise
+    return importer
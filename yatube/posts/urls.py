@@ -1,20 +1,31 @@
 from django.urls import path
 
 from . import views
+from .feeds import FEED_TYPES, PostsFeed
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('popular/', views.popular, name='popular'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('groups/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'),
+    path(
+        'posts/<int:post_id>/comments/<int:comment_id>/',
+        views.comment_thread,
+        name='comment_thread'),
+    path(
+        'posts/<int:post_id>/react/<str:kind>/',
+        views.react,
+        name='react'),
     path('follow/', views.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/',
@@ -27,3 +38,33 @@ urlpatterns = [
         name='unfollow'
     ),
 ]
+
+# Архив по датам: archive/, archive/<год>/, archive/<год>/<месяц>/ и
+# archive/<год>/<месяц>/<день>/ для ленты, группы и автора.
+for prefix, name in (
+    ('', 'archive'),
+    ('group/<slug:slug>/', 'group_archive'),
+    ('profile/<str:username>/', 'profile_archive'),
+):
+    urlpatterns += [
+        path(prefix + 'archive/' + route, views.post_archive,
+             name=name + suffix)
+        for route, suffix in (
+            ('', ''),
+            ('<int:year>/', '_year'),
+            ('<int:year>/<int:month>/', '_month'),
+            ('<int:year>/<int:month>/<int:day>/', '_day'),
+        )
+    ]
+
+# Ленты RSS и Atom: feed/rss/, feed/atom/ и то же для группы и автора.
+for prefix, name, kind in (
+    ('', 'feed', None),
+    ('group/<slug:slug>/', 'group_feed', 'group'),
+    ('profile/<str:username>/', 'profile_feed', 'author'),
+):
+    urlpatterns += [
+        path(f'{prefix}feed/{fmt}/', PostsFeed(kind, fmt),
+             name=f'{name}_{fmt}')
+        for fmt in FEED_TYPES
+    ]
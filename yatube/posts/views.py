@@ -1,28 +1,58 @@
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
-from django.core.paginator import Paginator
-from django.shortcuts import redirect, render, get_object_or_404
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
 from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Exists, F, OuterRef
+from django.urls import reverse
 
-from .models import Post, Group, User, Comment, Follow
+from core.paginator import WindowCountPaginator
+
+from . import archive, ranking, reactions, threads
+from .caching import get_author_or_404, get_group_or_404, get_post_or_404
+from .models import Post, Comment, Follow, Group, Reaction
 from .forms import PostForm, CommentForm
 
 
 def get_page_context(queryset, request):
-    paginator = Paginator(queryset, settings.COUNT_POSTS_ON_PAGE)
+    """Страница постов и их общее число, одним запросом."""
+    paginator = WindowCountPaginator(queryset, settings.COUNT_POSTS_ON_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return {'page_obj': page_obj,
             }
 
 
-@cache_page(20)
+def get_feed_context(queryset, request):
+    """Страница карточек постов вместе с числами реакций."""
+    context = get_page_context(queryset, request)
+    page_obj = context['page_obj']
+    page_obj.object_list = reactions.attach(page_obj.object_list)
+    return context
+
+
 def index(request):
-    post_list = Post.objects.select_related('author', 'group').all()
-    context = get_page_context(post_list, request)
+    post_list = Post.objects.visible().for_feed()
+    context = get_feed_context(post_list, request)
     return render(request, 'posts/index.html', context)
 
 
+def popular(request):
+    """Посты с наибольшим рейтингом по свежим комментариям."""
+    paginator = Paginator(
+        [post_id for post_id, score in ranking.get_top()],
+        settings.COUNT_POSTS_ON_PAGE,
+    )
+    page_obj = paginator.get_page(request.GET.get('page'))
+    posts = Post.objects.visible().for_feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = reactions.attach(
+        posts[post_id] for post_id in page_obj.object_list
+        if post_id in posts
+    )
+    return render(request, 'posts/popular.html', {'page_obj': page_obj})
+
+
 @login_required(redirect_field_name='users:signup')
 def post_create(request):
     form = PostForm(
@@ -42,7 +72,8 @@ def post_create(request):
 
 @login_required(redirect_field_name='users:signup')
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    # Форма сохраняет все поля экземпляра, поэтому берём его из базы.
+    post = get_object_or_404(Post.objects.visible(), pk=post_id)
     if post.author == request.user:
         form = PostForm(
             request.POST or None,
@@ -61,69 +92,145 @@ def post_edit(request, post_id):
         return redirect('posts:post_detail', post_id=post_id)
 
 
+GROUP_ORDERINGS = {
+    'activity': (F('stats__last_pub_date').desc(nulls_last=True), 'pk'),
+    'posts': (F('stats__post_count').desc(nulls_last=True), 'pk'),
+    'title': ('title', 'pk'),
+}
+
+
+def group_index(request):
+    """Каталог групп с числом постов и последним постом."""
+    sort = request.GET.get('sort')
+    if sort not in GROUP_ORDERINGS:
+        sort = 'activity'
+    group_list = (
+        Group.objects.filter(is_deleted=False)
+        .select_related('stats__last_post')
+        .only('title', 'slug', 'stats__post_count', 'stats__last_pub_date',
+              'stats__last_post__excerpt_html')
+        .order_by(*GROUP_ORDERINGS[sort])
+    )
+    context = get_page_context(group_list, request)
+    context['sort'] = sort
+    return render(request, 'posts/group_index.html', context)
+
+
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author').all()
+    group = get_group_or_404(slug)
+    post_list = group.posts.visible().for_feed()
     context = {'group': group,
                }
-    context.update(get_page_context(post_list, request))
+    context.update(get_feed_context(post_list, request))
 
     return render(request, 'posts/group_list.html', context)
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = Post.objects.select_related('author').filter(author=author)
+    author = get_author_or_404(username)
+    post_list = Post.objects.filter(author=author).for_feed()
     user = request.user
-    if user.is_authenticated and user != author:
-        following = Follow.objects.filter(
-            user=user, author=author
-        ).exists()
-    else:
+    can_follow = user.is_authenticated and user != author
+    if can_follow:
+        # Состояние подписки приходит вместе со строками страницы.
+        post_list = post_list.annotate(following=Exists(
+            Follow.objects.filter(user=user, author=OuterRef('author'))
+        ))
+    context = get_feed_context(post_list, request)
+    page_obj = context['page_obj']
+    if not can_follow:
         following = False
-    context = {'author': author,
-               'following': following,
-               }
-    context.update(get_page_context(post_list, request))
+    elif page_obj.object_list:
+        following = page_obj.object_list[0].following
+    else:
+        following = Follow.objects.filter(user=user, author=author).exists()
+    context.update({'author': author,
+                    'following': following,
+                    })
     return render(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comment_form = CommentForm()
-    comments = Comment.objects.filter(post=post)
+    post = get_post_or_404(post_id)
+    reply_to = request.GET.get('reply_to')
+    comment_form = CommentForm(initial={
+        'parent': reply_to if reply_to and reply_to.isdigit() else None,
+    })
+    page_obj, comments = threads.get_threads(post, request.GET.get('page'))
+    reactions.attach([post])
+    if request.user.is_authenticated:
+        reacted = set(Reaction.objects.filter(
+            user=request.user, post=post
+        ).values_list('kind', flat=True))
+    else:
+        reacted = set()
     context = {
         'post': post,
         'form': comment_form,
         'comments': comments,
+        'page_obj': page_obj,
+        'reacted': reacted,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@require_POST
+@login_required
+def react(request, post_id, kind):
+    """Ставим или снимаем реакцию на пост."""
+    post = get_post_or_404(post_id)
+    if kind not in dict(Reaction.KINDS):
+        raise Http404
+    reactions.toggle(request.user, post.pk, kind)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+def comment_thread(request, post_id, comment_id):
+    """Ветка комментариев целиком, постранично."""
+    post = get_post_or_404(post_id)
+    root, page_obj = threads.get_thread(post, comment_id,
+                                        request.GET.get('page'))
+    context = {
+        'post': post,
+        'root': root,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/comment_thread.html', context)
+
+
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_post_or_404(post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
+        parent_id = form.cleaned_data['parent']
+        if parent_id:
+            comment.parent = threads.reply_parent(get_object_or_404(
+                Comment.objects.only('path', 'depth', 'parent'),
+                pk=parent_id, post=post,
+            ))
         comment.author = request.user
         comment.post = post
         comment.save()
+        ranking.record_comment(post.pk)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
     user = request.user
-    post_list = Post.objects.filter(author__following__user=user)
-    context = get_page_context(post_list, request)
+    post_list = Post.objects.visible().filter(
+        author__following__user=user
+    ).for_feed()
+    context = get_feed_context(post_list, request)
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
     user = request.user
-    author = get_object_or_404(User, username=username)
+    author = get_author_or_404(username)
     if user != author:
         Follow.objects.get_or_create(user=user, author=author)
     return redirect('posts:profile', username=username)
@@ -132,7 +239,66 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     user = request.user
-    author = get_object_or_404(User, username=username)
+    author = get_author_or_404(username)
     follow = Follow.objects.get(user=user, author=author)
     follow.delete()
     return redirect('posts:profile', username=username)
+
+
+def post_archive(request, year=None, month=None, day=None, slug=None,
+                 username=None):
+    """Архив ленты, группы или автора по годам, месяцам и дням."""
+    post_list = Post.objects.visible()
+    context = {}
+    url_kwargs = {}
+    if slug is not None:
+        group = get_group_or_404(slug)
+        scope = archive.group_scope(group.pk)
+        post_list = post_list.filter(group=group)
+        url_name = 'posts:group_archive'
+        url_kwargs['slug'] = slug
+        context['group'] = group
+    elif username is not None:
+        author = get_author_or_404(username)
+        scope = archive.author_scope(author.pk)
+        post_list = post_list.filter(author=author)
+        url_name = 'posts:profile_archive'
+        url_kwargs['username'] = username
+        context['author'] = author
+    else:
+        scope = archive.ALL_SCOPE
+        url_name = 'posts:archive'
+
+    def archive_url(*parts):
+        suffix = ('', '_year', '_month', '_day')[len(parts)]
+        kwargs = dict(zip(('year', 'month', 'day'), parts), **url_kwargs)
+        return reverse(url_name + suffix, kwargs=kwargs)
+
+    context.update({
+        'archive_url': archive_url(),
+        'year': year,
+        'month': month,
+        'day': day,
+        'years': [
+            (value, count, archive_url(value))
+            for value, count in archive.get_years(scope)
+        ],
+    })
+    if year is None:
+        return render(request, 'posts/archive.html', context)
+    try:
+        start, end = archive.period_bounds(year, month, day)
+    except (ValueError, OverflowError):
+        raise Http404
+    post_list = post_list.filter(pub_date__gte=start, pub_date__lt=end)
+    context['months'] = [
+        (value, count, archive_url(year, value.month))
+        for value, count in archive.get_months(scope, year)
+    ]
+    if month is not None:
+        context['days'] = [
+            (value, archive_url(year, month, value.day))
+            for value in archive.get_days(scope, year, month)
+        ]
+    context.update(get_feed_context(post_list.for_feed(), request))
+    return render(request, 'posts/archive.html', context)
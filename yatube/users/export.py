@@ -0,0 +1,142 @@
+"""Выгрузка данных пользователя: посты, комментарии и подписки.
+
+Архив собирается на лету: строки читаются из базы пачками, картинки
+копируются из хранилища кусками, а готовые байты сразу отдаются клиенту.
+Одновременно идёт не больше ``USER_EXPORT_SLOTS`` выгрузок на весь сайт
+и не больше одной на пользователя; после выгрузки следующая доступна
+через ``USER_EXPORT_COOLDOWN`` секунд. Слоты и паузы лежат в кэше,
+поэтому без общего кэша (``SHARED_CACHE``) они считаются в каждом
+воркере отдельно: одновременных выгрузок на сайт может быть
+``USER_EXPORT_SLOTS`` на воркер, а пауза не мешает начать выгрузку
+в другом воркере.
+"""
+import json
+import zipfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from posts.models import Comment, Follow, Post
+
+USER_KEY = 'users:export:user:{}'
+SLOT_KEY = 'users:export:slot:{}'
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def iter_records(user, chunk_size):
+    """Строки JSON Lines с данными пользователя."""
+    exports = (
+        ('post', Post.objects.filter(author=user).order_by('pk'), (
+            'id', 'text', 'pub_date', 'group__slug', 'image',
+        )),
+        ('comment', Comment.objects.filter(author=user).order_by('pk'), (
+            'id', 'post_id', 'parent_id', 'text', 'created',
+        )),
+        ('follow', Follow.objects.filter(user=user).order_by('pk'), (
+            'author__username',
+        )),
+    )
+    yield _dump({'type': 'user', 'username': user.username,
+                 'first_name': user.first_name, 'last_name': user.last_name,
+                 'email': user.email, 'date_joined': user.date_joined})
+    for kind, queryset, fields in exports:
+        for row in queryset.values(*fields).iterator(chunk_size=chunk_size):
+            row['type'] = kind
+            yield _dump(row)
+
+
+def _dump(row):
+    return json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+class _Buffer:
+    """Поток без seek для ZipFile: накопленное забирается через take()."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _drain(buffer):
+    data = buffer.take()
+    if data:
+        yield data
+
+
+def iter_zip(user, chunk_size):
+    """ZIP с content.jsonl и картинками постов, по кускам."""
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('content.jsonl', 'w', force_zip64=True) as entry:
+            for line in iter_records(user, chunk_size):
+                entry.write(line.encode())
+                yield from _drain(buffer)
+        images = (
+            Post.objects.filter(author=user).exclude(image='')
+            .order_by('pk').values_list('image', flat=True)
+            .iterator(chunk_size=chunk_size)
+        )
+        for name in images:
+            if not default_storage.exists(name):
+                continue
+            with default_storage.open(name) as source, \
+                    archive.open(name, 'w', force_zip64=True) as entry:
+                for data in iter(lambda: source.read(FILE_CHUNK_SIZE), b''):
+                    entry.write(data)
+                    yield from _drain(buffer)
+    yield from _drain(buffer)
+
+
+def acquire(user):
+    """Занимаем слот выгрузки. Возвращаем ключ слота или None."""
+    if not cache.add(USER_KEY.format(user.pk), True,
+                     settings.USER_EXPORT_TIMEOUT):
+        return None
+    for slot in range(settings.USER_EXPORT_SLOTS):
+        key = SLOT_KEY.format(slot)
+        if cache.add(key, user.pk, settings.USER_EXPORT_TIMEOUT):
+            return key
+    cache.delete(USER_KEY.format(user.pk))
+    return None
+
+
+def release(user, slot_key):
+    cache.delete(slot_key)
+    # Следующую выгрузку пользователь получит не раньше, чем через паузу.
+    cache.set(USER_KEY.format(user.pk), True, settings.USER_EXPORT_COOLDOWN)
+
+
+class ExportStream:
+    """Итератор содержимого ответа, освобождающий слот при закрытии.
+
+    ``StreamingHttpResponse`` вызывает ``close()`` и тогда, когда клиент
+    оборвал загрузку, поэтому слот не остаётся занятым.
+    """
+
+    def __init__(self, user, slot_key, chunks):
+        self.user = user
+        self.slot_key = slot_key
+        self.chunks = chunks
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.chunks.close()
+            release(self.user, self.slot_key)
@@ -0,0 +1,112 @@
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, USER_EXPORT_SLOTS=1,
+                   USER_EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.other = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            text='С картинкой', author=cls.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+        Post.objects.create(text='Чужой пост', author=cls.other)
+        Comment.objects.create(post=cls.post, author=cls.user,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.user, author=cls.other)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(ExportTests.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def download(self, **params):
+        response = self.client.get(reverse('users:export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content)
+        response.close()
+        return response, content
+
+    def test_zip_export(self):
+        """ZIP содержит данные пользователя и картинки его постов"""
+        response, content = self.download()
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertEqual(archive.read(ExportTests.post.image.name),
+                         SMALL_GIF)
+        records = [
+            json.loads(line)
+            for line in archive.read('content.jsonl').decode().splitlines()
+        ]
+        kinds = [record['type'] for record in records]
+        self.assertEqual(kinds.count('post'), 4)
+        self.assertEqual(kinds.count('comment'), 1)
+        self.assertIn({'type': 'follow', 'author__username': 'reader'},
+                      records)
+        self.assertNotIn('Чужой пост', [record.get('text')
+                                        for record in records])
+
+    def test_jsonl_export(self):
+        """Выгрузка в JSON Lines отдаётся построчно"""
+        response, content = self.download(format='jsonl')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(content.decode().splitlines()), 7)
+
+    def test_export_is_rate_limited(self):
+        """Повторная и параллельная выгрузки ограничены"""
+        self.download()
+        response = self.client.get(reverse('users:export'))
+        self.assertEqual(response.status_code, 429)
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertEqual(response['Retry-After'],
+                         str(settings.USER_EXPORT_COOLDOWN))
+        self.client.force_login(ExportTests.other)
+        running = self.client.get(reverse('users:export'))
+        self.client.force_login(ExportTests.user)
+        cache.delete(f'users:export:user:{ExportTests.user.pk}')
+        response = self.client.get(reverse('users:export'))
+        self.assertEqual(response.status_code, 429)
+        running.close()
+        self.download()
+
+    def test_guest_is_redirected(self):
+        """Гостя отправляют на страницу входа"""
+        self.client.logout()
+        response = self.client.get(reverse('users:export'))
+        self.assertEqual(response.status_code, 302)
@@ -7,6 +7,7 @@ app_name = 'users'
 
 urlpatterns = [
     path('signup/', views.SignUp.as_view(), name='signup'),
+    path('export/', views.export_data, name='export'),
     path(
         'logout/',
         LogoutView.as_view(template_name='users/logged_out.html'),
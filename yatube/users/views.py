@@ -1,6 +1,11 @@
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import StreamingHttpResponse
 from django.urls import reverse_lazy
 from django.views.generic import CreateView
 
+from core.views import too_many_requests
+from . import export
 from .forms import CreationForm
 
 
@@ -9,3 +14,38 @@ class SignUp(CreateView):
     # После успешной регистрации перенаправляем пользователя на главную.
     success_url = reverse_lazy('posts:index')
     template_name = 'users/signup.html'
+
+
+EXPORT_FORMATS = {
+    'zip': ('application/zip', export.iter_zip),
+    'jsonl': ('application/x-ndjson', None),
+}
+
+
+@login_required
+def export_data(request):
+    """Архив с постами, комментариями и подписками пользователя."""
+    fmt = request.GET.get('format', 'zip')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'zip'
+    user = request.user
+    slot_key = export.acquire(user)
+    if slot_key is None:
+        return too_many_requests(request, settings.USER_EXPORT_COOLDOWN)
+    content_type, build = EXPORT_FORMATS[fmt]
+    if build is None:
+        chunks = (
+            line.encode() for line in
+            export.iter_records(user, settings.USER_EXPORT_CHUNK_SIZE)
+        )
+    else:
+        chunks = build(user, settings.USER_EXPORT_CHUNK_SIZE)
+    response = StreamingHttpResponse(
+        export.ExportStream(user, slot_key, chunks),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{user.username}.{fmt}"'
+    )
+    response['Cache-Control'] = 'private, no-store'
+    return response
@@ -23,7 +23,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '2%%bi%f!1_uyt(kd$!-&81ztvilmq)6v!ylgf@f@8fy$fjzx(6'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DJANGO_DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -39,8 +39,8 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
-    'posts',
-    'core',
+    'posts.apps.PostsConfig',
+    'core.apps.CoreConfig',
     'about',
     'users.apps.UsersConfig',
     'django.contrib.admin',
@@ -54,23 +54,41 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PrecompressedStaticMiddleware',
+    'core.middleware.CompressionMiddleware',
+    # Выше сессий и CSRF: ответ попадает в кэш уже с их cookie,
+    # и такой ответ не кэшируется.
+    'core.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.RateLimitMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Загрузчики убирают из HTML-шаблонов отступы и пустые строки
+# (core.template_loaders), кроме шаблонов из TEMPLATE_MINIFY_EXCLUDE.
+TEMPLATE_LOADERS = [
+    'core.template_loaders.FilesystemLoader',
+    'core.template_loaders.AppDirectoriesLoader',
+]
+TEMPLATE_MINIFY_EXCLUDE = ['*email*']
+if not DEBUG:
+    # В production шаблоны разбираются один раз на процесс.
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -85,11 +103,35 @@ TEMPLATES = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Общий для всех процессов кэш — memcached по адресам из DJANGO_MEMCACHED
+# через запятую (нужен пакет python-memcached). Без него у каждого
+# процесса свой LocMemCache, и сброс записи виден только в нём самом.
+MEMCACHED_LOCATION = os.getenv('DJANGO_MEMCACHED', '')
+SHARED_CACHE: bool = bool(MEMCACHED_LOCATION)
+if SHARED_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': MEMCACHED_LOCATION.split(','),
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# С общим кэшем сессия и пользователь читаются из кэша, запись сессии
+# идёт и в базу. Локальный кэш для них не годится: выход, смена пароля
+# или блокировка не сбросили бы записи в других воркерах.
+if SHARED_CACHE:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTHENTICATION_BACKENDS = ['core.auth.CachedModelBackend']
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+AUTH_USER_CACHE_TIMEOUT: int = 300
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
@@ -144,9 +186,119 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_URL = '/static/'
-
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+STATIC_ROOT = os.path.join(BASE_DIR, 'static_root')
+if not DEBUG:
+    # Имена с хэшем содержимого и сжатые копии (.gz, .br) при collectstatic.
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+# Время кэширования статики без хэша в имени.
+STATIC_MAX_AGE: int = 60 * 60
+# Ответы короче GZIP_MIN_LENGTH байт не сжимаются.
+GZIP_MIN_LENGTH: int = 512
+
+# Письма ставятся в очередь и отправляются командой send_queued_mail
+# через QUEUED_EMAIL_BACKEND.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+EMAIL_QUEUE_BATCH_SIZE: int = 100
+EMAIL_QUEUE_MAX_ATTEMPTS: int = 5
+EMAIL_QUEUE_RETRY_DELAY: int = 60
 
 COUNT_POSTS_ON_PAGE: int = 10
+# Ветки комментариев (posts.threads): корней на странице поста, ответов
+# в превью ветки, комментариев на странице ветки и предельная глубина.
+COMMENT_THREADS_ON_PAGE: int = 10
+COMMENT_REPLIES_PREVIEW: int = 5
+COMMENTS_ON_PAGE: int = 50
+COMMENT_MAX_DEPTH: int = 5
+# Полностраничный кэш для гостей (core.middleware) и время жизни
+# фрагментов {% cache %} этих же страниц для авторизованных.
+ANONYMOUS_PAGE_CACHE_VIEWS = [
+    'posts:index',
+    'posts:popular',
+    'posts:group_index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+]
+ANONYMOUS_PAGE_CACHE_TIMEOUT: int = 20
+# Ограничение частоты запросов (core.ratelimit): ёмкость ведра и период
+# его наполнения в секундах по имени представления. Гости различаются
+# по RATELIMIT_IP_META, за прокси это заголовок с адресом клиента.
+# Вёдра должны быть общими для всех воркеров, иначе реальный предел
+# умножается на их число, поэтому без SHARED_CACHE ограничений нет.
+RATELIMITS = {}
+if SHARED_CACHE:
+    RATELIMITS = {
+        'posts:add_comment': {'rate': (10, 60), 'methods': ['POST']},
+        'posts:post_create': {'rate': (5, 60), 'methods': ['POST']},
+        'posts:follow': {'rate': (30, 60)},
+        'posts:unfollow': {'rate': (30, 60)},
+        'posts:react': {'rate': (30, 60), 'methods': ['POST']},
+        'posts:profile': {'rate': (60, 60), 'anonymous': True},
+        'posts:group_list': {'rate': (60, 60), 'anonymous': True},
+    }
+RATELIMIT_IP_META = 'REMOTE_ADDR'
+# Прогрев воркера (core.warmup): WARMUP_ON_START — все шаги при загрузке
+# yatube/wsgi.py, WARMUP_ON_READY — шаги без БД в CoreConfig.ready().
+# WARMUP_BASE_URL — адрес сайта со схемой, по нему строятся запросы
+# прогрева и абсолютные ссылки карт сайта.
+WARMUP_ON_START = os.getenv('DJANGO_WARMUP', str(not DEBUG)) == 'True'
+WARMUP_ON_READY = False
+# Pillow сюда не входит: он нужен только при создании новых миниатюр
+# и загружается при первом обращении.
+WARMUP_IMPORTS = [
+    'sorl.thumbnail.templatetags.thumbnail',
+    'django.contrib.admin.templatetags.admin_list',
+]
+WARMUP_URL_NAMESPACES = ['posts', 'users', 'about']
+WARMUP_BASE_URL = os.getenv('DJANGO_BASE_URL', 'http://localhost')
+WARMUP_INDEX_PAGES: int = 2
+# Карты сайта (posts.sitemaps): файлы пишет команда build_sitemaps,
+# отдаёт их веб-сервер по SITEMAP_URL. В куске не больше 50 000 адресов.
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+SITEMAP_URL = '/sitemaps/'
+SITEMAP_BASE_URL = WARMUP_BASE_URL
+SITEMAP_SHARD_SIZE: int = 50000
+# Админка: точное число строк кэшируется, для больших таблиц в PostgreSQL
+# используется оценка планировщика.
+ESTIMATED_COUNT_CACHE_TIMEOUT: int = 60
+ESTIMATED_COUNT_THRESHOLD: int = 100000
+GROUP_CHOICES_CACHE_TIMEOUT: int = 60 * 60
+# Кэш групп, авторов и постов для представлений (posts.caching),
+# только с SHARED_CACHE.
+OBJECT_CACHE_TIMEOUT: int = 60 * 60
+
+# Массовые операции модерации выполняются пачками по MODERATION_CHUNK_SIZE
+# строк; при MODERATION_IN_BACKGROUND — в фоновом потоке (core.tasks).
+MODERATION_CHUNK_SIZE: int = 1000
+MODERATION_IN_BACKGROUND = False
+BACKGROUND_TASKS_WORKERS: int = 2
+TASKS_ALWAYS_EAGER = False
 COUNT_PREVIEW_SYMBOL: int = 15
+# Длина начала поста в карточках лент, в символах.
+POST_EXCERPT_LENGTH: int = 300
+# Лента популярного (posts.ranking): рейтинг уменьшается вдвое
+# за POPULAR_HALF_LIFE секунд, в кэше держатся POPULAR_TOP_SIZE постов.
+POPULAR_HALF_LIFE: int = 12 * 60 * 60
+POPULAR_TOP_SIZE: int = 100
+POPULAR_MIN_SCORE: float = 0.05
+POPULAR_CACHE_TIMEOUT: int = 60 * 60
+# Счётчики реакций (posts.reactions): на сколько строк делится счётчик
+# поста и сколько числа для карточек живут в кэше.
+REACTION_COUNTER_SHARDS: int = 8
+REACTION_CACHE_TIMEOUT: int = 10 * 60
+# Ленты RSS и Atom (posts.feeds): число записей, длина заголовка записи,
+# время жизни готового XML в кэше и max-age для читалок и прокси.
+FEED_ITEMS: int = 20
+FEED_TITLE_LENGTH: int = 60
+FEED_CACHE_TIMEOUT: int = 60 * 60
+FEED_MAX_AGE: int = 60
+# Выгрузка данных пользователя (users.export): одновременных выгрузок
+# на сайт, пауза между выгрузками одного пользователя и предельная
+# длительность выгрузки, после которой слот освобождается сам. Без
+# SHARED_CACHE слоты и паузы считаются в каждом воркере отдельно.
+USER_EXPORT_SLOTS: int = 2
+USER_EXPORT_COOLDOWN: int = 10 * 60
+USER_EXPORT_TIMEOUT: int = 60 * 60
+USER_EXPORT_CHUNK_SIZE: int = 500